@@ -3,21 +3,30 @@
 LP2 - UNALM 2025
 """
 
-from nicegui import ui
+from nicegui import app, ui
 import plotly.graph_objects as go
 import asyncio
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 RUNNING_ON_RENDER = 'RENDER' in os.environ
 
 # Agregar carpeta src al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Registro de fuentes (no depende de Selenium)
+from fuentes import obtener_fuentes, obtener_fuente
+from cache_cotizaciones import CacheCotizaciones
+from difusion import CanalCotizaciones, RefrescadorCotizaciones
+from utils import calcular_ahorro
+from modelo import Cotizacion
+from indice_historico import IndiceHistorico
+from grafico_vivo import SeriesEnVivo
+
 # Intentar importar scrapers
 try:
-    from scraper_bcrp import obtener_tipo_cambio_bcrp
-    from scraper_kambista import obtener_tipo_cambio_kambista
-    from scraper_rextie import obtener_tipo_cambio_rextie
+    for _fuente in obtener_fuentes():
+        _fuente.obtener_extractor()
     SCRAPERS_DISPONIBLES = True
 except ImportError:
     SCRAPERS_DISPONIBLES = False
@@ -28,75 +37,108 @@ except ImportError:
 # =============================================================================
 def obtener_datos_demo():
     return {
-        'bcrp': {'compra': 3.3670, 'venta': 3.3620, 'exito': True},
-        'kambista': {'compra': 3.3300, 'venta': 3.4860, 'exito': True},
-        'rextie': {'compra': 3.3390, 'venta': 3.3810, 'exito': True},
+        'bcrp': Cotizacion('bcrp', 3.3670, 3.3620),
+        'kambista': Cotizacion('kambista', 3.3300, 3.4860),
+        'rextie': Cotizacion('rextie', 3.3390, 3.3810),
     }
 
 # =============================================================================
 # FUNCIONES ASYNC PARA SCRAPERS
 # =============================================================================
-async def ejecutar_scraper_bcrp():
-    """BCRP siempre usa datos reales (API funciona en todos lados)"""
-    if SCRAPERS_DISPONIBLES:
-        try:
-            resultado = obtener_tipo_cambio_bcrp()
-            return {
-                'compra': resultado.get('tc_bcrp_compra', 0),
-                'venta': resultado.get('tc_bcrp_venta', 0),
-                'exito': resultado.get('exito', False)
-            }
-        except Exception as e:
-            return {'compra': 0, 'venta': 0, 'exito': False}
-    else:
-        await asyncio.sleep(1)
-        return obtener_datos_demo()['bcrp']
+# Los scrapers son bloqueantes (requests/Selenium): se ejecutan en pools
+# acotados para no congelar el event loop de NiceGUI ni los websockets
+EJECUTOR_IO = ThreadPoolExecutor(max_workers=8, thread_name_prefix='scraper-io')
+EJECUTOR_NAVEGADOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='scraper-navegador')
 
 
-async def ejecutar_scraper_kambista():
-    """Kambista: usa Selenium en PC local, datos demo en Render"""
-    # Si estamos en Render, usar datos demo (no hay Chrome)
-    if RUNNING_ON_RENDER:
-        await asyncio.sleep(1.5)  # Simular tiempo de carga
-        return obtener_datos_demo()['kambista']
-    
-    # Si estamos en PC local, usar scraper real
-    if SCRAPERS_DISPONIBLES:
-        try:
-            resultado = obtener_tipo_cambio_kambista()
-            return {
-                'compra': resultado.get('tc_kambista_compra', 0),
-                'venta': resultado.get('tc_kambista_venta', 0),
-                'exito': resultado.get('exito', False)
-            }
-        except Exception as e:
-            return obtener_datos_demo()['kambista']
-    else:
-        await asyncio.sleep(2)
-        return obtener_datos_demo()['kambista']
+def _ejecutor_para(fuente):
+    return EJECUTOR_NAVEGADOR if fuente.costo == 'alto' else EJECUTOR_IO
+
+
+def _datos_demo(id_fuente):
+    return obtener_datos_demo().get(id_fuente) or Cotizacion.fallida(id_fuente)
 
 
-async def ejecutar_scraper_rextie():
-    """Rextie: usa Selenium en PC local, datos demo en Render"""
-    # Si estamos en Render, usar datos demo (no hay Chrome)
-    if RUNNING_ON_RENDER:
+async def ejecutar_scraper(id_fuente):
+    """
+    Ejecuta el scraper de una fuente del registro.
+    
+    Las fuentes de API siempre usan datos reales (funcionan en todos lados).
+    Las de navegador usan datos demo en Render (no hay Chrome). Si el
+    scraper falla se devuelve una cotización fallida, nunca datos demo.
+    
+    El scraper corre en un hilo del pool que corresponde a su costo, así
+    el event loop sigue atendiendo a los demás clientes.
+    """
+    fuente = obtener_fuente(id_fuente)
+    
+    # Si estamos en Render, usar datos demo para fuentes con navegador
+    if RUNNING_ON_RENDER and fuente.tipo == 'browser':
         await asyncio.sleep(1.5)  # Simular tiempo de carga
-        return obtener_datos_demo()['rextie']
+        return _datos_demo(id_fuente)
     
-    # Si estamos en PC local, usar scraper real
     if SCRAPERS_DISPONIBLES:
         try:
-            resultado = obtener_tipo_cambio_rextie()
-            return {
-                'compra': resultado.get('tc_rextie_compra', 0),
-                'venta': resultado.get('tc_rextie_venta', 0),
-                'exito': resultado.get('exito', False)
-            }
+            loop = asyncio.get_running_loop()
+            inicio = loop.time()
+            resultado = await loop.run_in_executor(_ejecutor_para(fuente), fuente.extraer)
+            return Cotizacion.desde_resultado(fuente, resultado, latencia=round(loop.time() - inicio, 3))
         except Exception as e:
-            return obtener_datos_demo()['rextie']
+            # Un fallo no se disfraza de cotización: el caché conserva el último
+            # valor real y no lo difunde como nuevo
+            print(f"⚠️ Error en {fuente.nombre}: {e}")
+            return Cotizacion.fallida(id_fuente)
     else:
-        await asyncio.sleep(2)
-        return obtener_datos_demo()['rextie']
+        await asyncio.sleep(1 if fuente.tipo == 'api' else 2)
+        return _datos_demo(id_fuente)
+
+# =============================================================================
+# CACHÉ COMPARTIDO DE COTIZACIONES
+# =============================================================================
+# Un solo scraping por fuente y TTL para todo el servidor, sin importar
+# cuántos visitantes pulsen el botón a la vez
+CACHE = CacheCotizaciones(
+    cargar=ejecutar_scraper,
+    ttl=lambda id_fuente: obtener_fuente(id_fuente).ttl
+)
+
+
+def datos_cacheados():
+    """Últimos valores del caché para todas las fuentes registradas."""
+    return CACHE.instantanea([f.id for f in obtener_fuentes()])
+
+
+@app.get('/api/cache')
+def estadisticas_cache():
+    """Contadores de aciertos/fallos del caché de cotizaciones."""
+    return dict(CACHE.estadisticas(), suscriptores=CANAL.cantidad_suscriptores)
+
+# =============================================================================
+# REFRESCO EN SEGUNDO PLANO
+# =============================================================================
+# Histórico en memoria: se carga una vez al arrancar y luego solo se le
+# agregan los registros nuevos que escribe el recolector, en un hilo y una
+# sola vez por publicación (no por página abierta)
+INDICE = IndiceHistorico()
+
+
+async def actualizar_indice():
+    await asyncio.get_running_loop().run_in_executor(EJECUTOR_IO, INDICE.actualizar)
+
+app.on_startup(actualizar_indice)
+
+# Una sola tarea por fuente refresca el caché según su TTL y publica cada
+# instantánea; las páginas abiertas se suscriben y se actualizan solas
+CANAL = CanalCotizaciones()
+REFRESCADOR = RefrescadorCotizaciones(CACHE, CANAL, obtener_fuentes(), antes_de_publicar=actualizar_indice)
+app.on_startup(REFRESCADOR.iniciar)
+app.on_shutdown(REFRESCADOR.detener)
+
+
+def suscribir_pagina(callback):
+    """Suscribe la página actual al canal hasta que su cliente se elimine."""
+    cancelar = CANAL.suscribir(callback)
+    ui.context.client.on_delete(cancelar)
 
 # =============================================================================
 # FUNCIÓN: CALCULAR MEJOR OPCIÓN
@@ -109,12 +151,12 @@ def calcular_mejor_opcion(datos):
     fuentes_validas = []
     
     for nombre, info in datos.items():
-        # CORREGIDO: Verificar que info no sea None antes de usar .get()
-        if info is not None and info.get('compra') and info.get('venta') and info['compra'] > 0:
+        # CORREGIDO: Verificar que info no sea None antes de leer sus tasas
+        if info is not None and info.compra and info.venta and info.compra > 0:
             fuentes_validas.append({
                 'nombre': nombre.upper(),
-                'compra': info['compra'],
-                'venta': info['venta']
+                'compra': info.compra,
+                'venta': info.venta
             })
     
     if not fuentes_validas:
@@ -164,8 +206,8 @@ def pagina_inicio():
     with ui.row().classes('w-full justify-center gap-8 px-8 pb-16 flex-wrap'):
         with ui.card().classes('w-80 p-6 bg-gray-800'):
             ui.icon('cloud_download').classes('text-4xl text-cyan-400 mb-4')
-            ui.label('3 Fuentes de Datos').classes('text-xl font-bold text-white mb-2')
-            ui.label('BCRP (API oficial), Kambista y Rextie (Web Scraping con Selenium)').classes('text-gray-400')
+            ui.label(f'{len(obtener_fuentes())} Fuentes de Datos').classes('text-xl font-bold text-white mb-2')
+            ui.label(descripcion_fuentes()).classes('text-gray-400')
         
         with ui.card().classes('w-80 p-6 bg-gray-800'):
             ui.icon('speed').classes('text-4xl text-green-400 mb-4')
@@ -191,6 +233,71 @@ def pagina_inicio():
     with ui.row().classes('w-full justify-center py-6 bg-gray-950'):
         ui.label('💱 TipoCambio.pe | LP2 - UNALM 2025').classes('text-gray-500')
 
+# =============================================================================
+# COMPONENTE: TARJETA DE FUENTE
+# =============================================================================
+ETIQUETAS_TIPO = {'api': 'API', 'http': 'HTTP', 'browser': 'Selenium'}
+COLORES_GRAFICO = {'blue': '#1565c0', 'purple': '#7b1fa2', 'orange': '#e65100'}
+
+
+def descripcion_fuentes():
+    """Fuentes registradas con su tipo de extracción, p. ej. 'BCRP (API), Kambista (Selenium) y Rextie (Selenium)'."""
+    nombres = [f'{f.nombre} ({ETIQUETAS_TIPO[f.tipo]})' for f in obtener_fuentes()]
+    return ' y '.join([', '.join(nombres[:-1]), nombres[-1]]) if len(nombres) > 1 else ''.join(nombres)
+
+
+def crear_tarjeta_fuente(fuente, al_actualizar):
+    """
+    Crea la tarjeta de una fuente.
+    
+    Returns:
+        Tuple (click, mostrar): handler del botón y función que pinta un
+        valor en las etiquetas (la usa el refresco en segundo plano)
+    """
+    with ui.card().classes('w-80 p-6 bg-gray-800') as tarjeta:
+        with ui.row().classes('items-center gap-3 mb-4'):
+            ui.icon(fuente.icono).classes(f'text-3xl text-{fuente.color}-500')
+            ui.label(fuente.nombre).classes('text-xl font-bold text-white')
+            ui.badge(ETIQUETAS_TIPO[fuente.tipo]).props(f'color={fuente.color}')
+        
+        ui.label(fuente.descripcion).classes('text-gray-400 text-sm mb-4')
+        
+        with ui.row().classes('w-full justify-around mb-4'):
+            with ui.column().classes('items-center'):
+                ui.label('COMPRA').classes('text-xs text-gray-500')
+                label_compra = ui.label('--').classes('text-2xl font-bold text-green-400')
+            with ui.column().classes('items-center'):
+                ui.label('VENTA').classes('text-xs text-gray-500')
+                label_venta = ui.label('--').classes('text-2xl font-bold text-red-400')
+        
+        def mostrar(valor):
+            if valor and valor.exito:
+                label_compra.text = f"S/ {valor.compra:.4f}"
+                label_venta.text = f"S/ {valor.venta:.4f}"
+            elif valor:
+                label_compra.text = label_venta.text = '--'
+        
+        # Mostrar lo que ya esté en el caché al entrar a la página
+        mostrar(CACHE.valor(fuente.id))
+        
+        spinner = ui.spinner('dots', size='lg').classes('mx-auto')
+        spinner.visible = False
+        
+        async def click():
+            spinner.visible = True
+            label_compra.text = '...'
+            label_venta.text = '...'
+            mostrar(await CACHE.obtener(fuente.id))
+            spinner.visible = False
+            # Entrar a la tarjeta: con asyncio.gather cada click corre en su propia task
+            with tarjeta:
+                ui.notify(f'✅ {fuente.nombre} actualizado', type='positive')
+            al_actualizar()
+        
+        ui.button(f'EJECUTAR {fuente.nombre.upper()}', on_click=click).props(f'push color={fuente.color}').classes('w-full')
+    
+    return click, mostrar
+
 # =============================================================================
 # PÁGINA: DEMO
 # =============================================================================
@@ -200,8 +307,9 @@ def pagina_demo():
     
     crear_navbar()
     
-    # Variables para los datos
-    datos_locales = {'bcrp': None, 'kambista': None, 'rextie': None}
+    # Handlers de cada tarjeta (los datos viven en el caché compartido)
+    clicks = {}
+    mostradores = {}
     
     with ui.column().classes('w-full p-8'):
         with ui.row().classes('items-center gap-3 mb-2'):
@@ -210,119 +318,17 @@ def pagina_demo():
         ui.label('Ejecuta los scrapers individualmente o todos a la vez').classes('text-gray-400 mb-8')
         
         with ui.row().classes('w-full gap-6 flex-wrap justify-center'):
-            
-            # === BCRP ===
-            with ui.card().classes('w-80 p-6 bg-gray-800'):
-                with ui.row().classes('items-center gap-3 mb-4'):
-                    ui.icon('account_balance').classes('text-3xl text-blue-500')
-                    ui.label('BCRP').classes('text-xl font-bold text-white')
-                    ui.badge('API').props('color=blue')
-                
-                ui.label('Banco Central de Reserva del Perú').classes('text-gray-400 text-sm mb-4')
-                
-                with ui.row().classes('w-full justify-around mb-4'):
-                    with ui.column().classes('items-center'):
-                        ui.label('COMPRA').classes('text-xs text-gray-500')
-                        bcrp_compra = ui.label('--').classes('text-2xl font-bold text-green-400')
-                    with ui.column().classes('items-center'):
-                        ui.label('VENTA').classes('text-xs text-gray-500')
-                        bcrp_venta = ui.label('--').classes('text-2xl font-bold text-red-400')
-                
-                bcrp_spinner = ui.spinner('dots', size='lg').classes('mx-auto')
-                bcrp_spinner.visible = False
-                
-                async def click_bcrp():
-                    bcrp_spinner.visible = True
-                    bcrp_compra.text = '...'
-                    bcrp_venta.text = '...'
-                    resultado = await ejecutar_scraper_bcrp()
-                    datos_locales['bcrp'] = resultado
-                    bcrp_compra.text = f"S/ {resultado['compra']:.4f}"
-                    bcrp_venta.text = f"S/ {resultado['venta']:.4f}"
-                    bcrp_spinner.visible = False
-                    ui.notify('✅ BCRP actualizado', type='positive')
-                    actualizar_mejor_opcion()
-                
-                ui.button('EJECUTAR BCRP', on_click=click_bcrp).props('push color=blue').classes('w-full')
-            
-            # === KAMBISTA ===
-            with ui.card().classes('w-80 p-6 bg-gray-800'):
-                with ui.row().classes('items-center gap-3 mb-4'):
-                    ui.icon('storefront').classes('text-3xl text-purple-500')
-                    ui.label('Kambista').classes('text-xl font-bold text-white')
-                    ui.badge('Selenium').props('color=purple')
-                
-                ui.label('Casa de cambio digital').classes('text-gray-400 text-sm mb-4')
-                
-                with ui.row().classes('w-full justify-around mb-4'):
-                    with ui.column().classes('items-center'):
-                        ui.label('COMPRA').classes('text-xs text-gray-500')
-                        kambista_compra = ui.label('--').classes('text-2xl font-bold text-green-400')
-                    with ui.column().classes('items-center'):
-                        ui.label('VENTA').classes('text-xs text-gray-500')
-                        kambista_venta = ui.label('--').classes('text-2xl font-bold text-red-400')
-                
-                kambista_spinner = ui.spinner('dots', size='lg').classes('mx-auto')
-                kambista_spinner.visible = False
-                
-                async def click_kambista():
-                    kambista_spinner.visible = True
-                    kambista_compra.text = '...'
-                    kambista_venta.text = '...'
-                    resultado = await ejecutar_scraper_kambista()
-                    datos_locales['kambista'] = resultado
-                    kambista_compra.text = f"S/ {resultado['compra']:.4f}"
-                    kambista_venta.text = f"S/ {resultado['venta']:.4f}"
-                    kambista_spinner.visible = False
-                    ui.notify('✅ Kambista actualizado', type='positive')
-                    actualizar_mejor_opcion()
-                
-                ui.button('EJECUTAR KAMBISTA', on_click=click_kambista).props('push color=purple').classes('w-full')
-            
-            # === REXTIE ===
-            with ui.card().classes('w-80 p-6 bg-gray-800'):
-                with ui.row().classes('items-center gap-3 mb-4'):
-                    ui.icon('swap_horiz').classes('text-3xl text-orange-500')
-                    ui.label('Rextie').classes('text-xl font-bold text-white')
-                    ui.badge('Selenium').props('color=orange')
-                
-                ui.label('Casa de cambio digital').classes('text-gray-400 text-sm mb-4')
-                
-                with ui.row().classes('w-full justify-around mb-4'):
-                    with ui.column().classes('items-center'):
-                        ui.label('COMPRA').classes('text-xs text-gray-500')
-                        rextie_compra = ui.label('--').classes('text-2xl font-bold text-green-400')
-                    with ui.column().classes('items-center'):
-                        ui.label('VENTA').classes('text-xs text-gray-500')
-                        rextie_venta = ui.label('--').classes('text-2xl font-bold text-red-400')
-                
-                rextie_spinner = ui.spinner('dots', size='lg').classes('mx-auto')
-                rextie_spinner.visible = False
-                
-                async def click_rextie():
-                    rextie_spinner.visible = True
-                    rextie_compra.text = '...'
-                    rextie_venta.text = '...'
-                    resultado = await ejecutar_scraper_rextie()
-                    datos_locales['rextie'] = resultado
-                    rextie_compra.text = f"S/ {resultado['compra']:.4f}"
-                    rextie_venta.text = f"S/ {resultado['venta']:.4f}"
-                    rextie_spinner.visible = False
-                    ui.notify('✅ Rextie actualizado', type='positive')
-                    actualizar_mejor_opcion()
-                
-                ui.button('EJECUTAR REXTIE', on_click=click_rextie).props('push color=orange').classes('w-full')
+            for fuente in obtener_fuentes():
+                clicks[fuente.id], mostradores[fuente.id] = crear_tarjeta_fuente(
+                    fuente, lambda: actualizar_mejor_opcion()
+                )
         
         ui.separator().classes('my-8')
         
         with ui.row().classes('w-full justify-center'):
             async def ejecutar_todos():
-                ui.notify('🚀 Ejecutando BCRP...', type='info')
-                await click_bcrp()
-                ui.notify('🚀 Ejecutando Kambista...', type='info')
-                await click_kambista()
-                ui.notify('🚀 Ejecutando Rextie...', type='info')
-                await click_rextie()
+                ui.notify('🚀 Ejecutando todas las fuentes...', type='info')
+                await asyncio.gather(*(click() for click in clicks.values()))
                 ui.notify('🏆 ¡Todos completados!', type='positive')
             
             ui.button('🚀 EJECUTAR TODOS', on_click=ejecutar_todos).props('push color=cyan size=xl').classes('px-12')
@@ -358,6 +364,7 @@ def pagina_demo():
         
         # Función para actualizar (CORREGIDA)
         def actualizar_mejor_opcion():
+            datos_locales = datos_cacheados()
             mejor_comprar, mejor_vender = calcular_mejor_opcion(datos_locales)
             
             if mejor_comprar and mejor_vender:
@@ -366,9 +373,8 @@ def pagina_demo():
                 mejor_comprar_precio.text = f"Venta: S/ {mejor_comprar['venta']:.4f}"
                 
                 # Calcular ahorro
-                todas_ventas = [d['venta'] for d in datos_locales.values() if d is not None and d.get('venta')]
-                if len(todas_ventas) > 1:
-                    ahorro = (max(todas_ventas) - mejor_comprar['venta']) * 1000
+                ahorro = calcular_ahorro({n: d.venta or None for n, d in datos_locales.items() if d is not None})
+                if ahorro is not None:
                     mejor_comprar_ahorro.text = f"Ahorras S/ {ahorro:.2f} por cada $1,000"
                 
                 # Actualizar mejor para VENDER
@@ -376,21 +382,171 @@ def pagina_demo():
                 mejor_vender_precio.text = f"Compra: S/ {mejor_vender['compra']:.4f}"
                 
                 # Calcular ganancia
-                todas_compras = [d['compra'] for d in datos_locales.values() if d is not None and d.get('compra')]
-                if len(todas_compras) > 1:
-                    ganancia = (mejor_vender['compra'] - min(todas_compras)) * 1000
+                ganancia = calcular_ahorro({n: d.compra or None for n, d in datos_locales.items() if d is not None})
+                if ganancia is not None:
                     mejor_vender_ahorro.text = f"Ganas S/ {ganancia:.2f} más por cada $1,000"
+        
+        # Si el caché ya tiene datos, mostrarlos sin esperar un click
+        actualizar_mejor_opcion()
+        
+        # Actualizaciones en vivo del refresco en segundo plano
+        def al_publicar(instantanea):
+            id_fuente = instantanea['fuente']
+            if id_fuente in mostradores:
+                mostradores[id_fuente](instantanea['datos'].get(id_fuente))
+            actualizar_mejor_opcion()
+        
+        suscribir_pagina(al_publicar)
 
 # =============================================================================
 # PÁGINA: ANÁLISIS
 # =============================================================================
+def datos_analisis():
+    """
+    Datos para los gráficos: el caché compartido, completado con datos demo
+    para las fuentes que aún no tienen cotización.
+    """
+    datos = obtener_datos_demo()
+    datos.update({i: v for i, v in datos_cacheados().items() if v and v.exito})
+    return datos
+
+
+ETIQUETAS_VENTANA = {'24h': '24 horas', '7d': '7 días', '30d': '30 días', '1a': '1 año'}
+
+
+def _layout_historico(titulo_y):
+    return dict(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        legend=dict(orientation='h', y=1.1),
+        margin=dict(l=20, r=20, t=40, b=20),
+        xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)', title=titulo_y)
+    )
+
+
+def trazas_tasas(registradas):
+    """Columnas y estilo de las trazas de compra (continua) y venta (punteada) por fuente."""
+    columnas, estilos = [], []
+    for f in registradas:
+        color = COLORES_GRAFICO.get(f.color, '#9e9e9e')
+        for lado, trazo in (('compra', 'solid'), ('venta', 'dot')):
+            columnas.append(f'tc_{f.id}_{lado}')
+            estilos.append({'name': f'{f.nombre} {lado}', 'line': {'color': color, 'dash': trazo}})
+    return columnas, estilos
+
+
+def trazas_spreads(registradas):
+    """Columnas y estilo de las trazas de spread por fuente."""
+    columnas = [f'spread_{f.id}' for f in registradas]
+    estilos = [{'name': f.nombre, 'line': {'color': COLORES_GRAFICO.get(f.color, '#9e9e9e')}} for f in registradas]
+    return columnas, estilos
+
+
+def crear_grafico_historico(columnas, estilos, titulo_y, ventana):
+    """
+    Gráfico de líneas del histórico que se actualiza por deltas.
+    
+    Las series parten reducidas (LTTB) al ancho del gráfico, o desde los
+    agregados OHLC en las ventanas de 30 días y 1 año; en cada refresco
+    solo viajan los puntos nuevos vía Plotly.extendTraces, que además
+    descarta los que salieron de la ventana. La figura es un dict que usa
+    las mismas listas que SeriesEnVivo: el servidor siempre tiene el estado
+    que ve el navegador.
+    
+    Returns:
+        (cambiar_ventana, avanzar): avanzar() devuelve True si hubo puntos nuevos
+    """
+    series = SeriesEnVivo(INDICE, columnas, ventana)
+    
+    def figura():
+        return {
+            'data': [dict(estilo, type='scatter', mode='lines', x=series.x[k], y=series.y[k])
+                     for k, estilo in enumerate(estilos)],
+            'layout': _layout_historico(titulo_y),
+        }
+    
+    grafico = ui.plotly(figura()).classes('w-full h-80')
+    
+    def cambiar_ventana(nueva):
+        series.reiniciar(nueva)
+        grafico.update_figure(figura())
+    
+    def avanzar():
+        delta = series.avanzar()
+        if delta is None:
+            return False
+        if delta['redibujar']:
+            grafico.update_figure(figura())
+        else:
+            grafico.run_plot_method('extendTraces', {'x': delta['x'], 'y': delta['y']},
+                                    delta['trazas'], delta['max_puntos'])
+        return True
+    
+    return cambiar_ventana, avanzar
+
+
+def filas_rachas(ventana):
+    """Rachas de mejor opción (comprar y vender USD) en la ventana, la más reciente primero."""
+    inicio, fin = INDICE.ventana(ventana)
+    filas = []
+    for lado, operacion in (('compra', 'Comprar USD'), ('venta', 'Vender USD')):
+        for racha in INDICE.rachas(lado, inicio, fin):
+            filas.append(dict(racha, operacion=operacion))
+    return sorted(filas, key=lambda r: r['hasta'], reverse=True)
+
+
+def figura_tasas(datos, registradas):
+    """Gráfico de barras de compra y venta por fuente."""
+    fig = go.Figure()
+    fuentes = [f.nombre for f in registradas]
+    compras = [datos[f.id].compra for f in registradas]
+    ventas = [datos[f.id].venta for f in registradas]
+    
+    fig.add_trace(go.Bar(name='Compra', x=fuentes, y=compras, marker_color='#00c853'))
+    fig.add_trace(go.Bar(name='Venta', x=fuentes, y=ventas, marker_color='#ff5252'))
+    
+    fig.update_layout(
+        barmode='group',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        legend=dict(orientation='h', y=1.1),
+        margin=dict(l=20, r=20, t=40, b=20),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)')
+    )
+    return fig
+
+
+def figura_spreads(datos, registradas):
+    """Gráfico de barras del spread (venta - compra) por fuente."""
+    fuentes = [f.nombre for f in registradas]
+    spreads = [datos[f.id].venta - datos[f.id].compra for f in registradas]
+    
+    fig = go.Figure(data=[
+        go.Bar(x=fuentes, y=spreads, marker_color=[COLORES_GRAFICO.get(f.color, '#9e9e9e') for f in registradas],
+               text=[f'S/ {s:.4f}' for s in spreads], textposition='outside')
+    ])
+    
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        margin=dict(l=20, r=20, t=40, b=20),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)', title='Spread (S/)')
+    )
+    return fig
+
+
 @ui.page('/analisis')
 def pagina_analisis():
     ui.query('body').classes('bg-gray-900')
     
     crear_navbar()
     
-    datos = obtener_datos_demo()
+    datos = datos_analisis()
+    registradas = [f for f in obtener_fuentes() if f.id in datos]
     
     with ui.column().classes('w-full p-8'):
         with ui.row().classes('items-center gap-3 mb-2'):
@@ -404,25 +560,7 @@ def pagina_analisis():
             with ui.card().classes('flex-1 min-w-96 p-6 bg-gray-800'):
                 ui.label('📊 Comparación de Tipos de Cambio').classes('text-xl font-bold text-white mb-4')
                 
-                fig = go.Figure()
-                fuentes = ['BCRP', 'Kambista', 'Rextie']
-                compras = [datos['bcrp']['compra'], datos['kambista']['compra'], datos['rextie']['compra']]
-                ventas = [datos['bcrp']['venta'], datos['kambista']['venta'], datos['rextie']['venta']]
-                
-                fig.add_trace(go.Bar(name='Compra', x=fuentes, y=compras, marker_color='#00c853'))
-                fig.add_trace(go.Bar(name='Venta', x=fuentes, y=ventas, marker_color='#ff5252'))
-                
-                fig.update_layout(
-                    barmode='group',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    legend=dict(orientation='h', y=1.1),
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    yaxis=dict(gridcolor='rgba(255,255,255,0.1)')
-                )
-                
-                ui.plotly(fig).classes('w-full h-80')
+                grafico_tasas = ui.plotly(figura_tasas(datos, registradas)).classes('w-full h-80')
                 
                 with ui.expansion('¿Cómo interpretar?', icon='help').classes('w-full mt-4'):
                     ui.label('• VERDE = Precio COMPRA (lo que te pagan al vender USD)').classes('text-gray-300 text-sm')
@@ -432,26 +570,7 @@ def pagina_analisis():
             with ui.card().classes('flex-1 min-w-96 p-6 bg-gray-800'):
                 ui.label('📈 Análisis de Spreads').classes('text-xl font-bold text-white mb-4')
                 
-                spreads = [
-                    datos['bcrp']['venta'] - datos['bcrp']['compra'],
-                    datos['kambista']['venta'] - datos['kambista']['compra'],
-                    datos['rextie']['venta'] - datos['rextie']['compra']
-                ]
-                
-                fig2 = go.Figure(data=[
-                    go.Bar(x=fuentes, y=spreads, marker_color=['#1565c0', '#7b1fa2', '#e65100'],
-                           text=[f'S/ {s:.4f}' for s in spreads], textposition='outside')
-                ])
-                
-                fig2.update_layout(
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    yaxis=dict(gridcolor='rgba(255,255,255,0.1)', title='Spread (S/)')
-                )
-                
-                ui.plotly(fig2).classes('w-full h-80')
+                grafico_spreads = ui.plotly(figura_spreads(datos, registradas)).classes('w-full h-80')
                 
                 with ui.expansion('¿Qué es el spread?', icon='help').classes('w-full mt-4'):
                     ui.label('• Spread = Venta - Compra').classes('text-gray-300 text-sm')
@@ -469,11 +588,64 @@ def pagina_analisis():
             
             def calcular():
                 m = monto.value or 1000
-                ventas = [datos['bcrp']['venta'], datos['kambista']['venta'], datos['rextie']['venta']]
-                ahorro = (max(ventas) - min(ventas)) * m
+                ahorro = calcular_ahorro({f.id: datos[f.id].venta for f in registradas}, m) or 0
                 resultado.text = f'💵 Por ${m:,.0f} USD puedes ahorrar hasta S/ {ahorro:.2f}'
             
             ui.button('Calcular Ahorro', on_click=calcular).props('push color=cyan').classes('w-full')
+        
+        # Histórico
+        ui.separator().classes('my-8')
+        
+        with ui.row().classes('items-center gap-3 mb-2'):
+            ui.icon('timeline').classes('text-3xl text-cyan-400')
+            ui.label('Histórico').classes('text-2xl font-bold text-white')
+        ventana = ui.toggle(ETIQUETAS_VENTANA, value='7d').props('color=cyan').classes('mb-4')
+        
+        with ui.row().classes('w-full gap-8 flex-wrap justify-center'):
+            with ui.card().classes('flex-1 min-w-96 p-6 bg-gray-800'):
+                ui.label('📉 Tipo de Cambio en el Tiempo').classes('text-xl font-bold text-white mb-4')
+                cambiar_historico, avanzar_historico = crear_grafico_historico(
+                    *trazas_tasas(registradas), 'S/ por USD', ventana.value)
+            
+            with ui.card().classes('flex-1 min-w-96 p-6 bg-gray-800'):
+                ui.label('📈 Spreads en el Tiempo').classes('text-xl font-bold text-white mb-4')
+                cambiar_spreads, avanzar_spreads = crear_grafico_historico(
+                    *trazas_spreads(registradas), 'Spread (S/)', ventana.value)
+        
+        with ui.card().classes('w-full p-6 bg-gray-800 mt-8'):
+            ui.label('🏆 Rachas de Mejor Opción').classes('text-xl font-bold text-white mb-4')
+            tabla_rachas = ui.table(columns=[
+                {'name': 'operacion', 'label': 'Operación', 'field': 'operacion', 'align': 'left'},
+                {'name': 'fuente', 'label': 'Fuente', 'field': 'fuente', 'align': 'left'},
+                {'name': 'desde', 'label': 'Desde', 'field': 'desde', 'align': 'left'},
+                {'name': 'hasta', 'label': 'Hasta', 'field': 'hasta', 'align': 'left'},
+                {'name': 'registros', 'label': 'Registros', 'field': 'registros'},
+            ], rows=filas_rachas(ventana.value), pagination=10).classes('w-full')
+        
+        def mostrar_rachas():
+            tabla_rachas.rows = filas_rachas(ventana.value)
+            tabla_rachas.update()
+        
+        def cambiar_ventana(_):
+            cambiar_historico(ventana.value)
+            cambiar_spreads(ventana.value)
+            mostrar_rachas()
+        
+        ventana.on_value_change(cambiar_ventana)
+    
+    # Actualizaciones en vivo del refresco en segundo plano
+    def al_publicar(instantanea):
+        datos.update(datos_analisis())
+        grafico_tasas.update_figure(figura_tasas(datos, registradas))
+        grafico_spreads.update_figure(figura_spreads(datos, registradas))
+        # El refrescador ya incorporó al índice lo que agregó el recolector;
+        # cada gráfico recibe los puntos posteriores al último que muestra
+        hubo_tasas = avanzar_historico()
+        hubo_spreads = avanzar_spreads()
+        if hubo_tasas or hubo_spreads:
+            mostrar_rachas()
+    
+    suscribir_pagina(al_publicar)
 
 # =============================================================================
 # PÁGINA: EQUIPO
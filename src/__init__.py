@@ -8,7 +8,29 @@ Módulos:
     - scraper_bcrp: Extractor de API del BCRP
     - scraper_kambista: Extractor web de Kambista
     - scraper_rextie: Extractor web de Rextie
+    - driver_pool: Pool de navegadores Chrome reutilizables
+    - espera_pagina: Espera por eventos de carga y latencias por fuente
+    - cliente_http: Sesión HTTP compartida para los modos rápidos
+    - servidor_simulado: Servidor local con respuestas grabadas
+    - extraccion_dom: Extracción dirigida de tasas por selectores CSS
+    - benchmarks: Mediciones de rendimiento offline
+    - modelo: Cotizacion e Instantanea tipadas (forma larga) y adaptadores al CSV
+    - fuentes: Registro de fuentes (id, tipo, extractor, TTL, costo)
     - integrador: Combina datos de todas las fuentes
+    - almacenamiento: Backends del histórico (CSV por defecto, SQLite)
+    - almacenamiento_parquet: Histórico columnar en Parquet particionado por mes
+    - registro_binario: Bitácora binaria de ancho fijo con lector mmap/NumPy
+    - agregados: Agregados OHLC por hora, día y semana actualizados al guardar
+    - metricas: Spreads, mejor opción y ahorro vectorizados con NumPy
+    - reprocesar: Recalcula por bloques las columnas derivadas del histórico CSV
+    - indice_historico: Histórico en columnas en memoria con búsqueda por rango (bisect)
+    - submuestreo: Reducción de series largas con LTTB para los gráficos
+    - grafico_vivo: Deltas de Plotly.extendTraces para los gráficos del histórico
+    - escritor_csv: Escritor del histórico CSV con buffer, bloqueo y fsync configurable
+    - cache_cotizaciones: Caché compartido con single-flight para la app
+    - difusion: Refresco en segundo plano y difusión a las páginas abiertas
+    - cliente_bcrp: Cliente de la API del BCRP con reintentos y caché en disco
+    - backfill_bcrp: Carga histórica del BCRP en bloques paralelos y reanudable
     - utils: Funciones auxiliares
 
 Autores:
@@ -0,0 +1,324 @@
+"""
+agregados.py - Agregados OHLC por hora, día y semana
+
+Cada gráfico o análisis de varios meses recorría las filas crudas del
+histórico para volver a agregarlas. Este módulo mantiene tablas de
+agregados que se actualizan al guardar cada snapshot (ver
+integrador.ejecutar_extraccion): por fuente, lado ('compra' / 'venta') y
+período guardan apertura, máximo, mínimo, cierre, spread medio y cantidad
+de muestras.
+
+Niveles:
+    - 'hora':   períodos que empiezan en HH:00:00
+    - 'dia':    períodos que empiezan a las 00:00:00
+    - 'semana': períodos que empiezan el lunes a las 00:00:00
+
+Las consultas eligen el nivel más grueso que no supere la resolución
+pedida, así un gráfico de un año a resolución diaria lee ~365 filas en
+lugar de todo el histórico.
+
+Las tablas viven en una base SQLite aparte (TIPOCAMBIO_AGREGADOS) y se
+pueden reconstruir en cualquier momento desde el histórico crudo.
+
+Uso:
+    python agregados.py reconstruir
+
+    >>> consultar_ohlc('kambista', 'venta', desde='2025-12-01', resolucion=86400)[0]['cierre']
+    3.756
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import obtener_fuentes
+from almacenamiento import Almacenamiento, TAMANO_LOTE, obtener_almacenamiento
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_AGREGADOS = os.environ.get(
+    'TIPOCAMBIO_AGREGADOS',
+    os.path.join(os.path.dirname(__file__), "..", "data", "processed", "agregados.db")
+)
+NIVELES = {'hora': 3600, 'dia': 86400, 'semana': 7 * 86400}  # segundos por período
+LADOS = ('compra', 'venta')
+FORMATO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+
+def inicio_periodo(timestamp: str, nivel: str) -> str:
+    """
+    Inicio del período de `nivel` que contiene a `timestamp`.
+
+    Ejemplo:
+        >>> inicio_periodo('2025-12-13 10:45:00', 'semana')
+        '2025-12-08 00:00:00'
+    """
+    if nivel == 'hora':
+        return timestamp[:13] + ":00:00"
+    if nivel == 'dia':
+        return timestamp[:10] + " 00:00:00"
+    if nivel == 'semana':
+        fecha = datetime.strptime(timestamp[:10], "%Y-%m-%d")
+        return (fecha - timedelta(days=fecha.weekday())).strftime(FORMATO_TIMESTAMP)
+    raise ValueError(f"Nivel de agregado desconocido: {nivel} (opciones: {list(NIVELES)})")
+
+
+def elegir_nivel(resolucion: float) -> str:
+    """
+    Nivel más grueso cuyo período no supera `resolucion` segundos.
+
+    Raises:
+        ValueError: Si la resolución es menor a una hora (usar el histórico crudo)
+    """
+    candidatos = [nivel for nivel, segundos in NIVELES.items() if segundos <= resolucion]
+    if not candidatos:
+        raise ValueError(f"Resolución de {resolucion}s menor al nivel más fino (hora); usar el histórico")
+    return max(candidatos, key=NIVELES.get)
+
+
+def _numero(valor) -> Optional[float]:
+    if valor is None or valor == '':
+        return None
+    return float(valor)
+
+
+# ============================================================
+# TABLAS DE AGREGADOS
+# ============================================================
+# La apertura y el cierre se resuelven por timestamp, no por orden de
+# llegada: reconstruir o importar filas desordenadas da el mismo resultado.
+_UPSERT = """
+    INSERT INTO ohlc (nivel, fuente, lado, inicio, apertura, maximo, minimo, cierre,
+                      primer_ts, ultimo_ts, suma_spread, muestras_spread, muestras)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT (nivel, fuente, lado, inicio) DO UPDATE SET
+        apertura = CASE WHEN excluded.primer_ts < primer_ts THEN excluded.apertura ELSE apertura END,
+        primer_ts = MIN(primer_ts, excluded.primer_ts),
+        cierre = CASE WHEN excluded.ultimo_ts >= ultimo_ts THEN excluded.cierre ELSE cierre END,
+        ultimo_ts = MAX(ultimo_ts, excluded.ultimo_ts),
+        maximo = MAX(maximo, excluded.maximo),
+        minimo = MIN(minimo, excluded.minimo),
+        suma_spread = suma_spread + excluded.suma_spread,
+        muestras_spread = muestras_spread + excluded.muestras_spread,
+        muestras = muestras + 1
+"""
+
+
+class Agregados:
+    """
+    Tablas OHLC por nivel, fuente y lado en SQLite.
+
+    Args:
+        ruta: Ruta del archivo .db (':memory:' para pruebas)
+    """
+
+    def __init__(self, ruta: str = RUTA_AGREGADOS):
+        self.ruta = ruta
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conexion:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS ohlc (
+                    nivel TEXT NOT NULL,
+                    fuente TEXT NOT NULL,
+                    lado TEXT NOT NULL,
+                    inicio TEXT NOT NULL,
+                    apertura REAL NOT NULL,
+                    maximo REAL NOT NULL,
+                    minimo REAL NOT NULL,
+                    cierre REAL NOT NULL,
+                    primer_ts TEXT NOT NULL,
+                    ultimo_ts TEXT NOT NULL,
+                    suma_spread REAL NOT NULL,
+                    muestras_spread INTEGER NOT NULL,
+                    muestras INTEGER NOT NULL,
+                    PRIMARY KEY (nivel, fuente, lado, inicio)
+                ) WITHOUT ROWID""")
+
+    def _filas(self, registros: List[Dict]) -> List[tuple]:
+        filas = []
+        for registro in registros:
+            timestamp = registro['timestamp']
+            periodos = [(nivel, inicio_periodo(timestamp, nivel)) for nivel in NIVELES]
+            for fuente in obtener_fuentes():
+                spread = _numero(registro.get(fuente.campo_spread))
+                for lado, campo in zip(LADOS, (fuente.campo_compra, fuente.campo_venta)):
+                    tasa = _numero(registro.get(campo))
+                    if tasa is None:
+                        continue
+                    for nivel, inicio in periodos:
+                        filas.append((nivel, fuente.id, lado, inicio, tasa, tasa, tasa, tasa,
+                                      timestamp, timestamp, spread or 0.0, int(spread is not None)))
+        return filas
+
+    def actualizar(self, registros: List[Dict]) -> int:
+        """
+        Incorpora registros del histórico (esquema de fuentes.columnas_csv)
+        en todos los niveles, en una sola transacción.
+
+        Returns:
+            int: Filas de agregados tocadas
+        """
+        filas = self._filas(registros)
+        if filas:
+            with self._lock, self._conexion:
+                self._conexion.executemany(_UPSERT, filas)
+        return len(filas)
+
+    def reconstruir(self, almacen: Optional[Almacenamiento] = None,
+                    tamano_lote: int = TAMANO_LOTE) -> int:
+        """
+        Borra los agregados y los recalcula desde el histórico crudo.
+
+        El histórico se lee por lotes (ver Almacenamiento.iterar_lotes) y el
+        borrado y la recarga van en una sola transacción: si algo falla,
+        quedan los agregados anteriores, y los lectores de otras conexiones
+        los siguen viendo hasta el commit.
+
+        Args:
+            almacen: Origen de los registros (por defecto, el backend configurado)
+            tamano_lote: Registros leídos por lote
+
+        Returns:
+            int: Registros procesados
+        """
+        almacen = almacen or obtener_almacenamiento()
+        total = 0
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM ohlc")
+            for lote in almacen.iterar_lotes(tamano_lote):
+                self._conexion.executemany(_UPSERT, self._filas(lote))
+                total += len(lote)
+        logger.info(f"Agregados reconstruidos desde {total} registros")
+        return total
+
+    def consultar(self, fuente: str, lado: str, nivel: str,
+                  desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict]:
+        """
+        Períodos de un nivel que empiezan en [desde, hasta], ordenados.
+
+        Returns:
+            List[Dict] con 'inicio', 'apertura', 'maximo', 'minimo',
+            'cierre', 'spread_medio' y 'muestras'
+        """
+        if nivel not in NIVELES:
+            raise ValueError(f"Nivel de agregado desconocido: {nivel} (opciones: {list(NIVELES)})")
+
+        condiciones, parametros = ["nivel = ?", "fuente = ?", "lado = ?"], [nivel, fuente, lado]
+        if desde is not None:
+            # Incluir el período que contiene a 'desde'
+            condiciones.append("inicio >= ?")
+            parametros.append(inicio_periodo(desde if len(desde) > 10 else desde + " 00:00:00", nivel))
+        if hasta is not None:
+            condiciones.append("inicio <= ?")
+            parametros.append(hasta if len(hasta) > 10 else hasta + " 23:59:59")
+
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT inicio, apertura, maximo, minimo, cierre, suma_spread, muestras_spread, muestras "
+                f"FROM ohlc WHERE {' AND '.join(condiciones)} ORDER BY inicio",
+                parametros
+            ).fetchall()
+
+        return [
+            {
+                'inicio': fila['inicio'],
+                'apertura': fila['apertura'],
+                'maximo': fila['maximo'],
+                'minimo': fila['minimo'],
+                'cierre': fila['cierre'],
+                'spread_medio': (round(fila['suma_spread'] / fila['muestras_spread'], 4)
+                                 if fila['muestras_spread'] else None),
+                'muestras': fila['muestras'],
+            }
+            for fila in filas
+        ]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+
+# ============================================================
+# AGREGADOS COMPARTIDOS DEL PROCESO
+# ============================================================
+_agregados: Optional[Agregados] = None
+_agregados_lock = threading.Lock()
+
+
+def obtener_agregados() -> Agregados:
+    """Devuelve las tablas de agregados del proceso, abriéndolas la primera vez."""
+    global _agregados
+    with _agregados_lock:
+        if _agregados is None:
+            _agregados = Agregados(RUTA_AGREGADOS)
+        return _agregados
+
+
+def actualizar_agregados(registros: List[Dict]) -> int:
+    """Incorpora registros recién guardados en los agregados del proceso."""
+    return obtener_agregados().actualizar(registros)
+
+
+def consultar_ohlc(fuente: str, lado: str, desde: Optional[str] = None,
+                   hasta: Optional[str] = None, resolucion: float = NIVELES['hora']) -> List[Dict]:
+    """
+    OHLC de una fuente y lado leyendo el nivel más grueso que cumple la resolución.
+
+    Args:
+        fuente: Id de la fuente ('kambista')
+        lado: 'compra' o 'venta'
+        desde: Timestamp o fecha inicial
+        hasta: Timestamp o fecha final (inclusive)
+        resolucion: Segundos entre puntos que necesita el gráfico o análisis
+
+    Raises:
+        ValueError: Si la resolución es menor a una hora
+    """
+    return obtener_agregados().consultar(fuente, lado, elegir_nivel(resolucion), desde, hasta)
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregados OHLC del histórico")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    reconstruir = subcomandos.add_parser('reconstruir', help="Recalcular todo desde el histórico crudo")
+    reconstruir.add_argument('--backend', default=None, help="Backend de origen (csv, sqlite, parquet, binario)")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print("   📊 AGREGADOS OHLC: reconstruir")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    procesados = obtener_agregados().reconstruir(obtener_almacenamiento(args.backend))
+
+    print(f"\n  Registros procesados: {procesados}")
+    print(f"  Base de agregados:    {os.path.abspath(RUTA_AGREGADOS)}")
+    print(f"  Tiempo:               {time.perf_counter() - inicio:.2f}s")
+    print("=" * 50 + "\n")
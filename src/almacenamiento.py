@@ -0,0 +1,479 @@
+"""
+almacenamiento.py - Backends de persistencia del histórico de cotizaciones
+
+Define una interfaz común para guardar y consultar los registros que
+produce el integrador, con dos implementaciones:
+
+    - AlmacenamientoCSV: el archivo tipo_cambio_historico.csv (por defecto)
+    - AlmacenamientoSQLite: base SQLite en modo WAL, con índices por
+      timestamp y por fuente, inserciones por lotes en una transacción y
+      consultas por rango
+    - AlmacenamientoParquet: columnar, particionado por mes
+      (ver almacenamiento_parquet.py; requiere pyarrow)
+    - AlmacenamientoBinario: bitácora binaria de ancho fijo leída con mmap
+      (ver registro_binario.py)
+
+El backend se elige con la variable de entorno TIPOCAMBIO_BACKEND
+('csv', 'sqlite', 'parquet' o 'binario').
+
+Uso:
+    >>> almacen = obtener_almacenamiento()
+    >>> almacen.guardar(registro)
+    >>> almacen.ultimo_registro()['timestamp']
+    '2025-12-13 11:00:00'
+
+    python almacenamiento.py migrar      # importa el CSV histórico a SQLite
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import obtener_fuente, obtener_fuentes, columnas_csv
+from utils import cargar_ultimo_registro
+from escritor_csv import obtener_escritor
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_CSV_HISTORICO = os.path.join(os.path.dirname(__file__), "..", "data", "processed", "tipo_cambio_historico.csv")
+RUTA_SQLITE = os.environ.get(
+    'TIPOCAMBIO_DB',
+    os.path.join(os.path.dirname(__file__), "..", "data", "processed", "tipo_cambio.db")
+)
+BACKEND = os.environ.get('TIPOCAMBIO_BACKEND', 'csv')
+TAMANO_LOTE = 1000  # filas por transacción al migrar
+
+
+class Almacenamiento(ABC):
+    """
+    Interfaz de persistencia del histórico.
+
+    Los registros son diccionarios con las columnas de fuentes.columnas_csv()
+    (timestamp, tasas por fuente, spreads, mejor opción y cambio_detectado).
+    Todos los backends los devuelven con los mismos tipos: tasas y spreads
+    float, cambio_detectado bool, textos str y None donde no hay dato.
+    """
+
+    def guardar(self, registro: Dict) -> bool:
+        """Guarda un registro. Devuelve True si se guardó."""
+        return self.guardar_lote([registro]) == 1
+
+    @abstractmethod
+    def guardar_lote(self, registros: List[Dict]) -> int:
+        """Guarda varios registros. Devuelve cuántos se guardaron."""
+
+    @abstractmethod
+    def ultimo_registro(self) -> Optional[Dict]:
+        """Registro más reciente, o None si el histórico está vacío."""
+
+    @abstractmethod
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  fuente: Optional[str] = None) -> List[Dict]:
+        """
+        Registros con timestamp en [desde, hasta].
+
+        Args:
+            desde: Timestamp inicial 'YYYY-MM-DD HH:MM:SS' (o prefijo 'YYYY-MM-DD')
+            hasta: Timestamp final inclusive (o prefijo)
+            fuente: Si se indica, devuelve filas 'timestamp', 'fuente',
+                'compra', 'venta' y 'spread' solo de esa fuente
+        """
+
+    def iterar_lotes(self, tamano: int = TAMANO_LOTE) -> Iterable[List[Dict]]:
+        """
+        Todo el histórico en lotes de a lo sumo `tamano` registros.
+
+        Por defecto reparte el resultado de consultar(); los backends que
+        pueden leer por partes lo redefinen para no cargar todo en memoria.
+        """
+        registros = self.consultar()
+        for i in range(0, len(registros), tamano):
+            yield registros[i:i + tamano]
+
+    def cerrar(self) -> None:
+        """Libera los recursos del backend."""
+
+
+def _en_rango(timestamp: str, desde: Optional[str], hasta: Optional[str]) -> bool:
+    # Comparación de texto: 'YYYY-MM-DD HH:MM:SS' ordena igual que las fechas.
+    # Un 'hasta' de solo fecha incluye todo ese día.
+    return (desde is None or timestamp >= desde) and (hasta is None or timestamp[:len(hasta)] <= hasta)
+
+
+def _fila_de_fuente(registro: Dict, fuente) -> Dict:
+    return {
+        'timestamp': registro['timestamp'],
+        'fuente': fuente.id,
+        'compra': registro.get(fuente.campo_compra),
+        'venta': registro.get(fuente.campo_venta),
+        'spread': registro.get(fuente.campo_spread),
+    }
+
+
+def _tipo_columna(columna: str) -> str:
+    if columna.startswith(('tc_', 'spread_')):
+        return 'REAL'
+    if columna == 'cambio_detectado':
+        return 'INTEGER'
+    return 'TEXT'
+
+
+def _a_sqlite(columna: str, valor):
+    """Normaliza valores (incluidos los textos de un CSV) al tipo de la columna."""
+    if valor is None or valor == '':
+        return None
+    tipo = _tipo_columna(columna)
+    if tipo == 'REAL':
+        return float(valor)
+    if tipo == 'INTEGER':
+        return int(valor in (True, 1, '1', 'True', 'true'))
+    return str(valor)
+
+
+def _tipar(registro: Dict) -> Dict:
+    """Fila leída de un CSV con los tipos de los demás backends (float, bool o None)."""
+    tipado = {c: _a_sqlite(c, v) for c, v in registro.items()}
+    if tipado.get('cambio_detectado') is not None:
+        tipado['cambio_detectado'] = bool(tipado['cambio_detectado'])
+    return tipado
+
+
+# ============================================================
+# BACKEND CSV
+# ============================================================
+class AlmacenamientoCSV(Almacenamiento):
+    """
+    Histórico en un archivo CSV (el formato original del proyecto).
+
+    Las filas pasan por el escritor compartido del archivo (ver
+    escritor_csv.py), que las agrupa y las escribe con bloqueo; antes de
+    leer se vuelca lo pendiente. Si el encabezado no tiene las columnas de
+    una fuente recién registrada, el archivo se migra al guardar (abrirlo
+    solo para leer, como la app web, nunca lo reescribe).
+
+    Args:
+        ruta: Ruta del archivo CSV
+    """
+
+    def __init__(self, ruta: str = RUTA_CSV_HISTORICO):
+        self.ruta = ruta
+        self._escritor = obtener_escritor(ruta, columnas_csv())
+
+    def guardar_lote(self, registros: List[Dict]) -> int:
+        try:
+            self._escritor.escribir_lote(registros)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error guardando CSV: {e}")
+            return 0
+        logger.info(f"{len(registros)} registros guardados en {self.ruta}")
+        return len(registros)
+
+    def ultimo_registro(self) -> Optional[Dict]:
+        self._escritor.vaciar()
+        registro = cargar_ultimo_registro(self.ruta)
+        return _tipar(registro) if registro else None
+
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  fuente: Optional[str] = None) -> List[Dict]:
+        self._escritor.vaciar()
+        if not os.path.exists(self.ruta):
+            return []
+        with open(self.ruta, newline='', encoding='utf-8') as f:
+            registros = [_tipar(r) for r in csv.DictReader(f) if _en_rango(r['timestamp'], desde, hasta)]
+        if fuente is None:
+            return registros
+        return [_fila_de_fuente(r, obtener_fuente(fuente)) for r in registros]
+
+    def iterar_lotes(self, tamano: int = TAMANO_LOTE) -> Iterable[List[Dict]]:
+        self._escritor.vaciar()
+        if not os.path.exists(self.ruta):
+            return
+        for lote in _leer_en_lotes(self.ruta, tamano):
+            yield [_tipar(r) for r in lote]
+
+    def vaciar(self) -> None:
+        """Escribe al archivo las filas que el escritor compartido tiene pendientes."""
+        self._escritor.vaciar()
+
+    def cerrar(self) -> None:
+        # El escritor es compartido por el proceso: solo se vacía
+        self.vaciar()
+
+
+# ============================================================
+# BACKEND SQLITE
+# ============================================================
+class AlmacenamientoSQLite(Almacenamiento):
+    """
+    Histórico en SQLite.
+
+    Guarda cada registro dos veces:
+        - `registros`: una fila ancha por ciclo (mismas columnas que el CSV),
+          indexada por timestamp
+        - `cotizaciones`: una fila por fuente y ciclo, indexada por
+          (fuente, timestamp), para consultar una sola casa de cambio
+
+    La base se abre en modo WAL, así un lector (la app, un notebook) no
+    bloquea al recolector mientras escribe.
+
+    Args:
+        ruta: Ruta del archivo .db (':memory:' para pruebas)
+    """
+
+    def __init__(self, ruta: str = RUTA_SQLITE):
+        self.ruta = ruta
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")  # seguro con WAL
+        self._crear_esquema()
+
+    def _crear_esquema(self) -> None:
+        columnas = columnas_csv()
+        definiciones = ", ".join(f'"{c}" {_tipo_columna(c)}' for c in columnas if c != 'timestamp')
+
+        with self._lock, self._conexion:
+            self._conexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS registros (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    {definiciones}
+                )""")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS cotizaciones (
+                    registro_id INTEGER NOT NULL REFERENCES registros(id),
+                    timestamp TEXT NOT NULL,
+                    fuente TEXT NOT NULL,
+                    compra REAL,
+                    venta REAL,
+                    spread REAL
+                )""")
+
+            # Fuentes registradas después de crear la base: agregar sus columnas
+            existentes = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(registros)")}
+            for columna in columnas:
+                if columna not in existentes:
+                    self._conexion.execute(f'ALTER TABLE registros ADD COLUMN "{columna}" {_tipo_columna(columna)}')
+
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_registros_timestamp ON registros(timestamp)")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cotizaciones_fuente_timestamp ON cotizaciones(fuente, timestamp)")
+
+    def guardar_lote(self, registros: List[Dict]) -> int:
+        if not registros:
+            return 0
+
+        columnas = columnas_csv()
+        fuentes = obtener_fuentes()
+        marcadores = ", ".join("?" for _ in columnas)
+        nombres = ", ".join(f'"{c}"' for c in columnas)
+
+        try:
+            # Una sola transacción para todo el lote
+            with self._lock, self._conexion:
+                cursor = self._conexion.cursor()
+                for registro in registros:
+                    cursor.execute(
+                        f"INSERT INTO registros ({nombres}) VALUES ({marcadores})",
+                        [_a_sqlite(c, registro.get(c)) for c in columnas]
+                    )
+                    registro_id = cursor.lastrowid
+                    cursor.executemany(
+                        "INSERT INTO cotizaciones (registro_id, timestamp, fuente, compra, venta, spread) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(registro_id, registro['timestamp'], f.id,
+                          _a_sqlite(f.campo_compra, registro.get(f.campo_compra)),
+                          _a_sqlite(f.campo_venta, registro.get(f.campo_venta)),
+                          _a_sqlite(f.campo_spread, registro.get(f.campo_spread)))
+                         for f in fuentes]
+                    )
+            logger.info(f"{len(registros)} registros guardados en {self.ruta}")
+            return len(registros)
+
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error guardando en SQLite: {e}")
+            return 0
+
+    def _a_dict(self, fila: sqlite3.Row) -> Dict:
+        registro = {c: fila[c] for c in fila.keys() if c != 'id'}
+        if registro.get('cambio_detectado') is not None:
+            registro['cambio_detectado'] = bool(registro['cambio_detectado'])
+        return registro
+
+    def ultimo_registro(self) -> Optional[Dict]:
+        # ORDER BY + LIMIT 1 recorre el índice de timestamp desde el final
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT * FROM registros ORDER BY timestamp DESC LIMIT 1"
+            ).fetchone()
+        return self._a_dict(fila) if fila else None
+
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  fuente: Optional[str] = None) -> List[Dict]:
+        condiciones, parametros = [], []
+        if fuente is not None:
+            condiciones.append("fuente = ?")
+            parametros.append(fuente)
+        if desde is not None:
+            condiciones.append("timestamp >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            # Un 'hasta' de solo fecha incluye todo ese día
+            condiciones.append("timestamp <= ?")
+            parametros.append(hasta if len(hasta) > 10 else hasta + " 23:59:59")
+
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        if fuente is not None:
+            consulta = (f"SELECT timestamp, fuente, compra, venta, spread FROM cotizaciones "
+                        f"{donde} ORDER BY timestamp")
+        else:
+            consulta = f"SELECT * FROM registros {donde} ORDER BY timestamp"
+
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+
+        if fuente is not None:
+            return [dict(fila) for fila in filas]
+        return [self._a_dict(fila) for fila in filas]
+
+    def iterar_lotes(self, tamano: int = TAMANO_LOTE) -> Iterable[List[Dict]]:
+        # Paginación por id: el lock se toma por página, no mientras se consume el lote
+        ultimo_id = 0
+        while True:
+            with self._lock:
+                filas = self._conexion.execute(
+                    "SELECT * FROM registros WHERE id > ? ORDER BY id LIMIT ?", (ultimo_id, tamano)
+                ).fetchall()
+            if not filas:
+                return
+            ultimo_id = filas[-1]['id']
+            yield [self._a_dict(fila) for fila in filas]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+
+# ============================================================
+# SELECCIÓN DEL BACKEND
+# ============================================================
+def _crear_parquet() -> Almacenamiento:
+    # Import diferido: pyarrow es opcional
+    from almacenamiento_parquet import AlmacenamientoParquet
+    return AlmacenamientoParquet()
+
+
+def _crear_binario() -> Almacenamiento:
+    from registro_binario import AlmacenamientoBinario
+    return AlmacenamientoBinario()
+
+
+BACKENDS = {
+    'csv': lambda: AlmacenamientoCSV(RUTA_CSV_HISTORICO),
+    'sqlite': lambda: AlmacenamientoSQLite(RUTA_SQLITE),
+    'parquet': _crear_parquet,
+    'binario': _crear_binario,
+}
+
+
+def obtener_almacenamiento(backend: Optional[str] = None) -> Almacenamiento:
+    """
+    Crea el backend configurado.
+
+    Args:
+        backend: 'csv', 'sqlite', 'parquet' o 'binario' (por defecto, TIPOCAMBIO_BACKEND o 'csv')
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de almacenamiento desconocido: {backend} (opciones: {sorted(BACKENDS)})")
+    return BACKENDS[backend]()
+
+
+# ============================================================
+# MIGRACIÓN CSV -> SQLITE
+# ============================================================
+def _leer_en_lotes(ruta: str, tamano: int) -> Iterable[List[Dict]]:
+    with open(ruta, newline='', encoding='utf-8') as f:
+        lote = []
+        for registro in csv.DictReader(f):
+            lote.append(registro)
+            if len(lote) >= tamano:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+
+def migrar_csv_a_sqlite(ruta_csv: str = RUTA_CSV_HISTORICO, ruta_db: str = RUTA_SQLITE,
+                        tamano_lote: int = TAMANO_LOTE) -> int:
+    """
+    Importa el CSV histórico a SQLite, por lotes de `tamano_lote` filas.
+
+    No se importa si la base ya tiene registros (para no duplicarlos).
+
+    Returns:
+        int: Registros importados
+    """
+    destino = AlmacenamientoSQLite(ruta_db)
+    try:
+        if destino.ultimo_registro() is not None:
+            logger.warning(f"{ruta_db} ya tiene registros; no se importa de nuevo")
+            return 0
+
+        total = 0
+        for lote in _leer_en_lotes(ruta_csv, tamano_lote):
+            total += destino.guardar_lote(lote)
+        return total
+    finally:
+        destino.cerrar()
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Herramientas del almacenamiento histórico")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    migrar = subcomandos.add_parser('migrar', help="Importar el CSV histórico a SQLite")
+    migrar.add_argument('--csv', default=RUTA_CSV_HISTORICO, help="CSV de origen")
+    migrar.add_argument('--db', default=RUTA_SQLITE, help="Base SQLite de destino")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print("   🗄️  MIGRACIÓN CSV → SQLITE")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    importados = migrar_csv_a_sqlite(args.csv, args.db)
+
+    print(f"\n  Registros importados: {importados}")
+    print(f"  Base de datos:        {os.path.abspath(args.db)}")
+    print(f"  Tiempo:               {time.perf_counter() - inicio:.2f}s")
+    print("=" * 50 + "\n")
@@ -0,0 +1,362 @@
+"""
+almacenamiento_parquet.py - Histórico columnar en Parquet particionado por mes
+
+Guarda los registros del integrador (el esquema de preparar_registro_csv)
+en archivos Parquet con columnas tipadas, en particiones estilo Hive:
+
+    data/processed/historico_parquet/anio=2025/mes=12/parte-....parquet
+
+    - Tasas y spreads como float32
+    - mejor_compra / mejor_venta como categóricas (diccionario)
+    - timestamp como timestamp nativo (sin volver a parsear textos)
+
+Al leer, los filtros por fecha descartan particiones completas y solo se
+leen las columnas pedidas: un mes de una fuente toca una sola carpeta y
+tres o cuatro columnas.
+
+Cada guardado agrega un archivo chico a su partición; `compactar()` los
+une en uno por partición (conviene correrlo con el recolector detenido o
+entre ciclos, p. ej. una vez al día).
+
+Requiere pyarrow (opcional): pip install pyarrow
+
+Uso:
+    python almacenamiento_parquet.py migrar      # importa el CSV histórico
+    python almacenamiento_parquet.py compactar   # un archivo por partición
+
+    >>> almacen = AlmacenamientoParquet()
+    >>> df = almacen.leer(desde='2025-12-01', hasta='2025-12-31', fuente='kambista')
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import obtener_fuente, columnas_csv
+from almacenamiento import Almacenamiento, RUTA_CSV_HISTORICO, TAMANO_LOTE, _leer_en_lotes
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_PARQUET = os.environ.get(
+    'TIPOCAMBIO_PARQUET',
+    os.path.join(os.path.dirname(__file__), "..", "data", "processed", "historico_parquet")
+)
+FORMATO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+DECIMALES = 4  # las tasas se guardan en float32; se redondean al leer
+
+
+def _tipo_arrow(columna: str):
+    if columna == 'timestamp':
+        return pa.timestamp('s')
+    if columna.startswith(('tc_', 'spread_')):
+        return pa.float32()
+    if columna in ('mejor_compra', 'mejor_venta'):
+        return pa.dictionary(pa.int8(), pa.string())
+    if columna == 'cambio_detectado':
+        return pa.bool_()
+    return pa.string()
+
+
+def esquema_parquet() -> "pa.Schema":
+    """Esquema tipado a partir de las columnas del registro de fuentes."""
+    return pa.schema([(c, _tipo_arrow(c)) for c in columnas_csv()])
+
+
+def _particionado() -> "ds.Partitioning":
+    return ds.partitioning(pa.schema([('anio', pa.int16()), ('mes', pa.int8())]), flavor='hive')
+
+
+def _convertir(columna: str, valor):
+    """Convierte un valor (o el texto de un CSV) al tipo Python de la columna."""
+    if valor is None or valor == '':
+        return None
+    if columna == 'timestamp':
+        return valor if isinstance(valor, datetime) else datetime.strptime(valor, FORMATO_TIMESTAMP)
+    if columna.startswith(('tc_', 'spread_')):
+        return float(valor)
+    if columna == 'cambio_detectado':
+        return valor in (True, 1, '1', 'True', 'true')
+    return str(valor)
+
+
+def _filtro_fechas(desde: Optional[str], hasta: Optional[str]):
+    """
+    Expresión de filtro por rango: primero sobre las columnas de partición
+    (descarta carpetas enteras) y luego sobre el timestamp.
+    """
+    anio, mes = ds.field('anio'), ds.field('mes')
+    filtro = None
+
+    def y(expresion):
+        nonlocal filtro
+        filtro = expresion if filtro is None else filtro & expresion
+
+    if desde:
+        inicio = datetime.fromisoformat(desde)
+        y((anio > inicio.year) | ((anio == inicio.year) & (mes >= inicio.month)))
+        y(ds.field('timestamp') >= pa.scalar(inicio, pa.timestamp('s')))
+    if hasta:
+        # Un 'hasta' de solo fecha incluye todo ese día
+        fin = datetime.fromisoformat(hasta if len(hasta) > 10 else hasta + " 23:59:59")
+        y((anio < fin.year) | ((anio == fin.year) & (mes <= fin.month)))
+        y(ds.field('timestamp') <= pa.scalar(fin, pa.timestamp('s')))
+    return filtro
+
+
+class AlmacenamientoParquet(Almacenamiento):
+    """
+    Histórico en Parquet particionado por año y mes.
+
+    Args:
+        ruta: Carpeta raíz del dataset
+
+    Raises:
+        ImportError: Si pyarrow no está instalado
+    """
+
+    def __init__(self, ruta: str = RUTA_PARQUET):
+        if not PARQUET_DISPONIBLE:
+            raise ImportError("El almacenamiento Parquet requiere pyarrow (pip install pyarrow)")
+        self.ruta = ruta
+        os.makedirs(ruta, exist_ok=True)
+
+    def _carpeta(self, anio: int, mes: int) -> str:
+        return os.path.join(self.ruta, f"anio={anio}", f"mes={mes}")
+
+    # --------------------------------------------------------
+    # Escritura
+    # --------------------------------------------------------
+    def guardar_lote(self, registros: List[Dict]) -> int:
+        if not registros:
+            return 0
+
+        columnas = columnas_csv()
+        esquema = esquema_parquet()
+        por_particion: Dict[tuple, List[Dict]] = {}
+        try:
+            for registro in registros:
+                fila = {c: _convertir(c, registro.get(c)) for c in columnas}
+                por_particion.setdefault((fila['timestamp'].year, fila['timestamp'].month), []).append(fila)
+
+            for (anio, mes), filas in por_particion.items():
+                carpeta = self._carpeta(anio, mes)
+                os.makedirs(carpeta, exist_ok=True)
+                nombre = f"parte-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+                temporal = os.path.join(carpeta, f".{nombre}")  # los lectores ignoran los ocultos
+                pq.write_table(pa.Table.from_pylist(filas, schema=esquema), temporal)
+                os.replace(temporal, os.path.join(carpeta, nombre))
+
+            logger.info(f"{len(registros)} registros guardados en {self.ruta}")
+            return len(registros)
+
+        except (OSError, ValueError, pa.ArrowException) as e:
+            logger.error(f"Error guardando en Parquet: {e}")
+            return 0
+
+    def compactar(self) -> Dict[str, int]:
+        """
+        Une los archivos de cada partición en uno solo, ordenado por timestamp.
+
+        Returns:
+            Dict {partición: archivos unidos} de las particiones compactadas
+        """
+        resultado = {}
+        for carpeta_anio in sorted(os.listdir(self.ruta)):
+            ruta_anio = os.path.join(self.ruta, carpeta_anio)
+            if not carpeta_anio.startswith('anio=') or not os.path.isdir(ruta_anio):
+                continue
+            for carpeta_mes in sorted(os.listdir(ruta_anio)):
+                carpeta = os.path.join(ruta_anio, carpeta_mes)
+                partes = sorted(a for a in os.listdir(carpeta) if a.endswith('.parquet') and not a.startswith('.'))
+                if len(partes) < 2:
+                    continue
+
+                tabla = pa.concat_tables(
+                    pq.read_table(os.path.join(carpeta, p), schema=esquema_parquet()) for p in partes
+                ).sort_by('timestamp')
+
+                nombre = f"compactado-{time.time_ns()}.parquet"
+                temporal = os.path.join(carpeta, f".{nombre}")
+                pq.write_table(tabla, temporal)
+                os.replace(temporal, os.path.join(carpeta, nombre))
+                for parte in partes:
+                    os.remove(os.path.join(carpeta, parte))
+
+                resultado[f"{carpeta_anio}/{carpeta_mes}"] = len(partes)
+                logger.info(f"Compactado {carpeta_anio}/{carpeta_mes}: {len(partes)} archivos → 1")
+        return resultado
+
+    # --------------------------------------------------------
+    # Lectura
+    # --------------------------------------------------------
+    def _dataset(self) -> "ds.Dataset":
+        return ds.dataset(self.ruta, format='parquet', partitioning=_particionado(),
+                          schema=esquema_parquet().append(pa.field('anio', pa.int16()))
+                                                  .append(pa.field('mes', pa.int8())))
+
+    def leer_tabla(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                   columnas: Optional[List[str]] = None) -> "pa.Table":
+        """
+        Lee el histórico con filtro por fechas y solo las columnas pedidas.
+
+        Args:
+            desde: Timestamp o fecha inicial
+            hasta: Timestamp o fecha final (inclusive)
+            columnas: Columnas a leer (por defecto, todas las del esquema)
+
+        Returns:
+            pa.Table ordenada por timestamp
+        """
+        columnas = columnas or columnas_csv()
+        tabla = self._dataset().to_table(columns=columnas, filter=_filtro_fechas(desde, hasta))
+        return tabla.sort_by('timestamp') if 'timestamp' in columnas else tabla
+
+    def leer(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+             fuente: Optional[str] = None, columnas: Optional[List[str]] = None):
+        """
+        Lee el histórico como DataFrame de pandas (para los notebooks).
+
+        Args:
+            desde: Timestamp o fecha inicial
+            hasta: Timestamp o fecha final (inclusive)
+            fuente: Si se indica, solo timestamp y las columnas de esa fuente
+            columnas: Columnas a leer (ignorado si se indica fuente)
+
+        Ejemplo:
+            >>> df = AlmacenamientoParquet().leer('2025-12-01', '2025-12-31', fuente='rextie')
+            >>> list(df.columns)
+            ['timestamp', 'tc_rextie_compra', 'tc_rextie_venta', 'spread_rextie']
+        """
+        if fuente is not None:
+            f = obtener_fuente(fuente)
+            columnas = ['timestamp', f.campo_compra, f.campo_venta, f.campo_spread]
+        return self.leer_tabla(desde, hasta, columnas).to_pandas()
+
+    def _a_dict(self, fila: Dict) -> Dict:
+        registro = {}
+        for columna, valor in fila.items():
+            if isinstance(valor, float):
+                valor = round(valor, DECIMALES)
+            elif isinstance(valor, datetime):
+                valor = valor.strftime(FORMATO_TIMESTAMP)
+            registro[columna] = valor
+        return registro
+
+    def ultimo_registro(self) -> Optional[Dict]:
+        # Solo se lee la partición más reciente
+        particiones = []
+        for carpeta_anio in os.listdir(self.ruta):
+            if carpeta_anio.startswith('anio='):
+                for carpeta_mes in os.listdir(os.path.join(self.ruta, carpeta_anio)):
+                    if carpeta_mes.startswith('mes='):
+                        particiones.append((int(carpeta_anio[5:]), int(carpeta_mes[4:])))
+        if not particiones:
+            return None
+
+        anio, mes = max(particiones)
+        tabla = self._dataset().to_table(
+            columns=columnas_csv(),
+            filter=(ds.field('anio') == anio) & (ds.field('mes') == mes)
+        )
+        if tabla.num_rows == 0:
+            return None
+        indice = pc.index(tabla['timestamp'], pc.max(tabla['timestamp'])).as_py()
+        return self._a_dict(tabla.slice(indice, 1).to_pylist()[0])
+
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  fuente: Optional[str] = None) -> List[Dict]:
+        if fuente is None:
+            return [self._a_dict(f) for f in self.leer_tabla(desde, hasta).to_pylist()]
+
+        f = obtener_fuente(fuente)
+        tabla = self.leer_tabla(desde, hasta, ['timestamp', f.campo_compra, f.campo_venta, f.campo_spread])
+        return [
+            self._a_dict({'timestamp': fila['timestamp'], 'fuente': fuente,
+                          'compra': fila[f.campo_compra], 'venta': fila[f.campo_venta],
+                          'spread': fila[f.campo_spread]})
+            for fila in tabla.to_pylist()
+        ]
+
+    def iterar_lotes(self, tamano: int = TAMANO_LOTE) -> Iterable[List[Dict]]:
+        # El escáner del dataset lee los archivos por partes (sin ordenar)
+        for lote in self._dataset().to_batches(columns=columnas_csv(), batch_size=tamano):
+            if lote.num_rows:
+                yield [self._a_dict(f) for f in lote.to_pylist()]
+
+
+# ============================================================
+# MIGRACIÓN CSV -> PARQUET
+# ============================================================
+def migrar_csv_a_parquet(ruta_csv: str = RUTA_CSV_HISTORICO, ruta: str = RUTA_PARQUET,
+                         tamano_lote: int = TAMANO_LOTE) -> int:
+    """
+    Importa el CSV histórico al dataset Parquet y lo compacta.
+
+    El dataset de destino se reemplaza por completo.
+
+    Returns:
+        int: Registros importados
+    """
+    if os.path.exists(ruta):
+        shutil.rmtree(ruta)
+    destino = AlmacenamientoParquet(ruta)
+
+    total = 0
+    for lote in _leer_en_lotes(ruta_csv, tamano_lote):
+        total += destino.guardar_lote(lote)
+
+    destino.compactar()
+    return total
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Histórico en Parquet particionado por mes")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    migrar = subcomandos.add_parser('migrar', help="Importar el CSV histórico (reemplaza el dataset)")
+    migrar.add_argument('--csv', default=RUTA_CSV_HISTORICO, help="CSV de origen")
+    subcomandos.add_parser('compactar', help="Unir los archivos de cada partición")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print(f"   🧱 HISTÓRICO PARQUET: {args.comando}")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    if args.comando == 'migrar':
+        print(f"\n  Registros importados: {migrar_csv_a_parquet(args.csv)}")
+    else:
+        particiones = AlmacenamientoParquet().compactar()
+        print(f"\n  Particiones compactadas: {len(particiones)}")
+
+    print(f"  Dataset: {os.path.abspath(RUTA_PARQUET)}")
+    print(f"  Tiempo:  {time.perf_counter() - inicio:.2f}s")
+    print("=" * 50 + "\n")
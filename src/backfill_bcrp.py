@@ -0,0 +1,277 @@
+"""
+backfill_bcrp.py - Carga histórica de las series del BCRP
+
+Descarga años de tipo de cambio oficial (compra y venta) partiendo el
+rango en bloques que la API acepta y bajándolos en paralelo con un límite
+de concurrencia. Cada bloque se escribe apenas llega, en orden de fechas,
+en data/processed/bcrp_historico.csv (una fila por día, incluidos los
+días 'n.d.' con tasas vacías).
+
+Un manifiesto registra los bloques terminados: si el proceso se
+interrumpe, al volver a ejecutarlo solo se descargan los que faltan.
+
+Uso:
+    python backfill_bcrp.py --desde 2015-01-01
+    python backfill_bcrp.py --desde 2015-01-01 --hasta 2020-12-31 --paralelo 2
+    python backfill_bcrp.py --desde 2015-01-01 --reiniciar
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cliente_bcrp import ClienteBCRP, obtener_cliente
+from scraper_bcrp import (
+    SERIES_COMPRA,
+    SERIES_VENTA,
+    RUTA_BCRP_HISTORICO,
+    COLUMNAS_BCRP,
+    _tiene_tasas,
+    filas_por_guardar,
+    obtener_series_bcrp
+)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_MANIFIESTO = os.path.join(os.path.dirname(__file__), "..", "data", "processed", "bcrp_backfill.json")
+
+DIAS_POR_BLOQUE = 365        # la API responde sin problemas rangos de un año
+MAX_DESCARGAS_PARALELAS = 4  # para no saturar al BCRP
+
+
+def dividir_rango(inicio: date, fin: date, dias: int = DIAS_POR_BLOQUE) -> List[Tuple[date, date]]:
+    """
+    Parte un rango de fechas en bloques consecutivos e inclusivos.
+
+    Ejemplo:
+        >>> [(i.day, f.day) for i, f in dividir_rango(date(2025, 1, 1), date(2025, 1, 10), dias=4)]
+        [(1, 4), (5, 8), (9, 10)]
+    """
+    bloques = []
+    actual = inicio
+    while actual <= fin:
+        final = min(actual + timedelta(days=dias - 1), fin)
+        bloques.append((actual, final))
+        actual = final + timedelta(days=1)
+    return bloques
+
+
+def _id_bloque(bloque: Tuple[date, date]) -> str:
+    return f"{bloque[0].isoformat()}_{bloque[1].isoformat()}"
+
+
+# ============================================================
+# MANIFIESTO DE BLOQUES TERMINADOS
+# ============================================================
+def cargar_manifiesto(ruta: str = RUTA_MANIFIESTO) -> Dict[str, int]:
+    """Bloques ya escritos ({id_bloque: filas}); vacío si no existe."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f).get('bloques', {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Manifiesto ilegible, se descargará todo de nuevo: {e}")
+        return {}
+
+
+def guardar_manifiesto(bloques: Dict[str, int], ruta: str = RUTA_MANIFIESTO) -> None:
+    """Guarda el manifiesto de forma atómica (archivo temporal + replace)."""
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'series': [SERIES_COMPRA, SERIES_VENTA], 'bloques': bloques}, f, indent=1)
+    os.replace(temporal, ruta)
+
+
+# ============================================================
+# ARCHIVO HISTÓRICO
+# ============================================================
+def _fechas_guardadas(ruta: str) -> Tuple[Set[str], Set[str]]:
+    """(fechas guardadas, fechas guardadas solo como 'n.d.')."""
+    if not os.path.exists(ruta):
+        return set(), set()
+    with open(ruta, newline='', encoding='utf-8') as f:
+        filas = list(csv.DictReader(f))
+    guardadas = {fila['fecha'] for fila in filas}
+    return guardadas, guardadas - {fila['fecha'] for fila in filas if _tiene_tasas(fila)}
+
+
+def _ordenar_archivo(ruta: str) -> None:
+    # Una fecha por fila: un día 'n.d.' que luego se publicó se queda con las tasas
+    por_fecha: Dict[str, Dict] = {}
+    with open(ruta, newline='', encoding='utf-8') as f:
+        for fila in csv.DictReader(f):
+            if fila['fecha'] not in por_fecha or _tiene_tasas(fila):
+                por_fecha[fila['fecha']] = fila
+    filas = [por_fecha[fecha] for fecha in sorted(por_fecha)]
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUMNAS_BCRP)
+        escritor.writeheader()
+        escritor.writerows(filas)
+    os.replace(temporal, ruta)
+
+
+def descargar_bloque(cliente: ClienteBCRP, bloque: Tuple[date, date]) -> List[Dict]:
+    """
+    Descarga y parsea un bloque de fechas.
+
+    Returns:
+        List[Dict]: Filas del bloque (ver scraper_bcrp.obtener_series_bcrp)
+    """
+    return obtener_series_bcrp([SERIES_COMPRA, SERIES_VENTA],
+                               bloque[0].isoformat(), bloque[1].isoformat(), cliente)
+
+
+def ejecutar_backfill(desde: date, hasta: Optional[date] = None,
+                      dias_por_bloque: int = DIAS_POR_BLOQUE,
+                      paralelo: int = MAX_DESCARGAS_PARALELAS,
+                      ruta: str = RUTA_BCRP_HISTORICO,
+                      ruta_manifiesto: str = RUTA_MANIFIESTO,
+                      cliente: Optional[ClienteBCRP] = None) -> Dict:
+    """
+    Descarga el histórico del BCRP entre dos fechas y lo agrega al CSV.
+
+    Los bloques se descargan en paralelo pero se escriben en orden: cada
+    bloque se vuelca al archivo en cuanto él y todos los anteriores llegaron,
+    así la memoria queda acotada a unos pocos bloques. Las fechas que ya
+    están en el archivo se omiten, de modo que repetir un bloque (por una
+    interrupción entre la escritura y el manifiesto) no duplica filas; los
+    días guardados como 'n.d.' que ahora traen tasas se vuelven a escribir
+    (ver scraper_bcrp.filas_por_guardar).
+
+    Args:
+        desde: Primera fecha a descargar
+        hasta: Última fecha (por defecto, hoy)
+        dias_por_bloque: Días por petición a la API
+        paralelo: Descargas simultáneas
+        ruta: CSV histórico del BCRP
+        ruta_manifiesto: Archivo con los bloques terminados
+        cliente: Cliente BCRP (por defecto, el compartido)
+
+    Returns:
+        Dict con 'bloques', 'omitidos', 'filas', 'errores' y 'segundos'
+    """
+    inicio = time.perf_counter()
+    hasta = hasta or date.today()
+    cliente = cliente or obtener_cliente()
+
+    manifiesto = cargar_manifiesto(ruta_manifiesto)
+    bloques = dividir_rango(desde, hasta, dias_por_bloque)
+    pendientes = [b for b in bloques if _id_bloque(b) not in manifiesto]
+    logger.info(f"Backfill BCRP {desde} → {hasta}: {len(bloques)} bloques, "
+                f"{len(bloques) - len(pendientes)} ya descargados")
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    guardadas, sin_datos = _fechas_guardadas(ruta)
+    ultima_guardada = max(guardadas) if guardadas else ''
+    desordenado = False
+    filas_escritas = 0
+    errores = []
+
+    with open(ruta, 'a', newline='', encoding='utf-8') as archivo, \
+            ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix='backfill') as ejecutor:
+        escritor = csv.DictWriter(archivo, fieldnames=COLUMNAS_BCRP)
+        if archivo.tell() == 0:
+            escritor.writeheader()
+
+        def escribir(bloque, futuro):
+            nonlocal desordenado, filas_escritas
+            try:
+                filas = futuro.result()
+            except Exception as e:
+                logger.error(f"Bloque {_id_bloque(bloque)} falló: {e}")
+                errores.append(_id_bloque(bloque))
+                return
+
+            # Misma regla que la consulta incremental: un día 'n.d.' se
+            # reemplaza si ahora trae tasas
+            nuevas = filas_por_guardar(filas, guardadas, sin_datos)
+            escritor.writerows(nuevas)
+            archivo.flush()
+            guardadas.update(fila['fecha'] for fila in nuevas)
+            sin_datos.difference_update(fila['fecha'] for fila in nuevas if _tiene_tasas(fila))
+            if nuevas and nuevas[0]['fecha'] <= ultima_guardada:
+                desordenado = True
+
+            # El manifiesto se actualiza solo después de escribir el bloque, y
+            # no registra el que llega hasta hoy (aún puede recibir datos)
+            if bloque[1] < date.today():
+                manifiesto[_id_bloque(bloque)] = len(filas)
+                guardar_manifiesto(manifiesto, ruta_manifiesto)
+            filas_escritas += len(nuevas)
+            logger.info(f"Bloque {_id_bloque(bloque)}: {len(nuevas)} filas nuevas")
+
+        # A lo sumo `paralelo` bloques en vuelo por delante del próximo a escribir
+        futuros = {}
+        siguiente = 0
+        for indice, bloque in enumerate(pendientes):
+            futuros[indice] = ejecutor.submit(descargar_bloque, cliente, bloque)
+
+            while siguiente in futuros and (futuros[siguiente].done() or len(futuros) > paralelo):
+                escribir(pendientes[siguiente], futuros.pop(siguiente))
+                siguiente += 1
+
+        for indice in sorted(futuros):
+            escribir(pendientes[indice], futuros[indice])
+
+    # Si se completó un rango anterior a lo ya guardado, reordenar una vez
+    if desordenado:
+        _ordenar_archivo(ruta)
+
+    return {
+        'bloques': len(pendientes),
+        'omitidos': len(bloques) - len(pendientes),
+        'filas': filas_escritas,
+        'errores': errores,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga histórica del tipo de cambio del BCRP")
+    parser.add_argument('--desde', required=True, type=date.fromisoformat, help="Fecha inicial YYYY-MM-DD")
+    parser.add_argument('--hasta', type=date.fromisoformat, default=None, help="Fecha final (por defecto, hoy)")
+    parser.add_argument('--dias-bloque', type=int, default=DIAS_POR_BLOQUE, help="Días por petición")
+    parser.add_argument('--paralelo', type=int, default=MAX_DESCARGAS_PARALELAS, help="Descargas simultáneas")
+    parser.add_argument('--reiniciar', action='store_true', help="Ignorar el manifiesto y revisar todos los bloques")
+    args = parser.parse_args()
+
+    if args.reiniciar and os.path.exists(RUTA_MANIFIESTO):
+        os.remove(RUTA_MANIFIESTO)
+
+    print("\n" + "=" * 50)
+    print("   📥 BACKFILL HISTÓRICO - BCRP")
+    print("=" * 50)
+
+    resumen = ejecutar_backfill(args.desde, args.hasta, args.dias_bloque, args.paralelo)
+
+    print(f"\n  Bloques descargados: {resumen['bloques']} (omitidos: {resumen['omitidos']})")
+    print(f"  Filas nuevas:        {resumen['filas']}")
+    print(f"  Tiempo:              {resumen['segundos']}s")
+    if resumen['errores']:
+        print(f"  ❌ Bloques con error (se reintentan en la próxima ejecución): {resumen['errores']}")
+    else:
+        print("\n✅ BACKFILL COMPLETO")
+    print("=" * 50 + "\n")
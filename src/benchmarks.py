@@ -0,0 +1,316 @@
+"""
+benchmarks.py - Mediciones de rendimiento offline
+
+Reúne los benchmarks del proyecto. Cada uno corre sin red ni navegador,
+usando los fixtures de data/fixtures/.
+
+Uso:
+    python benchmarks.py extraccion      # parser DOM vs. regex sobre todo el HTML
+    python benchmarks.py ultimo_registro # lectura de cola vs. CSV completo
+    python benchmarks.py metricas        # métricas por registro vs. vectorizadas
+    python benchmarks.py modelo          # memoria de dicts anchos vs. Instantanea
+    python benchmarks.py submuestreo     # tamaño del gráfico completo vs. LTTB
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import deque
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(__file__), "..", "data", "fixtures")
+
+
+def _cronometrar(funcion, repeticiones: int) -> float:
+    """Devuelve los milisegundos promedio por llamada."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+# ============================================================
+# BENCHMARK: EXTRACCIÓN DOM
+# ============================================================
+def _escaneo_regex_legado(html: str) -> list:
+    """Método anterior: regex sobre todo el HTML y deduplicado con listas."""
+    valores_tc = []
+    for m in re.findall(r'[\d]+\.[\d]{2,4}', html):
+        valor = float(m)
+        if 3.30 <= valor <= 3.50:
+            valor_redondeado = round(valor, 4)
+            if valor_redondeado not in valores_tc:
+                valores_tc.append(valor_redondeado)
+    return sorted(valores_tc)
+
+
+def benchmark_extraccion(repeticiones: int = 200) -> None:
+    from extraccion_dom import extraer_textos_html, interpretar_textos
+    from scraper_kambista import ESPECIFICACION_DOM as SPEC_KAMBISTA
+    from scraper_rextie import ESPECIFICACION_DOM as SPEC_REXTIE
+
+    print(f"\n{'Fuente':<10} │ {'HTML (KB)':>9} │ {'Texto (B)':>9} │ "
+          f"{'Regex (ms)':>10} │ {'DOM (ms)':>8} │ {'Spec (ms)':>9} │ Resultado")
+    print("─" * 100)
+
+    for nombre, spec in (('kambista', SPEC_KAMBISTA), ('rextie', SPEC_REXTIE)):
+        with open(os.path.join(RUTA_FIXTURES, f"{nombre}.html"), encoding='utf-8') as f:
+            html = f.read()
+
+        textos = extraer_textos_html(html, spec)
+        bytes_texto = sum(len(t.encode('utf-8')) for t in textos.values() if t)
+
+        # Ambos lados parten del mismo HTML: la extracción DOM se cronometra completa
+        ms_regex = _cronometrar(lambda: _escaneo_regex_legado(html), repeticiones)
+        ms_dom = _cronometrar(lambda: interpretar_textos(extraer_textos_html(html, spec), spec),
+                              max(1, repeticiones // 10))
+        ms_spec = _cronometrar(lambda: interpretar_textos(textos, spec), repeticiones)
+
+        legado = _escaneo_regex_legado(html)
+        compra, venta = interpretar_textos(textos, spec)
+
+        print(f"{nombre:<10} │ {len(html) / 1024:>9.1f} │ {bytes_texto:>9} │ "
+              f"{ms_regex:>10.3f} │ {ms_dom:>8.3f} │ {ms_spec:>9.4f} │ "
+              f"spec=({compra}, {venta}) regex=({legado[0]}, {legado[-1]}) de {len(legado)} candidatos")
+
+    print("\nRegex = escaneo anterior sobre el HTML completo; DOM = selectores sobre el mismo")
+    print("HTML (BeautifulSoup) + interpretación; Spec = solo la interpretación de los textos")
+    print("que devuelve el navegador (el costo en producción, donde el DOM ya está parseado).")
+
+
+# ============================================================
+# BENCHMARK: ÚLTIMO REGISTRO DEL HISTÓRICO
+# ============================================================
+RUTA_CSV_HISTORICO = os.path.join(os.path.dirname(__file__), "..", "data", "processed", "tipo_cambio_historico.csv")
+MAX_FILAS_LEGADO = 500_000
+
+
+def _cargar_ultimo_registro_legado(ruta: str) -> dict:
+    """Método anterior: parsear todo el CSV para quedarse con la última fila."""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        registros = list(csv.DictReader(f))
+    return registros[-1] if registros else None
+
+
+def _generar_historico(ruta: str, filas: int) -> None:
+    """Crea un CSV con el esquema real repitiendo las filas del histórico."""
+    with open(RUTA_CSV_HISTORICO, encoding='utf-8') as f:
+        encabezado, *muestra = f.read().splitlines(keepends=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(encabezado)
+        for i in range(filas):
+            f.write(muestra[i % len(muestra)])
+
+
+def benchmark_ultimo_registro(tamanos=(5, 50_000, 500_000, 5_000_000)) -> None:
+    from utils import cargar_ultimo_registro
+
+    print(f"\n{'Filas':>10} │ {'Archivo (MB)':>12} │ {'CSV completo (ms)':>17} │ {'Cola (ms)':>9} │ Mismo resultado")
+    print("─" * 76)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        for filas in tamanos:
+            ruta = os.path.join(carpeta, f"historico_{filas}.csv")
+            _generar_historico(ruta, filas)
+
+            # El método anterior carga todo en memoria: sobre cierto tamaño no se mide
+            if filas <= MAX_FILAS_LEGADO:
+                ms_legado = f"{_cronometrar(lambda: _cargar_ultimo_registro_legado(ruta), 1 if filas > 100_000 else 20):.2f}"
+            else:
+                ms_legado = "(sin memoria)"
+            ms_cola = _cronometrar(lambda: cargar_ultimo_registro(ruta), 2000)
+
+            with open(ruta, encoding='utf-8') as f:
+                referencia = deque(csv.DictReader(f), maxlen=1)[0]
+            igual = referencia == cargar_ultimo_registro(ruta)
+
+            print(f"{filas:>10,} │ {os.path.getsize(ruta) / 1e6:>12.1f} │ {ms_legado:>17} │ "
+                  f"{ms_cola:>9.4f} │ {igual}")
+            os.remove(ruta)
+
+    print("\nCSV completo = list(csv.DictReader(f))[-1]; Cola = lectura desde el final del archivo.")
+
+
+# ============================================================
+# BENCHMARK: MÉTRICAS VECTORIZADAS
+# ============================================================
+MAX_FILAS_ESCALAR = 200_000
+
+
+def _tasas_aleatorias(filas: int, fuentes: int, semilla: int = 0):
+    """Tasas con 4 decimales, spreads positivos y ~5% de fuentes fallidas (NaN)."""
+    import numpy as np
+
+    generador = np.random.default_rng(semilla)
+    compras = np.round(3.70 + generador.normal(0, 0.03, (filas, fuentes)), 4)
+    ventas = np.round(compras + generador.uniform(0.001, 0.05, (filas, fuentes)), 4)
+    fallidas = generador.random((filas, fuentes)) < 0.05
+    compras[fallidas] = np.nan
+    ventas[fallidas] = np.nan
+    return compras, ventas
+
+
+def _metricas_escalares(compras, ventas, nombres) -> list:
+    """Método actual: utils por registro, como integrador.calcular_metricas."""
+    from utils import calcular_ahorro, calcular_spread, determinar_mejor_opcion
+
+    resultados = []
+    for fila_compras, fila_ventas in zip(compras.tolist(), ventas.tolist()):
+        tasas_compra = {n: None if c != c else c for n, c in zip(nombres, fila_compras)}
+        tasas_venta = {n: None if v != v else v for n, v in zip(nombres, fila_ventas)}
+        resultados.append((
+            [calcular_spread(tasas_compra[n], tasas_venta[n]) for n in nombres],
+            determinar_mejor_opcion(tasas_venta, 'compra'),
+            determinar_mejor_opcion(tasas_compra, 'venta'),
+            calcular_ahorro(tasas_venta),
+            calcular_ahorro(tasas_compra),
+        ))
+    return resultados
+
+
+def _mismos_resultados(escalares: list, lote, nombres) -> bool:
+    import math
+
+    def igual(a, b):
+        return (a is None and math.isnan(b)) or a == b
+
+    mejores_compra = lote.nombres_mejor_compra(nombres)
+    mejores_venta = lote.nombres_mejor_venta(nombres)
+    for i, (spreads, compra, venta, ahorro, ganancia) in enumerate(escalares):
+        if not all(igual(s, v) for s, v in zip(spreads, lote.spreads[i].tolist())):
+            return False
+        if compra != mejores_compra[i] or venta != mejores_venta[i]:
+            return False
+        if not igual(ahorro, float(lote.ahorro_compra[i])) or not igual(ganancia, float(lote.ganancia_venta[i])):
+            return False
+    return True
+
+
+def benchmark_metricas(tamanos=(1_000, 100_000, 1_000_000), fuentes: int = 3) -> None:
+    from metricas import calcular_metricas_lote
+
+    nombres = [f"Fuente{i}" for i in range(fuentes)]
+
+    print(f"\n{'Filas':>10} │ {'Por registro (ms)':>17} │ {'Vectorizado (ms)':>16} │ {'Aceleración':>11} │ Mismo resultado")
+    print("─" * 80)
+
+    for filas in tamanos:
+        compras, ventas = _tasas_aleatorias(filas, fuentes)
+        ms_lote = _cronometrar(lambda: calcular_metricas_lote(compras, ventas), 1 if filas > 100_000 else 10)
+
+        if filas <= MAX_FILAS_ESCALAR:
+            inicio = time.perf_counter()
+            escalares = _metricas_escalares(compras, ventas, nombres)
+            ms_escalar = (time.perf_counter() - inicio) * 1000
+            igual = _mismos_resultados(escalares, calcular_metricas_lote(compras, ventas), nombres)
+            columnas = f"{ms_escalar:>17.1f} │ {ms_lote:>16.2f} │ {ms_escalar / ms_lote:>10.0f}x │ {igual}"
+        else:
+            columnas = f"{'(omitido)':>17} │ {ms_lote:>16.2f} │ {'':>11} │ -"
+
+        print(f"{filas:>10,} │ {columnas}")
+
+    print(f"\nPor registro = calcular_spread/determinar_mejor_opcion/calcular_ahorro; "
+          f"{fuentes} fuentes, ~5% fallidas.")
+
+
+# ============================================================
+# BENCHMARK: MODELO TIPADO
+# ============================================================
+def _medir_memoria(crear) -> tuple:
+    """Devuelve (objeto, bytes asignados al crearlo)."""
+    import tracemalloc
+
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = crear()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, despues - antes
+
+
+def benchmark_modelo(filas: int = 100_000) -> None:
+    from modelo import Instantanea
+    from utils import hubo_cambio
+    from fuentes import campos_tasas
+
+    with open(RUTA_CSV_HISTORICO, encoding='utf-8') as f:
+        muestra = list(csv.DictReader(f))
+    instantaneas_muestra = [Instantanea.desde_registro(r) for r in muestra]
+    datos_muestra = [i.a_datos() for i in instantaneas_muestra]
+
+    # Copias independientes, como un histórico cargado en memoria
+    dicts, bytes_dicts = _medir_memoria(
+        lambda: [dict(datos_muestra[i % len(datos_muestra)]) for i in range(filas)])
+    instantaneas, bytes_instantaneas = _medir_memoria(
+        lambda: [Instantanea.desde_registro(muestra[i % len(muestra)]) for i in range(filas)])
+
+    ms_dicts = _cronometrar(lambda: [hubo_cambio(b, a, campos_tasas()) for a, b in zip(dicts, dicts[1:1001])], 5)
+    ms_instantaneas = _cronometrar(
+        lambda: [b.hubo_cambio(a) for a, b in zip(instantaneas, instantaneas[1:1001])], 5)
+
+    print(f"\n{'Modelo':<22} │ {'Memoria (MB)':>12} │ {'B/registro':>10} │ {'hubo_cambio x1000 (ms)':>22}")
+    print("─" * 76)
+    print(f"{'dict ancho':<22} │ {bytes_dicts / 1e6:>12.1f} │ {bytes_dicts / filas:>10.0f} │ {ms_dicts:>22.2f}")
+    print(f"{'Instantanea/Cotizacion':<22} │ {bytes_instantaneas / 1e6:>12.1f} │ "
+          f"{bytes_instantaneas / filas:>10.0f} │ {ms_instantaneas:>22.2f}")
+    print(f"\n{filas:,} registros del histórico; dict ancho = el que devolvía el integrador.")
+
+
+# ============================================================
+# BENCHMARK: SUBMUESTREO DE GRÁFICOS
+# ============================================================
+def benchmark_submuestreo(tamanos=(10_000, 100_000, 525_600), series: int = 6) -> None:
+    import json
+    import numpy as np
+    from submuestreo import PUNTOS_GRAFICO, lttb
+
+    def carga(x, y) -> int:
+        # Lo que viaja a Plotly por serie: fechas como texto y valores
+        return len(json.dumps({'x': [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(s)) for s in x.tolist()],
+                               'y': y.tolist()}))
+
+    print(f"\n{'Puntos':>10} │ {'Completo (KB)':>13} │ {'LTTB (KB)':>9} │ {'LTTB (ms)':>9}")
+    print("─" * 52)
+
+    for puntos in tamanos:
+        x = np.arange(puntos, dtype=np.int64) * 60 + 1_765_000_000  # un registro por minuto
+        y = 3.4 + np.cumsum(np.random.default_rng(0).normal(0, 0.0005, puntos))
+        ms = _cronometrar(lambda: lttb(x, y, PUNTOS_GRAFICO), 5)
+        elegidos = lttb(x, y, PUNTOS_GRAFICO)
+        completo = carga(x, y) * series / 1e3
+        reducido = carga(x[elegidos], y[elegidos]) * series / 1e3
+        print(f"{puntos:>10,} │ {completo:>13,.0f} │ {reducido:>9,.0f} │ {ms:>9.1f}")
+
+    print(f"\n{series} series por gráfico, reducidas a {PUNTOS_GRAFICO} puntos.")
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+BENCHMARKS = {
+    'extraccion': benchmark_extraccion,
+    'ultimo_registro': benchmark_ultimo_registro,
+    'metricas': benchmark_metricas,
+    'modelo': benchmark_modelo,
+    'submuestreo': benchmark_submuestreo,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks offline de TipoCambio.pe")
+    parser.add_argument('nombre', choices=sorted(BENCHMARKS), help="Benchmark a ejecutar")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print(f"   BENCHMARK: {args.nombre}")
+    print("=" * 60)
+    BENCHMARKS[args.nombre]()
+    print("=" * 60 + "\n")
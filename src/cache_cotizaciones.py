@@ -0,0 +1,169 @@
+"""
+cache_cotizaciones.py - Caché compartido de cotizaciones para la app web
+
+Guarda la última cotización de cada fuente a nivel de proceso, con un TTL
+por fuente. Si 50 visitantes piden Kambista a la vez, se lanza un solo
+scraping (single-flight) y todos esperan ese mismo resultado.
+
+Cuando el dato venció pero existe, se devuelve el valor anterior de
+inmediato y se refresca en segundo plano (stale-while-revalidate).
+
+Uso:
+    >>> cache = CacheCotizaciones(cargar=ejecutar_scraper, ttl=lambda id: 300)
+    >>> await cache.obtener('kambista')
+    Cotizacion('kambista', compra=3.385, venta=3.405, exito=True, estado='ok', latencia=4.2)
+    >>> cache.estadisticas()
+    {'aciertos': 0, 'fallos': 1, ...}
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modelo import Cotizacion
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EntradaCache:
+    """Valor cacheado de una fuente y el momento en que se obtuvo."""
+
+    __slots__ = ('valor', 'obtenido_en')
+
+    def __init__(self, valor: Cotizacion):
+        self.valor = valor
+        self.obtenido_en = time.monotonic()
+
+    def edad(self) -> float:
+        return time.monotonic() - self.obtenido_en
+
+
+class CacheCotizaciones:
+    """
+    Caché asíncrono de cotizaciones con single-flight y refresco en fondo.
+
+    Solo se guardan resultados exitosos: si un refresco falla se conserva
+    el último valor bueno para valor(), instantanea() y obtener(), pero
+    refrescar() devuelve el fallo, así quien refresca sabe que no obtuvo
+    un dato nuevo. El fallo no se cachea (el próximo pedido vuelve a intentar).
+
+    Args:
+        cargar: Corrutina que obtiene la cotización de una fuente por su id
+        ttl: Función que da el TTL en segundos de cada fuente
+    """
+
+    def __init__(self, cargar: Callable[[str], Awaitable[Cotizacion]],
+                 ttl: Callable[[str], float]):
+        self._cargar = cargar
+        self._ttl = ttl
+        self._entradas: Dict[str, EntradaCache] = {}
+        self._en_vuelo: Dict[str, asyncio.Task] = {}
+        self._contadores = {
+            'aciertos': 0,      # valor vigente servido desde el caché
+            'obsoletos': 0,     # valor vencido servido mientras se refresca
+            'fallos': 0,        # no había valor: hubo que esperar el scraping
+            'compartidos': 0,   # pedidos que se unieron a un scraping en curso
+            'refrescos': 0,     # scrapings realmente lanzados
+            'errores': 0,       # scrapings que no devolvieron datos válidos
+        }
+
+    # --------------------------------------------------------
+    # Lectura
+    # --------------------------------------------------------
+    async def obtener(self, id_fuente: str) -> Cotizacion:
+        """
+        Devuelve la cotización de una fuente, refrescándola si hace falta.
+
+        Args:
+            id_fuente: Id de la fuente en el registro
+
+        Returns:
+            Cotizacion de la fuente
+        """
+        entrada = self._entradas.get(id_fuente)
+
+        if entrada is not None:
+            if entrada.edad() < self._ttl(id_fuente):
+                self._contadores['aciertos'] += 1
+                return entrada.valor
+
+            # Vencido: servir el valor anterior y refrescar en segundo plano
+            self._contadores['obsoletos'] += 1
+            self._lanzar_refresco(id_fuente)
+            return entrada.valor
+
+        self._contadores['fallos'] += 1
+        return await asyncio.shield(self._lanzar_refresco(id_fuente))
+
+    async def refrescar(self, id_fuente: str) -> Cotizacion:
+        """
+        Fuerza un refresco (compartido con cualquier otro en curso).
+
+        Returns:
+            Cotizacion con el resultado del scraping: si falló, una con
+            exito=False aunque el caché conserve un valor anterior
+        """
+        return await asyncio.shield(self._lanzar_refresco(id_fuente))
+
+    def valor(self, id_fuente: str) -> Optional[Cotizacion]:
+        """Último valor bueno de la fuente, sin refrescar (o None)."""
+        entrada = self._entradas.get(id_fuente)
+        return entrada.valor if entrada is not None else None
+
+    def instantanea(self, ids: Optional[list] = None) -> Dict[str, Optional[Cotizacion]]:
+        """
+        Últimos valores buenos de varias fuentes, sin refrescar.
+
+        Args:
+            ids: Ids a incluir (por defecto, todas las cacheadas)
+
+        Returns:
+            Dict {id_fuente: valor o None}
+        """
+        ids = ids if ids is not None else list(self._entradas)
+        return {i: self.valor(i) for i in ids}
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores de aciertos, fallos, refrescos, etc."""
+        return dict(self._contadores, en_vuelo=len(self._en_vuelo))
+
+    # --------------------------------------------------------
+    # Refresco (single-flight)
+    # --------------------------------------------------------
+    def _lanzar_refresco(self, id_fuente: str) -> asyncio.Task:
+        # shield() en los llamadores: si un cliente se desconecta, su
+        # cancelación no debe abortar el scraping que esperan los demás
+        tarea = self._en_vuelo.get(id_fuente)
+        if tarea is not None:
+            self._contadores['compartidos'] += 1
+            return tarea
+
+        tarea = asyncio.get_running_loop().create_task(self._refrescar(id_fuente))
+        self._en_vuelo[id_fuente] = tarea
+        tarea.add_done_callback(lambda _: self._en_vuelo.pop(id_fuente, None))
+        return tarea
+
+    async def _refrescar(self, id_fuente: str) -> Cotizacion:
+        self._contadores['refrescos'] += 1
+        try:
+            valor = await self._cargar(id_fuente)
+        except Exception as e:
+            logger.error(f"Error refrescando {id_fuente}: {e}")
+            valor = Cotizacion.fallida(id_fuente)
+
+        if valor.exito:
+            self._entradas[id_fuente] = EntradaCache(valor)
+        else:
+            self._contadores['errores'] += 1
+        return valor
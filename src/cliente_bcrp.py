@@ -0,0 +1,363 @@
+"""
+cliente_bcrp.py - Cliente de la API de series estadísticas del BCRP
+
+Mantiene una `requests.Session` persistente (keep-alive) contra la API del
+BCRP, reintenta errores transitorios con backoff exponencial acotado y
+guarda las respuestas en un caché en disco, una por combinación de series
+y rango de fechas.
+
+Las series del BCRP cambian una vez al día, así que:
+    - Mientras una respuesta está fresca se sirve desde el disco sin red
+    - Al vencer se revalida con If-None-Match / If-Modified-Since; un 304
+      solo renueva la frescura de la copia local
+    - Si la API falla y hay copia local (aunque vencida), se usa esa
+
+Uso:
+    >>> cliente = ClienteBCRP()
+    >>> datos = cliente.obtener_series(['PD04638PD', 'PD04639PD'],
+    ...                                '2025-12-01', '2025-12-13')
+    >>> cliente.estadisticas()
+    {'cache': 0, 'revalidadas': 0, 'descargas': 1, 'respaldo': 0}
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import obtener_fuente
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+BASE_URL = os.environ.get('BCRP_API_URL', "https://estadisticas.bcrp.gob.pe/estadisticas/series/api")
+FORMATO = "json"
+# El peor caso de una consulta (ver duracion_maxima) debe caber en el
+# plazo del BCRP en fuentes.py: si no, el integrador abandona el hilo a
+# mitad de un reintento y este sigue corriendo en segundo plano
+PLAZO = obtener_fuente('bcrp').plazo
+TIMEOUT_CONEXION = 3.05       # segundos para abrir la conexión
+TIMEOUT = 6                   # segundos de lectura por intento
+REINTENTOS = 2                # reintentos ante errores transitorios
+BACKOFF = 0.5                 # espera base: 0.5s, 1s, 2s...
+BACKOFF_MAXIMO = 4            # tope de cada espera entre reintentos (segundos)
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+RUTA_CACHE = os.path.join(os.path.dirname(__file__), "..", "data", "cache", "bcrp")
+# Tiempo que una respuesta se sirve del disco sin consultar la API (segundos).
+# Los rangos que terminan antes de hoy ya no cambian y duran más.
+FRESCURA_CACHE = int(os.environ.get('BCRP_FRESCURA_CACHE', 3 * 60 * 60))
+FRESCURA_HISTORICA = 7 * 24 * 60 * 60
+# Las fechas del BCRP son de Lima: "hoy" se decide en esta zona, no en la del servidor
+ZONA_LIMA = timezone(timedelta(hours=-5))
+
+HEADERS_BCRP = {
+    "User-Agent": "TipoCambio.pe/1.0 (+https://github.com/JavierAnthonyUS/TipoCambio.pe)",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+def duracion_maxima(timeout: float = TIMEOUT, reintentos: int = REINTENTOS,
+                    backoff: float = BACKOFF) -> float:
+    """
+    Segundos que puede tardar una consulta en el peor caso: todos los
+    intentos agotan la conexión y la lectura, más las esperas entre ellos.
+    """
+    esperas = sum(min(backoff * 2 ** i, BACKOFF_MAXIMO) for i in range(reintentos))
+    return (TIMEOUT_CONEXION + timeout) * (reintentos + 1) + esperas
+
+
+if duracion_maxima() > PLAZO:
+    logger.warning(f"Los reintentos del BCRP ({duracion_maxima():.1f}s) exceden su plazo ({PLAZO}s)")
+
+
+def crear_reintentos(total: int = REINTENTOS, backoff: float = BACKOFF) -> Retry:
+    """
+    Política de reintentos para GET: errores de conexión y estados 429/5xx.
+
+    Tras agotar los reintentos se devuelve la última respuesta (y no un
+    RetryError), para que `raise_for_status` informe el código real.
+    Retry-After no se respeta: podría pedir esperas más largas que el plazo.
+    """
+    opciones = dict(
+        total=total,
+        backoff_factor=backoff,
+        status_forcelist=ESTADOS_REINTENTABLES,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_max=BACKOFF_MAXIMO, **opciones)
+    except TypeError:  # urllib3 < 2 no acepta backoff_max
+        return Retry(**opciones)
+
+
+class ClienteBCRP:
+    """
+    Cliente de la API del BCRP con sesión persistente, reintentos y caché.
+
+    Args:
+        base_url: URL base de la API (o la de un servidor simulado)
+        ruta_cache: Carpeta del caché en disco (None = sin caché)
+        frescura: Segundos que una respuesta se usa sin revalidar
+        timeout: Timeout de lectura de cada intento en segundos
+        reintentos: Reintentos ante errores transitorios
+        sesion: Sesión a usar (por defecto, una propia con reintentos)
+    """
+
+    def __init__(self, base_url: str = BASE_URL,
+                 ruta_cache: Optional[str] = RUTA_CACHE,
+                 frescura: float = FRESCURA_CACHE,
+                 timeout: float = TIMEOUT,
+                 reintentos: int = REINTENTOS,
+                 sesion: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip('/')
+        self.ruta_cache = ruta_cache
+        self.frescura = frescura
+        self.timeout = timeout
+        self.sesion = sesion or self._crear_sesion(reintentos)
+        self._contadores = {
+            'cache': 0,         # servidas del disco sin tocar la red
+            'revalidadas': 0,   # 304: la copia local seguía vigente
+            'descargas': 0,     # 200 con cuerpo nuevo
+            'respaldo': 0,      # la API falló y se usó la copia vencida
+        }
+        self._lock = threading.Lock()
+
+        if self.ruta_cache:
+            os.makedirs(self.ruta_cache, exist_ok=True)
+
+    @staticmethod
+    def _crear_sesion(reintentos: int) -> requests.Session:
+        sesion = requests.Session()
+        adaptador = HTTPAdapter(max_retries=crear_reintentos(reintentos),
+                                pool_connections=4, pool_maxsize=8)
+        sesion.mount("https://", adaptador)
+        sesion.mount("http://", adaptador)
+        sesion.headers.update(HEADERS_BCRP)
+        return sesion
+
+    def construir_url(self, series: List[str], fecha_inicio: str, fecha_fin: str,
+                      formato: str = FORMATO) -> str:
+        """
+        URL de consulta de una o varias series en un rango de fechas.
+
+        Ejemplo:
+            >>> ClienteBCRP().construir_url(['PD04638PD', 'PD04639PD'], '2025-12-01', '2025-12-13')
+            'https://estadisticas.bcrp.gob.pe/estadisticas/series/api/PD04638PD-PD04639PD/json/2025-12-01/2025-12-13'
+        """
+        return f"{self.base_url}/{'-'.join(series)}/{formato}/{fecha_inicio}/{fecha_fin}"
+
+    # --------------------------------------------------------
+    # Consulta
+    # --------------------------------------------------------
+    def obtener_series(self, series: List[str], fecha_inicio: str, fecha_fin: str,
+                       frescura: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Descarga (o lee del caché) una o varias series en un rango de fechas.
+
+        Args:
+            series: Códigos de series, p. ej. ['PD04638PD', 'PD04639PD']
+            fecha_inicio: Fecha inicial 'YYYY-MM-DD'
+            fecha_fin: Fecha final 'YYYY-MM-DD'
+            frescura: Segundos de frescura para esta consulta (por defecto,
+                la del cliente; los rangos ya cerrados duran una semana)
+
+        Returns:
+            Dict: Respuesta JSON de la API ('config' y 'periods')
+
+        Raises:
+            requests.exceptions.RequestException: Si la API falla y no hay
+                copia local
+            ValueError: Si la respuesta no es JSON válido
+        """
+        url = self.construir_url(series, fecha_inicio, fecha_fin)
+        clave = self._clave(series, fecha_inicio, fecha_fin)
+        entrada = self._leer_cache(clave)
+
+        if entrada is not None and frescura is None:
+            # max-age del servidor si lo envió; los rangos cerrados duran más
+            frescura = entrada.get('max_age', self.frescura)
+            if fecha_fin < datetime.now(ZONA_LIMA).strftime("%Y-%m-%d"):
+                frescura = max(frescura, FRESCURA_HISTORICA)
+
+        if entrada is not None and time.time() - entrada['guardado_en'] < frescura:
+            self._contar('cache')
+            return entrada['cuerpo']
+
+        headers = {}
+        if entrada is not None:
+            if entrada.get('etag'):
+                headers['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                headers['If-Modified-Since'] = entrada['last_modified']
+
+        try:
+            response = self.sesion.get(url, headers=headers, timeout=(TIMEOUT_CONEXION, self.timeout))
+
+            if response.status_code == 304 and entrada is not None:
+                self._contar('revalidadas')
+                entrada['guardado_en'] = time.time()
+                self._escribir_cache(clave, entrada)
+                return entrada['cuerpo']
+
+            response.raise_for_status()
+            cuerpo = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if entrada is None:
+                raise
+            logger.warning(f"BCRP no disponible ({e}); usando copia local de {clave}")
+            self._contar('respaldo')
+            return entrada['cuerpo']
+
+        self._contar('descargas')
+        self._escribir_cache(clave, self._nueva_entrada(url, response, cuerpo))
+        return cuerpo
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores de respuestas servidas desde caché, revalidadas, etc."""
+        with self._lock:
+            return dict(self._contadores)
+
+    def limpiar_cache(self) -> int:
+        """
+        Borra las respuestas guardadas en disco.
+
+        Returns:
+            int: Número de archivos eliminados
+        """
+        if not self.ruta_cache:
+            return 0
+        borrados = 0
+        for nombre in os.listdir(self.ruta_cache):
+            if nombre.endswith('.json'):
+                os.remove(os.path.join(self.ruta_cache, nombre))
+                borrados += 1
+        return borrados
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones de la sesión."""
+        self.sesion.close()
+
+    # --------------------------------------------------------
+    # Caché en disco
+    # --------------------------------------------------------
+    def _contar(self, contador: str) -> None:
+        with self._lock:
+            self._contadores[contador] += 1
+
+    @staticmethod
+    def _clave(series: List[str], fecha_inicio: str, fecha_fin: str) -> str:
+        return re.sub(r'[^\w.-]', '_', f"{'-'.join(series)}_{fecha_inicio}_{fecha_fin}")
+
+    @staticmethod
+    def _nueva_entrada(url: str, response: requests.Response, cuerpo: Any) -> Dict:
+        entrada = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'guardado_en': time.time(),
+            'cuerpo': cuerpo,
+        }
+        max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        if max_age:
+            entrada['max_age'] = int(max_age.group(1))
+        return entrada
+
+    def _leer_cache(self, clave: str) -> Optional[Dict]:
+        if not self.ruta_cache:
+            return None
+        try:
+            with open(os.path.join(self.ruta_cache, f"{clave}.json"), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché ilegible {clave}: {e}")
+            return None
+
+    def _escribir_cache(self, clave: str, entrada: Dict) -> None:
+        if not self.ruta_cache:
+            return
+        ruta = os.path.join(self.ruta_cache, f"{clave}.json")
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(entrada, f, ensure_ascii=False)
+            os.replace(temporal, ruta)  # atómico: nunca se lee un archivo a medias
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en caché {clave}: {e}")
+
+
+# ============================================================
+# CLIENTE COMPARTIDO DEL PROCESO
+# ============================================================
+_cliente: Optional[ClienteBCRP] = None
+_cliente_lock = threading.Lock()
+
+
+def obtener_cliente() -> ClienteBCRP:
+    """
+    Devuelve el cliente compartido del proceso, creándolo la primera vez.
+
+    Returns:
+        ClienteBCRP: Cliente con la configuración por defecto
+    """
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteBCRP()
+        return _cliente
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL (para testing)
+# ============================================================
+if __name__ == "__main__":
+    import tempfile
+
+    from servidor_simulado import iniciar_servidor, RUTA_BCRP
+
+    print("\n" + "=" * 50)
+    print("   TEST: Cliente BCRP contra servidor simulado")
+    print("=" * 50)
+
+    servidor, url_base = iniciar_servidor()
+    series = ['PD04638PD', 'PD04639PD']
+
+    try:
+        with tempfile.TemporaryDirectory() as carpeta:
+            cliente = ClienteBCRP(base_url=url_base + RUTA_BCRP, ruta_cache=carpeta)
+
+            for etiqueta, frescura in [('Descarga', None), ('Caché', None), ('Revalidación', 0)]:
+                inicio = time.perf_counter()
+                datos = cliente.obtener_series(series, '2025-12-11', '2025-12-18', frescura=frescura)
+                print(f"  {etiqueta:<13} {len(datos['periods'])} periodos "
+                      f"en {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+            print(f"\n  📊 {cliente.estadisticas()}")
+    finally:
+        servidor.shutdown()
+
+    print("=" * 50 + "\n")
@@ -0,0 +1,94 @@
+"""
+cliente_http.py - Sesión HTTP compartida para los modos rápidos
+
+Este módulo mantiene una única `requests.Session` por proceso, con pool de
+conexiones keep-alive, para consultar los endpoints JSON que usan los
+frontends de las casas de cambio. Así el modo HTTP no paga un handshake
+TLS nuevo en cada extracción.
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import HEADERS
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+TIMEOUT_HTTP = 10      # segundos
+CONEXIONES_POR_HOST = 10
+
+HEADERS_JSON = {
+    **HEADERS,
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Encoding": "gzip, deflate",  # requests no decodifica br sin brotli
+}
+
+_sesion: Optional[requests.Session] = None
+_sesion_lock = threading.Lock()
+
+
+def crear_sesion() -> requests.Session:
+    """
+    Crea una sesión con pool de conexiones y headers de navegador.
+
+    Returns:
+        requests.Session: Sesión lista para reutilizar
+    """
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=CONEXIONES_POR_HOST,
+                            pool_maxsize=CONEXIONES_POR_HOST)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    sesion.headers.update(HEADERS_JSON)
+    return sesion
+
+
+def obtener_sesion() -> requests.Session:
+    """
+    Devuelve la sesión compartida del proceso, creándola la primera vez.
+
+    Returns:
+        requests.Session: Sesión con conexiones keep-alive
+    """
+    global _sesion
+    with _sesion_lock:
+        if _sesion is None:
+            _sesion = crear_sesion()
+        return _sesion
+
+
+def obtener_json(url: str, params: Optional[Dict[str, Any]] = None,
+                 timeout: float = TIMEOUT_HTTP,
+                 sesion: Optional[requests.Session] = None) -> Any:
+    """
+    Realiza un GET y devuelve el cuerpo JSON.
+
+    Args:
+        url: URL del endpoint
+        params: Parámetros de la query string
+        timeout: Timeout de la petición en segundos
+        sesion: Sesión a usar (por defecto, la compartida)
+
+    Returns:
+        Any: Cuerpo de la respuesta decodificado
+
+    Raises:
+        requests.exceptions.RequestException: Si la petición falla
+        ValueError: Si la respuesta no es JSON válido
+    """
+    sesion = sesion or obtener_sesion()
+    response = sesion.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
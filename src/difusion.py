@@ -0,0 +1,170 @@
+"""
+difusion.py - Refresco en segundo plano y difusión de cotizaciones
+
+Un refrescador corre dentro del servidor y actualiza cada fuente según su
+propio intervalo (el TTL del registro). Cada nueva instantánea se publica
+en un canal en memoria al que se suscriben las páginas abiertas, que
+actualizan sus etiquetas sin lanzar ningún scraping propio.
+
+Así el costo pasa de N scrapings por visita a uno por intervalo para todo
+el servidor.
+
+Uso:
+    >>> canal = CanalCotizaciones()
+    >>> cancelar = canal.suscribir(lambda instantanea: print(instantanea))
+    >>> refrescador = RefrescadorCotizaciones(cache, canal, obtener_fuentes())
+    >>> app.on_startup(refrescador.iniciar)
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import asyncio
+import inspect
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+INTERVALO_MINIMO = 30        # segundos entre refrescos de una misma fuente
+ESPERA_TRAS_ERROR = 60       # segundos antes de reintentar una fuente que falló
+
+
+class CanalCotizaciones:
+    """
+    Canal pub/sub en memoria para instantáneas de cotizaciones.
+
+    Los suscriptores son funciones (síncronas o async) que reciben un dict
+    con 'timestamp', 'fuente' (la que cambió) y 'datos' ({id: Cotizacion}).
+    Un suscriptor que falla no afecta a los demás.
+    """
+
+    def __init__(self):
+        self._suscriptores: List[Callable] = []
+        self.ultima: Optional[Dict] = None
+
+    def suscribir(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """
+        Registra un suscriptor.
+
+        Args:
+            callback: Función que recibe cada instantánea publicada
+
+        Returns:
+            Función sin argumentos que cancela la suscripción
+        """
+        self._suscriptores.append(callback)
+
+        def cancelar():
+            if callback in self._suscriptores:
+                self._suscriptores.remove(callback)
+
+        return cancelar
+
+    @property
+    def cantidad_suscriptores(self) -> int:
+        return len(self._suscriptores)
+
+    async def publicar(self, instantanea: Dict) -> None:
+        """
+        Entrega una instantánea a todos los suscriptores.
+
+        Args:
+            instantanea: Dict con 'timestamp', 'fuente' y 'datos'
+        """
+        self.ultima = instantanea
+
+        for callback in list(self._suscriptores):
+            try:
+                resultado = callback(instantanea)
+                if inspect.isawaitable(resultado):
+                    await resultado
+            except Exception as e:
+                logger.warning(f"Suscriptor falló al recibir instantánea: {e}")
+
+
+class RefrescadorCotizaciones:
+    """
+    Tarea de fondo que refresca cada fuente con su propio intervalo.
+
+    Refresca a través del caché (así comparte el single-flight con los
+    clicks de los usuarios) y publica la instantánea en el canal. Si el
+    refresco falla no se publica y la fuente se reintenta a los
+    ESPERA_TRAS_ERROR segundos.
+
+    Args:
+        cache: Instancia de CacheCotizaciones
+        canal: Canal donde publicar las instantáneas
+        fuentes: Fuentes del registro a refrescar
+        antes_de_publicar: Corrutina opcional que se espera una vez antes de
+            cada publicación (p. ej. leer lo nuevo del histórico en un hilo),
+            así los suscriptores no repiten ese trabajo
+    """
+
+    def __init__(self, cache, canal: CanalCotizaciones, fuentes: list,
+                 antes_de_publicar: Optional[Callable[[], Awaitable[None]]] = None):
+        self.cache = cache
+        self.canal = canal
+        self.fuentes = fuentes
+        self.antes_de_publicar = antes_de_publicar
+        self._tareas: Dict[str, asyncio.Task] = {}
+
+    def instantanea(self, id_fuente: Optional[str] = None) -> Dict:
+        """Arma la instantánea actual a partir del caché."""
+        return {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'fuente': id_fuente,
+            'datos': self.cache.instantanea([f.id for f in self.fuentes]),
+        }
+
+    async def _bucle(self, fuente) -> None:
+        intervalo = max(INTERVALO_MINIMO, fuente.ttl)
+
+        while True:
+            try:
+                resultado = await self.cache.refrescar(fuente.id)
+                if resultado.exito:
+                    await self._preparar_publicacion()
+                    await self.canal.publicar(self.instantanea(fuente.id))
+                    espera = intervalo
+                else:
+                    # Nada nuevo que difundir: una instantánea con hora nueva
+                    # haría pasar el valor anterior por reciente
+                    espera = min(intervalo, ESPERA_TRAS_ERROR)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Refrescador: error en {fuente.id}: {e}")
+                espera = ESPERA_TRAS_ERROR
+
+            await asyncio.sleep(espera)
+
+    async def _preparar_publicacion(self) -> None:
+        if self.antes_de_publicar is None:
+            return
+        try:
+            await self.antes_de_publicar()
+        except Exception as e:
+            # Las cotizaciones se publican igual
+            logger.warning(f"Refrescador: falló la preparación de la publicación: {e}")
+
+    def iniciar(self) -> None:
+        """Lanza una tarea por fuente (llamar con el event loop corriendo)."""
+        loop = asyncio.get_running_loop()
+        for fuente in self.fuentes:
+            if fuente.id not in self._tareas:
+                self._tareas[fuente.id] = loop.create_task(self._bucle(fuente))
+        logger.info(f"Refrescador iniciado para {len(self._tareas)} fuentes")
+
+    def detener(self) -> None:
+        """Cancela las tareas de refresco."""
+        for tarea in self._tareas.values():
+            tarea.cancel()
+        self._tareas.clear()
+        logger.info("Refrescador detenido")
@@ -0,0 +1,278 @@
+"""
+driver_pool.py - Pool de navegadores Chrome reutilizables
+
+Este módulo mantiene un conjunto de drivers de Selenium (Chrome headless)
+ya iniciados y los presta a los scrapers de Kambista y Rextie. Así cada
+extracción ya no paga el arranque en frío de un navegador nuevo.
+
+Características:
+    - El binario de ChromeDriver se resuelve una sola vez por proceso
+    - Cada navegador se recicla tras N páginas o tras cierta antigüedad
+    - Los drivers se prestan con un context manager (`arrendar`)
+
+Uso:
+    >>> from driver_pool import obtener_pool
+    >>> with obtener_pool().arrendar() as driver:
+    ...     driver.get("https://kambista.com")
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Optional
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN DEL POOL
+# ============================================================
+TAMANO_POOL = 2              # Un navegador por scraper Selenium
+MAX_PAGINAS_POR_DRIVER = 50  # Reciclar tras esta cantidad de páginas
+MAX_EDAD_DRIVER = 60 * 60    # Reciclar tras 1 hora de vida (segundos)
+TIMEOUT_ARRIENDO = 120       # Espera máxima por un driver libre (segundos)
+# Arranques de Chrome simultáneos por proceso (cada uno consume CPU y RAM)
+MAX_LANZAMIENTOS_CONCURRENTES = int(os.environ.get('TIPOCAMBIO_MAX_LANZAMIENTOS', 1))
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+@lru_cache(maxsize=1)
+def obtener_ruta_driver() -> str:
+    """
+    Resuelve la ruta del binario de ChromeDriver una sola vez por proceso.
+
+    `ChromeDriverManager().install()` consulta la versión instalada de
+    Chrome y el caché local en cada llamada; aquí se memoriza el resultado.
+
+    Returns:
+        str: Ruta absoluta al ejecutable de ChromeDriver
+    """
+    ruta = ChromeDriverManager().install()
+    logger.info(f"ChromeDriver resuelto en: {ruta}")
+    return ruta
+
+
+def crear_opciones() -> Options:
+    """
+    Construye las opciones de Chrome headless usadas por los scrapers.
+
+    Returns:
+        Options: Opciones de Chrome listas para iniciar el driver
+    """
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+    options.add_argument('--log-level=3')  # Reducir logs
+    return options
+
+
+_lanzamientos = threading.BoundedSemaphore(MAX_LANZAMIENTOS_CONCURRENTES)
+
+
+class DriverArrendable:
+    """
+    Envoltorio de un driver de Chrome con contadores de uso.
+
+    Attributes:
+        driver: Instancia de `webdriver.Chrome`
+        paginas: Número de veces que fue prestado
+        creado_en: Momento de creación (time.monotonic)
+    """
+
+    def __init__(self):
+        service = Service(obtener_ruta_driver())
+        self.driver = webdriver.Chrome(service=service, options=crear_opciones())
+        self.paginas = 0
+        self.creado_en = time.monotonic()
+
+    def expirado(self, max_paginas: int, max_edad: float) -> bool:
+        """Indica si el driver superó su límite de páginas o de antigüedad."""
+        edad = time.monotonic() - self.creado_en
+        return self.paginas >= max_paginas or edad >= max_edad
+
+    def cerrar(self) -> None:
+        """Cierra el navegador ignorando errores (el proceso pudo morir)."""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error cerrando navegador: {e}")
+
+
+class PoolDrivers:
+    """
+    Pool de navegadores Chrome pre-iniciados que se prestan a los scrapers.
+
+    Los drivers se crean de forma perezosa hasta `tamano` y se devuelven
+    al pool al salir del bloque `with`. Si un driver supera su límite de
+    páginas o de edad, se cierra y se reemplaza por uno nuevo.
+
+    Args:
+        tamano: Número máximo de navegadores vivos
+        max_paginas: Préstamos antes de reciclar un navegador
+        max_edad: Segundos de vida antes de reciclar un navegador
+    """
+
+    def __init__(self, tamano: int = TAMANO_POOL,
+                 max_paginas: int = MAX_PAGINAS_POR_DRIVER,
+                 max_edad: float = MAX_EDAD_DRIVER):
+        self.tamano = tamano
+        self.max_paginas = max_paginas
+        self.max_edad = max_edad
+        self._libres: "queue.LifoQueue[DriverArrendable]" = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self._vivos = 0
+        self._cerrado = False
+
+    def precalentar(self, cantidad: Optional[int] = None) -> None:
+        """
+        Inicia navegadores por adelantado para que el primer préstamo
+        no pague el arranque en frío.
+
+        Args:
+            cantidad: Navegadores a iniciar (por defecto, el tamaño del pool)
+        """
+        cantidad = min(cantidad or self.tamano, self.tamano)
+        while self._vivos < cantidad:
+            self._libres.put(self._crear())
+
+    def _crear(self) -> DriverArrendable:
+        with _lanzamientos:
+            logger.info("Iniciando nuevo navegador Chrome para el pool")
+            item = DriverArrendable()
+        with self._lock:
+            self._vivos += 1
+        return item
+
+    def _descartar(self, item: DriverArrendable) -> None:
+        item.cerrar()
+        with self._lock:
+            self._vivos -= 1
+
+    def _tomar(self) -> DriverArrendable:
+        try:
+            item = self._libres.get_nowait()
+        except queue.Empty:
+            return self._crear()
+
+        if item.expirado(self.max_paginas, self.max_edad):
+            logger.info(f"Reciclando navegador ({item.paginas} páginas)")
+            self._descartar(item)
+            return self._crear()
+        return item
+
+    @contextmanager
+    def arrendar(self, timeout: float = TIMEOUT_ARRIENDO) -> Iterator[webdriver.Chrome]:
+        """
+        Presta un driver del pool durante el bloque `with`.
+
+        Si el bloque lanza una excepción, el navegador se descarta en lugar
+        de devolverse, por si quedó en un estado inconsistente.
+
+        Args:
+            timeout: Segundos máximos esperando un driver libre
+
+        Yields:
+            webdriver.Chrome: Driver listo para usar
+
+        Raises:
+            TimeoutError: Si no hay drivers libres dentro del timeout
+            RuntimeError: Si el pool ya fue cerrado
+        """
+        if self._cerrado:
+            raise RuntimeError("El pool de drivers ya fue cerrado")
+
+        if not self._cupos.acquire(timeout=timeout):
+            raise TimeoutError(f"No hay navegadores libres tras {timeout}s")
+
+        item = None
+        try:
+            item = self._tomar()
+            item.paginas += 1
+            yield item.driver
+        except BaseException:
+            if item is not None:
+                self._descartar(item)
+                item = None
+            raise
+        finally:
+            if item is not None:
+                if self._cerrado:
+                    self._descartar(item)
+                else:
+                    self._libres.put(item)
+            self._cupos.release()
+
+    def cerrar(self) -> None:
+        """Cierra todos los navegadores libres del pool."""
+        self._cerrado = True
+        while True:
+            try:
+                item = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(item)
+        logger.info("Pool de navegadores cerrado")
+
+
+# ============================================================
+# POOL COMPARTIDO DEL PROCESO
+# ============================================================
+_pool: Optional[PoolDrivers] = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> PoolDrivers:
+    """
+    Devuelve el pool compartido del proceso, creándolo la primera vez.
+
+    Returns:
+        PoolDrivers: Pool usado por defecto en los scrapers Selenium
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolDrivers()
+            atexit.register(_pool.cerrar)
+        return _pool
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL (para testing)
+# ============================================================
+if __name__ == "__main__":
+    print("\n" + "=" * 50)
+    print("   TEST: Pool de navegadores Chrome")
+    print("=" * 50)
+
+    pool = obtener_pool()
+
+    inicio = time.perf_counter()
+    pool.precalentar()
+    print(f"\n🔥 Precalentado en {time.perf_counter() - inicio:.2f}s")
+
+    for i in range(3):
+        inicio = time.perf_counter()
+        with pool.arrendar() as driver:
+            driver.get("about:blank")
+        print(f"  Préstamo {i + 1}: {time.perf_counter() - inicio:.3f}s")
+
+    pool.cerrar()
+    print("=" * 50 + "\n")
@@ -0,0 +1,343 @@
+"""
+escritor_csv.py - Escritura por lotes y con bloqueo del histórico CSV
+
+guardar_csv abre el archivo, revisa si existe, arma un DictWriter y lo
+cierra en cada fila. EscritorCSV mantiene el archivo abierto, acumula las
+filas en memoria y las vuelca juntas (group commit) cuando:
+
+    - se juntan MAX_FILAS_BUFFER filas,
+    - la fila más antigua lleva MAX_SEGUNDOS_BUFFER segundos esperando,
+    - se llama a vaciar() o cerrar() (también al salir del proceso).
+
+Cada volcado toma un bloqueo consultivo del archivo (fcntl en Linux/macOS,
+msvcrt en Windows) y escribe todas las filas de una vez al final del
+archivo: si main.py y la app web agregan filas a la vez, no se mezclan
+líneas a medio escribir.
+
+Si una fila trae columnas que el archivo no tiene (una fuente recién
+registrada), el volcado reescribe el archivo con bloqueo y la unión de
+columnas; las filas anteriores quedan vacías en las nuevas, como hace
+AlmacenamientoSQLite con ALTER TABLE ADD COLUMN. La copia migrada se
+escribe aparte y reemplaza al original con os.replace, así un corte a
+mitad de camino nunca deja el histórico vacío. Tras tomar el bloqueo cada
+escritor verifica que su archivo siga siendo el de la ruta (si otro
+proceso lo reemplazó, lo reabre) y relee el encabezado, así adopta las
+columnas nuevas. Solo los que escriben migran: abrir el histórico para
+leerlo nunca lo reescribe.
+
+Política de fsync (variable de entorno TIPOCAMBIO_FSYNC):
+    - 'volcado': fsync después de cada volcado (por defecto)
+    - 'cierre':  solo al cerrar el escritor
+    - 'nunca':   se deja al sistema operativo
+
+Uso:
+    >>> escritor = obtener_escritor("data/processed/tipo_cambio_historico.csv")
+    >>> escritor.escribir(registro)
+    >>> escritor.vaciar()
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import atexit
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+MAX_FILAS_BUFFER = 100
+MAX_SEGUNDOS_BUFFER = 5.0
+POLITICAS_FSYNC = ('volcado', 'cierre', 'nunca')
+POLITICA_FSYNC = os.environ.get('TIPOCAMBIO_FSYNC', 'volcado')
+
+
+# ============================================================
+# BLOQUEO CONSULTIVO DEL ARCHIVO
+# ============================================================
+def _bloquear(archivo) -> None:
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt bloquea un rango de bytes desde la posición actual: se usa el
+    # primer byte como candado (las escrituras en modo 'a' van al final igual)
+    archivo.seek(0)
+    while True:
+        try:
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK ya reintentó 10 veces; seguir esperando
+
+
+def _desbloquear(archivo) -> None:
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _leer_encabezado(ruta: str) -> Optional[List[str]]:
+    try:
+        with open(ruta, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), None)
+    except FileNotFoundError:
+        return None
+
+
+class EscritorCSV:
+    """
+    Escritor de larga vida para agregar filas a un CSV.
+
+    Las columnas se toman del encabezado del archivo si ya existe; si no,
+    de `columnas` o de las claves de la primera fila.
+
+    Args:
+        ruta: Ruta del archivo CSV
+        columnas: Columnas del encabezado para un archivo nuevo
+        max_filas: Filas acumuladas que disparan un volcado
+        max_segundos: Espera máxima de una fila en el buffer
+        fsync: 'volcado', 'cierre' o 'nunca'
+
+    Raises:
+        ValueError: Si la política de fsync no existe
+    """
+
+    def __init__(self, ruta: str, columnas: Optional[List[str]] = None,
+                 max_filas: int = MAX_FILAS_BUFFER, max_segundos: float = MAX_SEGUNDOS_BUFFER,
+                 fsync: str = POLITICA_FSYNC):
+        if fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync desconocida: {fsync} (opciones: {POLITICAS_FSYNC})")
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self.ruta = ruta
+        self.max_filas = max_filas
+        self.max_segundos = max_segundos
+        self.fsync = fsync
+        self.columnas = _leer_encabezado(ruta) or columnas
+        self.volcados = 0
+
+        # 'a+': las escrituras van al final y el encabezado se puede releer
+        self._archivo = open(ruta, 'a+', newline='', encoding='utf-8')
+        self._descartar_migracion_incompleta()
+        self._buffer: List[Dict] = []
+        self._primera_pendiente = 0.0
+        self._lock = threading.Lock()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._vaciar_periodicamente,
+                                      name=f"escritor-{os.path.basename(ruta)}", daemon=True)
+        self._hilo.start()
+
+    def escribir(self, fila: Dict) -> None:
+        """
+        Agrega una fila al buffer (y vuelca si se llegó al límite de filas).
+
+        Las columnas que el archivo no tiene se agregan al encabezado en el
+        próximo volcado.
+
+        Raises:
+            ValueError: Si el escritor está cerrado
+        """
+        self.escribir_lote([fila])
+
+    def escribir_lote(self, filas: List[Dict]) -> None:
+        """Como escribir(), para varias filas."""
+        with self._lock:
+            if self._cerrado.is_set():
+                raise ValueError(f"El escritor de {self.ruta} está cerrado")
+            if self.columnas is None and filas:
+                self.columnas = list(filas[0].keys())
+            for fila in filas:
+                self.columnas.extend(c for c in fila if c not in self.columnas)
+
+            for fila in filas:
+                if not self._buffer:
+                    self._primera_pendiente = time.monotonic()
+                self._buffer.append(fila)
+                if len(self._buffer) >= self.max_filas:
+                    self._volcar()
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._buffer)
+
+    def vaciar(self) -> None:
+        """Escribe en el archivo todas las filas pendientes."""
+        with self._lock:
+            self._volcar()
+
+    def _volcar(self) -> None:
+        # Requiere self._lock
+        if not self._buffer:
+            return
+
+        self._bloquear_vigente()
+        try:
+            # El encabezado se decide con el bloqueo tomado: otro proceso pudo
+            # haber creado el archivo o agregado columnas entretanto
+            actuales = self._encabezado_archivo()
+            if actuales is None:
+                encabezado = io.StringIO()
+                csv.writer(encabezado).writerow(self.columnas)
+                self._archivo.write(encabezado.getvalue())
+            else:
+                nuevas = [c for c in self.columnas if c not in actuales]
+                if nuevas:
+                    self._migrar_encabezado(actuales, nuevas)
+                self.columnas = actuales + nuevas
+
+            texto = io.StringIO()
+            escritor = csv.DictWriter(texto, fieldnames=self.columnas, restval='')
+            for fila in self._buffer:
+                escritor.writerow(fila)
+            self._archivo.write(texto.getvalue())
+            self._archivo.flush()
+            if self.fsync == 'volcado':
+                os.fsync(self._archivo.fileno())
+        finally:
+            _desbloquear(self._archivo)
+
+        logger.debug(f"{len(self._buffer)} filas volcadas en {self.ruta}")
+        self._buffer = []
+        self.volcados += 1
+
+    @property
+    def _ruta_migracion(self) -> str:
+        return f"{self.ruta}.migracion"
+
+    def _bloquear_vigente(self) -> None:
+        # Requiere self._lock. Si otro proceso reemplazó el archivo (migración
+        # del encabezado) el bloqueo tomado es del archivo viejo: se reabre.
+        while True:
+            _bloquear(self._archivo)
+            try:
+                vigente = os.stat(self.ruta).st_ino == os.fstat(self._archivo.fileno()).st_ino
+            except FileNotFoundError:
+                vigente = False
+            if vigente:
+                return
+            _desbloquear(self._archivo)
+            self._archivo.close()
+            self._archivo = open(self.ruta, 'a+', newline='', encoding='utf-8')
+
+    def _descartar_migracion_incompleta(self) -> None:
+        # Una copia que quedó de una migración cortada: el original no se
+        # tocó (el reemplazo es atómico), así que la copia sobra
+        self._bloquear_vigente()
+        try:
+            if os.path.exists(self._ruta_migracion):
+                os.remove(self._ruta_migracion)
+                logger.warning(f"Se descartó una migración incompleta de {self.ruta}")
+        finally:
+            _desbloquear(self._archivo)
+
+    def _encabezado_archivo(self) -> Optional[List[str]]:
+        # Requiere el bloqueo del archivo
+        self._archivo.seek(0)
+        linea = self._archivo.readline()
+        return next(csv.reader([linea])) if linea.strip() else None
+
+    def _migrar_encabezado(self, actuales: List[str], nuevas: List[str]) -> None:
+        """
+        Reescribe el archivo agregando `nuevas` al encabezado (requiere el bloqueo del archivo).
+
+        La copia se escribe en '<ruta>.migracion' y reemplaza al original con
+        os.replace. El escritor queda con el archivo nuevo abierto y
+        bloqueado; los de otros procesos lo reabren al tomar el bloqueo.
+        """
+        columnas = actuales + nuevas
+        self._archivo.seek(0)
+        with open(self._ruta_migracion, 'w', newline='', encoding='utf-8') as copia:
+            escritor = csv.DictWriter(copia, fieldnames=columnas, restval='', extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(csv.DictReader(self._archivo))
+            copia.flush()
+            os.fsync(copia.fileno())
+        os.replace(self._ruta_migracion, self.ruta)
+
+        anterior = self._archivo
+        self._archivo = open(self.ruta, 'a+', newline='', encoding='utf-8')
+        _bloquear(self._archivo)
+        _desbloquear(anterior)
+        anterior.close()
+        logger.warning(f"Encabezado de {self.ruta} migrado: columnas nuevas {nuevas}")
+
+    def _vaciar_periodicamente(self) -> None:
+        while not self._cerrado.wait(self.max_segundos / 2):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._primera_pendiente >= self.max_segundos:
+                    try:
+                        self._volcar()
+                    except OSError as e:
+                        logger.error(f"Error escribiendo {self.ruta}: {e}")
+
+    def cerrar(self) -> None:
+        """Vuelca lo pendiente y cierra el archivo."""
+        with self._lock:
+            if self._cerrado.is_set():
+                return
+            self._cerrado.set()
+            try:
+                self._volcar()
+                if self.fsync == 'cierre':
+                    os.fsync(self._archivo.fileno())
+            finally:
+                self._archivo.close()
+
+    def __enter__(self) -> "EscritorCSV":
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        self.cerrar()
+
+
+# ============================================================
+# ESCRITORES COMPARTIDOS DEL PROCESO
+# ============================================================
+_escritores: Dict[str, EscritorCSV] = {}
+_escritores_lock = threading.Lock()
+
+
+def obtener_escritor(ruta: str, columnas: Optional[List[str]] = None) -> EscritorCSV:
+    """
+    Devuelve el escritor del proceso para `ruta`, creándolo la primera vez.
+
+    Todos los que escriben en el mismo archivo comparten el buffer; los
+    escritores se cierran (y vuelcan) al terminar el proceso.
+    """
+    clave = os.path.abspath(ruta)
+    with _escritores_lock:
+        escritor = _escritores.get(clave)
+        if escritor is None or escritor._cerrado.is_set():
+            escritor = _escritores[clave] = EscritorCSV(ruta, columnas)
+        return escritor
+
+
+@atexit.register
+def cerrar_escritores() -> None:
+    with _escritores_lock:
+        for escritor in _escritores.values():
+            try:
+                escritor.cerrar()
+            except OSError as e:
+                logger.error(f"Error cerrando {escritor.ruta}: {e}")
+        _escritores.clear()
@@ -0,0 +1,193 @@
+"""
+espera_pagina.py - Espera por eventos de carga en los scrapers Selenium
+
+Reemplaza el `time.sleep(3)` fijo después de `driver.get()` por una espera
+con `WebDriverWait` que termina apenas aparecen las tasas en la página
+(por selector CSS o por un patrón numérico en el texto visible).
+
+Cada espera registra cuánto tardó la página en estar lista, para poder
+ajustar el presupuesto de cada fuente con datos reales.
+
+Uso:
+    >>> from espera_pagina import esperar_tasas, resumen_latencias
+    >>> esperar_tasas(driver, 'kambista', selectores=['#valcompra'], presupuesto=8)
+    (True, 0.42)
+    >>> resumen_latencias('kambista')
+    {'muestras': 1, 'p50': 0.42, 'p95': 0.42, 'maximo': 0.42, 'timeouts': 0}
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+PRESUPUESTO_DEFECTO = 10.0  # segundos máximos de espera por página
+INTERVALO_SONDEO = 0.1      # cada cuánto se revisa la condición
+# Sin dígitos pegados: '13.7500' o '3.75001' no son un tipo de cambio
+PATRON_TC = re.compile(r'(?<!\d)\d\.\d{2,4}(?!\d)')
+RANGO_TC = (3.0, 5.0)       # mismo rango que utils.validar_tipo_cambio
+MUESTRAS_MAXIMAS = 500      # latencias guardadas por fuente
+
+# Script que devuelve solo los números candidatos del texto visible,
+# así no se transfiere el HTML completo en cada sondeo
+_SCRIPT_NUMEROS = (
+    "return (document.body && document.body.innerText.match(/(?<!\\d)\\d\\.\\d{2,4}(?!\\d)/g)) || [];"
+)
+
+_latencias: Dict[str, Deque[float]] = {}
+_timeouts: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _en_rango(texto: str) -> bool:
+    try:
+        return RANGO_TC[0] <= float(texto) <= RANGO_TC[1]
+    except ValueError:
+        return False
+
+
+class tasas_visibles:
+    """
+    Condición para `WebDriverWait`: la página ya muestra las tasas.
+
+    Se cumple cuando algún selector CSS tiene un texto con formato de tipo
+    de cambio, o cuando el texto visible contiene al menos `minimo`
+    números dentro del rango esperado.
+
+    Args:
+        selectores: Selectores CSS de los elementos con las tasas
+        minimo: Cantidad mínima de números en rango para el modo patrón
+    """
+
+    def __init__(self, selectores: Iterable[str] = (), minimo: int = 2):
+        self.selectores = tuple(selectores)
+        self.minimo = minimo
+
+    def __call__(self, driver) -> bool:
+        for selector in self.selectores:
+            for elemento in driver.find_elements(By.CSS_SELECTOR, selector):
+                if any(_en_rango(m) for m in PATRON_TC.findall(elemento.text or '')):
+                    return True
+
+        numeros = driver.execute_script(_SCRIPT_NUMEROS)
+        en_rango = {n for n in numeros if _en_rango(n)}
+        return len(en_rango) >= self.minimo
+
+
+def registrar_latencia(fuente: str, segundos: float, lista: bool = True) -> None:
+    """
+    Guarda la latencia observada de una página.
+
+    Args:
+        fuente: Nombre de la fuente ('kambista', 'rextie', ...)
+        segundos: Tiempo que tardó en estar lista (o el presupuesto agotado)
+        lista: False si se agotó el presupuesto sin ver las tasas
+    """
+    with _lock:
+        muestras = _latencias.setdefault(fuente, deque(maxlen=MUESTRAS_MAXIMAS))
+        muestras.append(segundos)
+        if not lista:
+            _timeouts[fuente] = _timeouts.get(fuente, 0) + 1
+
+
+def esperar_tasas(driver, fuente: str, selectores: Iterable[str] = (),
+                  presupuesto: float = PRESUPUESTO_DEFECTO) -> Tuple[bool, float]:
+    """
+    Espera a que la página cargada en `driver` muestre las tasas.
+
+    Retorna apenas se cumple la condición; si se agota el presupuesto,
+    no lanza excepción y deja que el scraper intente con lo que haya.
+
+    Args:
+        driver: Driver de Selenium con la página ya solicitada
+        fuente: Nombre de la fuente, usado para las estadísticas
+        selectores: Selectores CSS de los elementos con las tasas
+        presupuesto: Segundos máximos de espera para esta fuente
+
+    Returns:
+        Tuple (lista, segundos): si la página quedó lista y cuánto tardó
+    """
+    inicio = time.perf_counter()
+    lista = True
+
+    try:
+        WebDriverWait(
+            driver, presupuesto,
+            poll_frequency=INTERVALO_SONDEO,
+            ignored_exceptions=(WebDriverException,)
+        ).until(tasas_visibles(selectores))
+    except TimeoutException:
+        lista = False
+        logger.warning(f"{fuente}: tasas no visibles tras {presupuesto}s")
+
+    segundos = round(time.perf_counter() - inicio, 3)
+    registrar_latencia(fuente, segundos, lista)
+    logger.info(f"{fuente}: página lista en {segundos}s")
+
+    return lista, segundos
+
+
+def _percentil(valores: list, p: float) -> float:
+    indice = min(len(valores) - 1, max(0, round(p * (len(valores) - 1))))
+    return valores[indice]
+
+
+def resumen_latencias(fuente: str) -> Optional[Dict[str, float]]:
+    """
+    Resume las latencias registradas de una fuente.
+
+    Args:
+        fuente: Nombre de la fuente
+
+    Returns:
+        Dict con 'muestras', 'p50', 'p95', 'maximo' y 'timeouts',
+        o None si aún no hay muestras
+    """
+    with _lock:
+        valores = sorted(_latencias.get(fuente, ()))
+        timeouts = _timeouts.get(fuente, 0)
+
+    if not valores:
+        return None
+
+    return {
+        'muestras': len(valores),
+        'p50': _percentil(valores, 0.50),
+        'p95': _percentil(valores, 0.95),
+        'maximo': valores[-1],
+        'timeouts': timeouts,
+    }
+
+
+def sugerir_presupuesto(fuente: str, margen: float = 1.5,
+                        defecto: float = PRESUPUESTO_DEFECTO) -> float:
+    """
+    Sugiere un presupuesto de espera a partir del p95 observado.
+
+    Args:
+        fuente: Nombre de la fuente
+        margen: Factor aplicado sobre el p95
+        defecto: Valor devuelto si todavía no hay muestras
+
+    Returns:
+        float: Presupuesto sugerido en segundos
+    """
+    resumen = resumen_latencias(fuente)
+    if resumen is None:
+        return defecto
+    return round(resumen['p95'] * margen, 2)
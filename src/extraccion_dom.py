@@ -0,0 +1,222 @@
+"""
+extraccion_dom.py - Extracción dirigida de tasas desde el DOM
+
+En lugar de traer todo `driver.page_source` y buscar números con regex en
+megabytes de HTML, cada fuente declara una especificación con selectores
+CSS. Un pequeño script corre dentro del navegador y devuelve solo el texto
+de los elementos de las tasas (o de su contenedor), ya etiquetado como
+compra y venta.
+
+La misma especificación funciona offline sobre HTML guardado (con
+BeautifulSoup), lo que permite medir el rendimiento del parser con los
+fixtures de data/fixtures/.
+
+Uso:
+    >>> spec = EspecificacionExtraccion('kambista', selector_compra='#valcompra',
+    ...                                 selector_venta='#valventa')
+    >>> textos = extraer_textos(driver, spec)
+    >>> interpretar_textos(textos, spec)
+    (3.385, 3.405)
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+PATRON_NUMERO = re.compile(r'\d\.\d{2,4}')
+DISTANCIA_ETIQUETA = 40  # caracteres máximos entre la etiqueta y el número
+
+# Corre en el navegador: devuelve solo los textos que necesitamos
+SCRIPT_EXTRACCION = """
+const [contenedores, selCompra, selVenta] = arguments;
+const texto = (sel) => {
+    if (!sel) return null;
+    const el = document.querySelector(sel);
+    return el ? el.innerText : null;
+};
+let contenedor = null;
+for (const sel of contenedores) {
+    contenedor = texto(sel);
+    if (contenedor) break;
+}
+return {compra: texto(selCompra), venta: texto(selVenta), contenedor: contenedor};
+"""
+
+
+@dataclass(frozen=True)
+class EspecificacionExtraccion:
+    """
+    Describe dónde están las tasas de una fuente en su página.
+
+    Attributes:
+        fuente: Nombre de la fuente ('kambista', 'rextie', ...)
+        selector_compra: Selector CSS del elemento con la tasa de compra
+        selector_venta: Selector CSS del elemento con la tasa de venta
+        contenedores: Selectores CSS del bloque que contiene ambas tasas,
+            probados en orden; se usan si faltan los selectores directos
+        etiquetas_compra: Palabras que preceden a la tasa de compra
+        etiquetas_venta: Palabras que preceden a la tasa de venta
+        rango: Rango (mínimo, máximo) aceptado para un tipo de cambio
+    """
+    fuente: str
+    selector_compra: Optional[str] = None
+    selector_venta: Optional[str] = None
+    contenedores: Tuple[str, ...] = ()
+    etiquetas_compra: Tuple[str, ...] = ('compra', 'compramos')
+    etiquetas_venta: Tuple[str, ...] = ('venta', 'vendemos')
+    rango: Tuple[float, float] = (3.0, 5.0)
+
+    def selectores_espera(self) -> Tuple[str, ...]:
+        """Selectores que indican que las tasas ya se renderizaron."""
+        directos = tuple(s for s in (self.selector_compra, self.selector_venta) if s)
+        return directos or self.contenedores
+
+
+@lru_cache(maxsize=32)
+def _patron_etiqueta(etiquetas: Tuple[str, ...]) -> re.Pattern:
+    opciones = '|'.join(re.escape(e) for e in etiquetas)
+    return re.compile(
+        rf'\b(?:{opciones})\b\D{{0,{DISTANCIA_ETIQUETA}}}?(\d\.\d{{2,4}})',
+        re.IGNORECASE
+    )
+
+
+def _primer_numero(texto: Optional[str], rango: Tuple[float, float]) -> Optional[float]:
+    if not texto:
+        return None
+    for m in PATRON_NUMERO.findall(texto):
+        valor = float(m)
+        if rango[0] <= valor <= rango[1]:
+            return round(valor, 4)
+    return None
+
+
+def _numero_tras_etiqueta(texto: Optional[str], patron: re.Pattern,
+                          rango: Tuple[float, float]) -> Optional[float]:
+    if not texto:
+        return None
+    for m in patron.finditer(texto):
+        valor = float(m.group(1))
+        if rango[0] <= valor <= rango[1]:
+            return round(valor, 4)
+    return None
+
+
+def interpretar_textos(textos: Dict[str, Optional[str]],
+                       spec: EspecificacionExtraccion) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Convierte los textos extraídos en (compra, venta).
+
+    Primero usa el texto de los selectores directos; si falta alguno,
+    busca el número que sigue a la etiqueta correspondiente ("Compra",
+    "Venta", ...) dentro del contenedor. Nunca adivina ordenando valores.
+
+    Args:
+        textos: Dict con 'compra', 'venta' y 'contenedor' (pueden ser None)
+        spec: Especificación de la fuente
+
+    Returns:
+        Tuple (compra, venta) con None donde no se encontró el valor
+    """
+    compra = _primer_numero(textos.get('compra'), spec.rango)
+    venta = _primer_numero(textos.get('venta'), spec.rango)
+
+    contenedor = textos.get('contenedor')
+    if compra is None:
+        compra = _numero_tras_etiqueta(contenedor, _patron_etiqueta(spec.etiquetas_compra), spec.rango)
+    if venta is None:
+        venta = _numero_tras_etiqueta(contenedor, _patron_etiqueta(spec.etiquetas_venta), spec.rango)
+
+    return compra, venta
+
+
+def extraer_textos(driver, spec: EspecificacionExtraccion) -> Dict[str, Optional[str]]:
+    """
+    Ejecuta el script de extracción en el navegador.
+
+    Solo viajan por el protocolo de WebDriver los textos de los elementos
+    de interés, no el HTML completo.
+
+    Args:
+        driver: Driver de Selenium con la página cargada
+        spec: Especificación de la fuente
+
+    Returns:
+        Dict con 'compra', 'venta' y 'contenedor'
+    """
+    return driver.execute_script(
+        SCRIPT_EXTRACCION,
+        list(spec.contenedores), spec.selector_compra, spec.selector_venta
+    ) or {}
+
+
+def extraer_textos_html(html: str, spec: EspecificacionExtraccion) -> Dict[str, Optional[str]]:
+    """
+    Equivalente offline de `extraer_textos` sobre HTML guardado.
+
+    Args:
+        html: HTML de la página
+        spec: Especificación de la fuente
+
+    Returns:
+        Dict con 'compra', 'venta' y 'contenedor'
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def texto(selector: Optional[str]) -> Optional[str]:
+        if not selector:
+            return None
+        el = soup.select_one(selector)
+        return el.get_text(' ', strip=True) if el else None
+
+    contenedor = None
+    for selector in spec.contenedores:
+        contenedor = texto(selector)
+        if contenedor:
+            break
+
+    return {
+        'compra': texto(spec.selector_compra),
+        'venta': texto(spec.selector_venta),
+        'contenedor': contenedor,
+    }
+
+
+def medir_rendimiento(html: str, spec: EspecificacionExtraccion,
+                      repeticiones: int = 100) -> Dict[str, float]:
+    """
+    Mide el throughput del parser offline sobre un HTML guardado.
+
+    Args:
+        html: HTML de la página (por ejemplo, un fixture)
+        spec: Especificación de la fuente
+        repeticiones: Veces que se parsea la página
+
+    Returns:
+        Dict con 'ms_por_pagina', 'paginas_por_segundo' y 'mb_por_segundo'
+    """
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        interpretar_textos(extraer_textos_html(html, spec), spec)
+    total = time.perf_counter() - inicio
+
+    return {
+        'ms_por_pagina': round(total / repeticiones * 1000, 3),
+        'paginas_por_segundo': round(repeticiones / total, 1),
+        'mb_por_segundo': round(len(html.encode('utf-8')) * repeticiones / total / 1e6, 2),
+    }
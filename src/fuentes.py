@@ -0,0 +1,193 @@
+"""
+fuentes.py - Registro de fuentes de tipo de cambio
+
+Cada fuente (BCRP, casas de cambio) se declara una sola vez aquí con su id,
+tipo de extracción, función extractora, TTL de refresco y clase de costo.
+El integrador, las métricas, la persistencia y la app web recorren este
+registro en lugar de tener los nombres escritos a mano.
+
+Para agregar una casa de cambio basta con crear su scraper (que devuelva
+'tc_<id>_compra', 'tc_<id>_venta' y 'exito') y registrarla:
+
+    >>> registrar_fuente(Fuente(
+    ...     id='tkambio', nombre='Tkambio', tipo='http',
+    ...     extractor='scraper_tkambio:obtener_tipo_cambio_tkambio',
+    ...     ttl=300, costo='bajo'))
+
+El histórico no requiere pasos manuales: el backend CSV agrega las
+columnas nuevas al encabezado en el primer guardado (ver escritor_csv.py)
+y el de SQLite con ALTER TABLE ADD COLUMN.
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# ============================================================
+# CONSTANTES
+# ============================================================
+TIPOS = ('api', 'http', 'browser')
+COSTOS = ('bajo', 'alto')
+
+
+@dataclass(frozen=True)
+class Fuente:
+    """
+    Declaración de una fuente de tipo de cambio.
+
+    Attributes:
+        id: Identificador corto usado en columnas ('bcrp' -> 'tc_bcrp_compra')
+        nombre: Nombre para mostrar ('BCRP')
+        tipo: 'api', 'http' o 'browser'
+        extractor: Función extractora como 'modulo:funcion'. Se importa
+            recién al usarla, así el registro no depende de Selenium.
+        ttl: Segundos que una cotización se considera vigente
+        costo: 'bajo' (HTTP/API) o 'alto' (necesita navegador)
+        plazo: Segundos máximos de espera por la fuente en cada ciclo
+        descripcion: Texto corto para la interfaz
+        icono: Ícono de Material para la interfaz
+        color: Color de Quasar para la interfaz
+    """
+    id: str
+    nombre: str
+    tipo: str
+    extractor: str
+    ttl: int
+    costo: str
+    plazo: float = 45
+    descripcion: str = ''
+    icono: str = 'storefront'
+    color: str = 'grey'
+
+    def __post_init__(self):
+        if self.tipo not in TIPOS:
+            raise ValueError(f"Tipo de fuente inválido: {self.tipo} (esperado {TIPOS})")
+        if self.costo not in COSTOS:
+            raise ValueError(f"Costo de fuente inválido: {self.costo} (esperado {COSTOS})")
+
+    @property
+    def campo_compra(self) -> str:
+        return f'tc_{self.id}_compra'
+
+    @property
+    def campo_venta(self) -> str:
+        return f'tc_{self.id}_venta'
+
+    @property
+    def campo_spread(self) -> str:
+        return f'spread_{self.id}'
+
+    @property
+    def campo_exito(self) -> str:
+        return f'{self.id}_exito'
+
+    def obtener_extractor(self) -> Callable[[], Dict]:
+        """Importa y devuelve la función extractora de la fuente."""
+        modulo, funcion = self.extractor.split(':')
+        return getattr(importlib.import_module(modulo), funcion)
+
+    def extraer(self) -> Dict:
+        """Ejecuta la función extractora de la fuente."""
+        return self.obtener_extractor()()
+
+
+# ============================================================
+# REGISTRO
+# ============================================================
+_REGISTRO: Dict[str, Fuente] = {}
+
+
+def registrar_fuente(fuente: Fuente) -> Fuente:
+    """
+    Agrega (o reemplaza) una fuente en el registro.
+
+    Args:
+        fuente: Declaración de la fuente
+
+    Returns:
+        Fuente: La misma fuente, para poder encadenar
+    """
+    _REGISTRO[fuente.id] = fuente
+    return fuente
+
+
+def obtener_fuente(id_fuente: str) -> Fuente:
+    """
+    Busca una fuente por su id.
+
+    Raises:
+        KeyError: Si la fuente no está registrada
+    """
+    return _REGISTRO[id_fuente]
+
+
+def obtener_fuentes(tipo: Optional[str] = None, costo: Optional[str] = None) -> List[Fuente]:
+    """
+    Lista las fuentes registradas, en orden de registro.
+
+    Args:
+        tipo: Filtrar por tipo ('api', 'http', 'browser')
+        costo: Filtrar por clase de costo ('bajo', 'alto')
+
+    Returns:
+        List[Fuente]: Fuentes que cumplen los filtros
+    """
+    return [
+        f for f in _REGISTRO.values()
+        if (tipo is None or f.tipo == tipo) and (costo is None or f.costo == costo)
+    ]
+
+
+def campos_tasas() -> List[str]:
+    """
+    Columnas de tasas de todas las fuentes, en el orden del CSV.
+
+    Ejemplo:
+        >>> campos_tasas()[:2]
+        ['tc_bcrp_compra', 'tc_bcrp_venta']
+    """
+    campos = []
+    for f in obtener_fuentes():
+        campos += [f.campo_compra, f.campo_venta]
+    return campos
+
+
+def columnas_csv() -> List[str]:
+    """Columnas del CSV histórico según las fuentes registradas."""
+    return (
+        ['timestamp']
+        + campos_tasas()
+        + [f.campo_spread for f in obtener_fuentes()]
+        + ['mejor_compra', 'mejor_venta', 'cambio_detectado']
+    )
+
+
+# ============================================================
+# FUENTES DEL PROYECTO
+# ============================================================
+registrar_fuente(Fuente(
+    id='bcrp', nombre='BCRP', tipo='api',
+    extractor='scraper_bcrp:obtener_tipo_cambio_bcrp',
+    ttl=60 * 60, costo='bajo', plazo=35,
+    descripcion='Banco Central de Reserva del Perú',
+    icono='account_balance', color='blue',
+))
+
+registrar_fuente(Fuente(
+    id='kambista', nombre='Kambista', tipo='browser',
+    extractor='scraper_kambista:obtener_tipo_cambio_kambista',
+    ttl=5 * 60, costo='alto',
+    descripcion='Casa de cambio digital',
+    icono='storefront', color='purple',
+))
+
+registrar_fuente(Fuente(
+    id='rextie', nombre='Rextie', tipo='browser',
+    extractor='scraper_rextie:obtener_tipo_cambio_rextie',
+    ttl=5 * 60, costo='alto',
+    descripcion='Casa de cambio digital',
+    icono='swap_horiz', color='orange',
+))
@@ -0,0 +1,195 @@
+"""
+grafico_vivo.py - Series de gráficos del histórico que crecen por deltas
+
+Redibujar un gráfico con update_figure vuelve a serializar y enviar todas
+sus trazas en cada refresco, aunque solo haya llegado un registro.
+SeriesEnVivo guarda las listas x / y de cada traza tal como están en el
+navegador y, cuando el índice histórico crece, calcula solo el delta:
+
+    - los puntos posteriores al último mostrado (por traza; cada corte de
+      la fuente queda como un solo None, así la línea no lo cruza)
+    - cuántos puntos conservar por traza para descartar los que salieron
+      de la ventana
+
+El delta tiene la forma de Plotly.extendTraces(gd, {x, y}, trazas,
+maxPoints), así el costo por refresco es O(puntos nuevos). Las listas
+propias se actualizan igual que las del navegador: si la figura del
+servidor usa esas mismas listas, una reconexión recibe el estado vigente.
+
+Las series parten reducidas con LTTB (ver submuestreo.py) y los puntos
+nuevos se agregan sin reducir; cuando una traza supera el doble de la
+resolución se vuelve a reducir y avanzar() pide redibujar todo.
+
+Las ventanas largas (VENTANAS_AGREGADAS: 30 días y 1 año) parten en
+cambio de los agregados OHLC (ver agregados.py): el cierre de cada hora o
+día, o el spread medio, leídos del nivel más fino que entra en la
+resolución. Si los agregados aún no existen se usa el histórico crudo.
+
+Uso:
+    >>> series = SeriesEnVivo(INDICE, ['tc_bcrp_compra', 'tc_bcrp_venta'], '7d')
+    >>> delta = series.avanzar()
+    >>> if delta and not delta['redibujar']:
+    ...     grafico.run_plot_method('extendTraces', {'x': delta['x'], 'y': delta['y']},
+    ...                             delta['trazas'], delta['max_puntos'])
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agregados import NIVELES, consultar_ohlc
+from indice_historico import VENTANAS, IndiceHistorico
+from registro_binario import a_epoch, de_epoch
+from submuestreo import PUNTOS_GRAFICO
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+VENTANAS_AGREGADAS = ('30d', '1a')  # se dibujan desde los agregados OHLC
+
+
+def _columna_ohlc(columna: str) -> Tuple[str, str, str]:
+    """(fuente, lado, campo del agregado) que corresponde a una columna del histórico."""
+    if columna.startswith('spread_'):
+        return columna[len('spread_'):], 'venta', 'spread_medio'
+    fuente, lado = columna[len('tc_'):].rsplit('_', 1)
+    return fuente, lado, 'cierre'
+
+
+def _con_cortes(x: List[str], y: List[Optional[float]],
+                anterior: Optional[float]) -> Tuple[List[str], List[Optional[float]]]:
+    """Puntos sin los vacíos repetidos: cada corte queda como un solo None."""
+    px, py = [], []
+    for a, b in zip(x, y):
+        if b is None and (py[-1] if py else anterior) is None:
+            continue
+        px.append(a)
+        py.append(b)
+    return px, py
+
+
+def _resolucion(ventana: str, puntos: int) -> int:
+    """Segundos del nivel de agregado más fino cuyos períodos de la ventana entran en `puntos`."""
+    for segundos in sorted(NIVELES.values()):
+        if VENTANAS[ventana] / segundos <= puntos:
+            return segundos
+    return max(NIVELES.values())
+
+
+class SeriesEnVivo:
+    """
+    Trazas de un gráfico del histórico (una por columna) en una ventana.
+
+    Args:
+        indice: Índice histórico del que se leen los registros
+        columnas: Columnas numéricas, una por traza y en el orden de las trazas
+        ventana: Nombre de la ventana en VENTANAS
+        puntos: Resolución de la reducción inicial (ancho del gráfico)
+
+    Attributes:
+        x, y: Listas por traza con lo que muestra el navegador
+    """
+
+    def __init__(self, indice: IndiceHistorico, columnas: List[str], ventana: str,
+                 puntos: int = PUNTOS_GRAFICO):
+        self.indice = indice
+        self.columnas = columnas
+        self.puntos = puntos
+        self.reiniciar(ventana)
+
+    def reiniciar(self, ventana: Optional[str] = None) -> None:
+        """Vuelve a cargar las trazas reducidas, opcionalmente en otra ventana."""
+        self.ventana = ventana or self.ventana
+        inicio, fin = self.indice.ventana(self.ventana)
+        # Último registro mostrado (aunque no tenga datos en ninguna traza)
+        self.ultimo = self.indice.fechas(fin - 1, fin)[0] if fin > inicio else None
+
+        series = None
+        if self.ventana in VENTANAS_AGREGADAS and self.ultimo is not None:
+            series = self._series_agregadas()
+        if series is None:
+            series = [self.indice.serie_reducida(c, self.ventana, self.puntos) for c in self.columnas]
+        self.x: List[List[str]] = [list(x) for x, _ in series]
+        self.y: List[List[Optional[float]]] = [list(y) for _, y in series]
+
+    def _series_agregadas(self) -> Optional[List[Tuple[List[str], List[Optional[float]]]]]:
+        """Trazas de la ventana desde los agregados OHLC, o None si no hay agregados."""
+        desde = de_epoch(a_epoch(self.ultimo) - VENTANAS[self.ventana])
+        resolucion = _resolucion(self.ventana, self.puntos)
+        series = []
+        try:
+            for columna in self.columnas:
+                fuente, lado, campo = _columna_ohlc(columna)
+                periodos = consultar_ohlc(fuente, lado, desde=desde, resolucion=resolucion)
+                x, y = [], []
+                for p in periodos:
+                    # Períodos sin muestras (la fuente cayó): un None corta la línea
+                    if x and a_epoch(p['inicio']) - a_epoch(x[-1]) > resolucion:
+                        x.append(de_epoch(a_epoch(x[-1]) + resolucion))
+                        y.append(None)
+                    x.append(p['inicio'])
+                    y.append(p[campo])
+                series.append((x, y))
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo agregados para la ventana {self.ventana}: {e}")
+            return None
+        # Agregados sin reconstruir: se reduce el histórico crudo
+        return series if any(x for x, _ in series) else None
+
+    def avanzar(self) -> Optional[Dict]:
+        """
+        Incorpora los registros del índice posteriores al último mostrado.
+
+        Returns:
+            None si no hay registros nuevos. Si no, un Dict con:
+                - 'redibujar': True si las trazas se volvieron a reducir y hay
+                  que enviar la figura completa (x / y ya actualizados)
+                - 'x', 'y': Puntos nuevos, una lista por traza
+                - 'trazas': Índices de las trazas
+                - 'max_puntos': {'x': [...], 'y': [...]} puntos a conservar por traza
+        """
+        desde = None if self.ultimo is None else de_epoch(a_epoch(self.ultimo) + 1)
+        inicio, fin = self.indice.rango(desde=desde)
+        if fin <= inicio:
+            return None
+        self.ultimo = self.indice.fechas(fin - 1, fin)[0]
+        limite = de_epoch(a_epoch(self.ultimo) - VENTANAS[self.ventana])
+
+        nuevos_x, nuevos_y, conservar = [], [], []
+        for k, columna in enumerate(self.columnas):
+            x, y = self.indice.serie(columna, inicio, fin)
+            x, y = _con_cortes(x, y, self.y[k][-1] if self.y[k] else None)
+            nuevos_x.append(x)
+            nuevos_y.append(y)
+            self.x[k].extend(nuevos_x[-1])
+            self.y[k].extend(nuevos_y[-1])
+
+            # Los timestamps 'YYYY-MM-DD HH:MM:SS' se ordenan como texto
+            fuera = bisect_left(self.x[k], limite)
+            del self.x[k][:fuera], self.y[k][:fuera]
+            conservar.append(len(self.x[k]))
+
+        if max(conservar) > 2 * self.puntos:
+            self.reiniciar()
+            return {'redibujar': True}
+
+        return {
+            'redibujar': False,
+            'x': nuevos_x,
+            'y': nuevos_y,
+            'trazas': list(range(len(self.columnas))),
+            'max_puntos': {'x': conservar, 'y': conservar},
+        }
@@ -0,0 +1,289 @@
+"""
+indice_historico.py - Índice en memoria del histórico para consultas por rango
+
+La página de análisis necesita ventanas de 24 h, 7 d, 30 d y 1 año sin
+recorrer el histórico en cada visita. IndiceHistorico carga los registros
+una vez en columnas compactas (array de la biblioteca estándar):
+
+    - timestamps como segundos (array 'q'), ordenados
+    - tasas y spreads por columna (array 'd', NaN si faltan)
+    - mejor_compra / mejor_venta como listas de nombres
+
+Una ventana se ubica con bisect sobre los timestamps (O(log n)) y se
+lee como un corte de las columnas. Para los gráficos, serie_reducida()
+devuelve la ventana reducida con LTTB (ver submuestreo.py) a tantos puntos
+como píxeles tiene el gráfico, guardada en caché hasta el próximo registro.
+
+actualizar() solo incorpora lo nuevo: con el histórico CSV se lee desde el
+último byte ya procesado; con los demás backends se consulta desde el
+último timestamp cargado. Si el CSV se reescribió (otro inodo, menos
+bytes o un encabezado migrado) se vuelve a cargar completo.
+
+Uso:
+    >>> indice = IndiceHistorico()
+    >>> indice.actualizar()
+    5
+    >>> inicio, fin = indice.ventana('7d')
+    >>> x, y = indice.serie('tc_kambista_venta', inicio, fin)
+    >>> x, y = indice.serie_reducida('tc_kambista_venta', '1a', puntos=800)
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import csv
+import io
+import logging
+import math
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import columnas_csv
+from almacenamiento import Almacenamiento, AlmacenamientoCSV, obtener_almacenamiento
+from registro_binario import a_epoch, de_epoch
+from submuestreo import PUNTOS_GRAFICO, lttb
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+HORA = 3600
+DIA = 24 * HORA
+VENTANAS = {
+    '24h': DIA,
+    '7d': 7 * DIA,
+    '30d': 30 * DIA,
+    '1a': 365 * DIA,
+}
+
+
+def _numero(valor) -> float:
+    if valor is None or valor == '':
+        return math.nan
+    return float(valor)
+
+
+class IndiceHistorico:
+    """
+    Columnas del histórico en memoria, ordenadas por timestamp.
+
+    Las columnas numéricas son las de fuentes.columnas_csv() al crear el
+    índice (tasas y spreads). Es seguro leer mientras otro hilo actualiza.
+
+    Args:
+        almacen: Origen de los registros (por defecto, el backend configurado)
+    """
+
+    def __init__(self, almacen: Optional[Almacenamiento] = None):
+        self.almacen = almacen or obtener_almacenamiento()
+        self.columnas = [c for c in columnas_csv() if c.startswith(('tc_', 'spread_'))]
+
+        self.timestamps = array('q')
+        self.valores: Dict[str, array] = {c: array('d') for c in self.columnas}
+        self.mejor_compra: List[Optional[str]] = []
+        self.mejor_venta: List[Optional[str]] = []
+
+        # Bytes del CSV ya incorporados y el archivo al que corresponden
+        self._posicion_csv = 0
+        self._inodo_csv: Optional[int] = None
+        self._encabezado_csv = b''
+        self._reducidas: Dict[Tuple[str, str, int], Tuple[List[str], List[Optional[float]]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    # --------------------------------------------------------
+    # Carga incremental
+    # --------------------------------------------------------
+    def actualizar(self) -> int:
+        """
+        Incorpora los registros agregados desde la última llamada.
+
+        Returns:
+            int: Registros nuevos
+        """
+        with self._lock:
+            if isinstance(self.almacen, AlmacenamientoCSV):
+                registros = self._nuevos_csv()
+            else:
+                registros = self._nuevos_backend()
+            for registro in registros:
+                self._agregar(registro)
+            if registros:
+                self._reducidas.clear()  # las ventanas se corrieron
+        if registros:
+            logger.info(f"Índice histórico: {len(registros)} registros nuevos ({len(self)} en total)")
+        return len(registros)
+
+    def _nuevos_csv(self) -> List[Dict]:
+        self.almacen.vaciar()
+        ruta = self.almacen.ruta
+        if not os.path.exists(ruta):
+            return []
+
+        with open(ruta, 'rb') as f:
+            estado = os.fstat(f.fileno())
+            encabezado = f.readline()
+            if not encabezado.endswith(b'\n'):
+                return []  # archivo recién creado, encabezado a medio escribir
+            if (estado.st_ino != self._inodo_csv or encabezado != self._encabezado_csv
+                    or estado.st_size < self._posicion_csv):
+                # Reemplazado, truncado o migrado: la posición ya no vale
+                if self._inodo_csv is not None:
+                    logger.info(f"{ruta} se reescribió: el índice histórico se recarga completo")
+                self._vaciar()
+                self._inodo_csv, self._encabezado_csv = estado.st_ino, encabezado
+                self._posicion_csv = len(encabezado)
+            f.seek(self._posicion_csv)
+            nuevos = f.read()
+
+        # Una última línea sin salto puede estar a medio escribir: queda para la próxima
+        completo = nuevos[:nuevos.rfind(b'\n') + 1]
+        self._posicion_csv += len(completo)
+
+        columnas = next(csv.reader([encabezado.decode('utf-8-sig')]))
+        return list(csv.DictReader(io.StringIO(completo.decode('utf-8')), fieldnames=columnas))
+
+    def _nuevos_backend(self) -> List[Dict]:
+        if not self.timestamps:
+            return self.almacen.consultar()
+        ultimo = self.timestamps[-1]
+        # consultar() incluye 'desde': se descartan los ya cargados
+        return [r for r in self.almacen.consultar(desde=de_epoch(ultimo)) if a_epoch(r['timestamp']) > ultimo]
+
+    def _vaciar(self) -> None:
+        del self.timestamps[:]
+        for valores in self.valores.values():
+            del valores[:]
+        self.mejor_compra.clear()
+        self.mejor_venta.clear()
+        self._reducidas.clear()
+
+    def _agregar(self, registro: Dict) -> None:
+        segundos = a_epoch(registro['timestamp'])
+        # Normalmente se agrega al final; una fila fuera de orden se inserta en su lugar
+        posicion = bisect_right(self.timestamps, segundos)
+        if posicion == len(self.timestamps):
+            self.timestamps.append(segundos)
+            for columna in self.columnas:
+                self.valores[columna].append(_numero(registro.get(columna)))
+            self.mejor_compra.append(registro.get('mejor_compra') or None)
+            self.mejor_venta.append(registro.get('mejor_venta') or None)
+        else:
+            self.timestamps.insert(posicion, segundos)
+            for columna in self.columnas:
+                self.valores[columna].insert(posicion, _numero(registro.get(columna)))
+            self.mejor_compra.insert(posicion, registro.get('mejor_compra') or None)
+            self.mejor_venta.insert(posicion, registro.get('mejor_venta') or None)
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+    def rango(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Índices [inicio, fin) de los registros con timestamp en [desde, hasta].
+
+        Args:
+            desde: Timestamp 'YYYY-MM-DD HH:MM:SS' inicial
+            hasta: Timestamp final (inclusive)
+        """
+        with self._lock:
+            inicio = 0 if desde is None else bisect_left(self.timestamps, a_epoch(desde))
+            fin = len(self.timestamps) if hasta is None else bisect_right(self.timestamps, a_epoch(hasta))
+        return inicio, max(inicio, fin)
+
+    def ventana(self, nombre: str) -> Tuple[int, int]:
+        """
+        Índices [inicio, fin) de una ventana de VENTANAS ('24h', '7d', '30d', '1a').
+
+        La ventana termina en el último registro cargado (no en la hora
+        actual), así un histórico que dejó de recolectarse se sigue viendo.
+
+        Raises:
+            ValueError: Si la ventana no existe
+        """
+        if nombre not in VENTANAS:
+            raise ValueError(f"Ventana desconocida: {nombre} (opciones: {list(VENTANAS)})")
+        with self._lock:
+            if not self.timestamps:
+                return 0, 0
+            fin = len(self.timestamps)
+            return bisect_left(self.timestamps, self.timestamps[-1] - VENTANAS[nombre]), fin
+
+    def fechas(self, inicio: int, fin: int) -> List[str]:
+        """Timestamps 'YYYY-MM-DD HH:MM:SS' de [inicio, fin)."""
+        with self._lock:
+            return [de_epoch(s) for s in self.timestamps[inicio:fin]]
+
+    def serie(self, columna: str, inicio: int, fin: int) -> Tuple[List[str], List[Optional[float]]]:
+        """
+        (timestamps, valores) de una columna en [inicio, fin); None donde no hay dato.
+        """
+        with self._lock:
+            valores = [None if math.isnan(v) else v for v in self.valores[columna][inicio:fin]]
+            return self.fechas(inicio, fin), valores
+
+    def serie_reducida(self, columna: str, ventana: str,
+                       puntos: int = PUNTOS_GRAFICO) -> Tuple[List[str], List[Optional[float]]]:
+        """
+        (timestamps, valores) de una columna en una ventana, reducida con LTTB.
+
+        El resultado tiene a lo sumo `puntos` elementos sin importar cuánto
+        histórico haya, y se guarda por (columna, ventana, puntos) hasta que
+        actualizar() agregue registros. Los puntos sin dato se omiten, salvo
+        un None por cada corte entre tramos con datos (Plotly corta la línea).
+
+        Args:
+            columna: Columna numérica ('tc_kambista_venta', 'spread_bcrp', ...)
+            ventana: Nombre de la ventana en VENTANAS
+            puntos: Resolución, normalmente el ancho del gráfico en píxeles
+        """
+        clave = (columna, ventana, puntos)
+        with self._lock:
+            if clave not in self._reducidas:
+                inicio, fin = self.ventana(ventana)
+                # Los cortes de array son copias: el índice puede seguir creciendo
+                x = np.frombuffer(self.timestamps[inicio:fin], dtype=np.int64)
+                y = np.frombuffer(self.valores[columna][inicio:fin], dtype=np.float64)
+                elegidos = lttb(x, y, puntos)
+                self._reducidas[clave] = ([de_epoch(int(s)) for s in x[elegidos]],
+                                          [None if math.isnan(v) else v for v in y[elegidos].tolist()])
+            return self._reducidas[clave]
+
+    def rachas(self, lado: str, inicio: int, fin: int) -> List[Dict]:
+        """
+        Rachas de la mejor opción: tramos consecutivos con la misma fuente.
+
+        Args:
+            lado: 'compra' (mejor para comprar USD) o 'venta' (para vender)
+            inicio, fin: Índices del tramo, p. ej. de ventana()
+
+        Returns:
+            List[Dict] con 'fuente', 'desde', 'hasta' y 'registros', en orden
+        """
+        with self._lock:
+            nombres = (self.mejor_compra if lado == 'compra' else self.mejor_venta)[inicio:fin]
+            marcas = self.timestamps[inicio:fin]
+
+        rachas = []
+        for i, nombre in enumerate(nombres):
+            if rachas and rachas[-1]['fuente'] == nombre:
+                rachas[-1]['hasta'] = de_epoch(marcas[i])
+                rachas[-1]['registros'] += 1
+            else:
+                rachas.append({'fuente': nombre, 'desde': de_epoch(marcas[i]),
+                               'hasta': de_epoch(marcas[i]), 'registros': 1})
+        return [r for r in rachas if r['fuente'] is not None]
@@ -1,33 +1,36 @@
 """
 integrador.py - Integrador de fuentes de tipo de cambio
 
-Este módulo combina los datos de todas las fuentes (BCRP, Kambista, Rextie)
-en un registro único y lo guarda en el archivo CSV histórico.
+Este módulo combina los datos de todas las fuentes registradas en
+fuentes.py (BCRP, Kambista, Rextie, ...) en un registro único y lo guarda
+en el histórico (CSV por defecto, o SQLite con TIPOCAMBIO_BACKEND=sqlite;
+ver almacenamiento.py). Cada registro guardado actualiza también los
+agregados OHLC por hora, día y semana (ver agregados.py).
 
 Autor: Javier Uraco (@JavierAnthonyUS)
 Fecha: Diciembre 2025
 """
 
 import os
+import sqlite3
 import sys
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 # Agregar el directorio actual al path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Importar scrapers
-from scraper_bcrp import obtener_tipo_cambio_bcrp
-from scraper_kambista import obtener_tipo_cambio_kambista
-from scraper_rextie import obtener_tipo_cambio_rextie
+# Importar registro de fuentes
+from fuentes import Fuente, obtener_fuente, obtener_fuentes, columnas_csv
+from almacenamiento import RUTA_CSV_HISTORICO, obtener_almacenamiento
+from agregados import actualizar_agregados
+from modelo import Cotizacion, Instantanea
 from utils import (
-    obtener_timestamp,
     calcular_spread,
-    determinar_mejor_opcion,
-    guardar_csv,
-    cargar_ultimo_registro,
-    hubo_cambio
+    determinar_mejor_opcion
 )
 
 # Configurar logging
@@ -37,96 +40,171 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Rutas de archivos
-RUTA_CSV_HISTORICO = os.path.join(os.path.dirname(__file__), "..", "data", "processed", "tipo_cambio_historico.csv")
+# Presupuesto total del ciclo (segundos); cada fuente declara su propio plazo
+PRESUPUESTO_CICLO = 60
 
+# Fuentes de costo alto (navegador) que se ejecutan a la vez en un ciclo
+MAX_FUENTES_COSTOSAS = 2
 
-def extraer_todas_las_fuentes() -> Dict:
+
+def _ejecutar_fuente(fuente: Fuente) -> Tuple[Dict, float]:
+    """
+    Ejecuta el extractor de una fuente midiendo su latencia.
+    
+    Returns:
+        Tuple (datos, segundos)
+    """
+    inicio = time.perf_counter()
+    try:
+        datos = fuente.extraer()
+    except Exception as e:
+        logger.error(f"Error inesperado en {fuente.nombre}: {e}")
+        datos = {'exito': False, 'error': str(e)}
+    return datos, round(time.perf_counter() - inicio, 3)
+
+
+def _extraer_secuencial(fuentes: List[Fuente]) -> Dict[str, Tuple[Dict, str, float]]:
+    resultados = {}
+    for fuente in fuentes:
+        print(f"\n📊 Extrayendo datos de {fuente.nombre} ({fuente.tipo})...")
+        datos, latencia = _ejecutar_fuente(fuente)
+        resultados[fuente.id] = (datos, 'ok' if datos.get('exito') else 'error', latencia)
+    return resultados
+
+
+def _extraer_concurrente(fuentes: List[Fuente], plazos: Dict[str, float],
+                         presupuesto: float) -> Dict[str, Tuple[Dict, str, float]]:
+    """
+    Lanza todas las fuentes en paralelo y recoge las que terminan a tiempo.
+    
+    Las fuentes baratas (API/HTTP) y las costosas (navegador) van en lotes
+    separados: las primeras comparten un pool amplio y las segundas uno
+    acotado por MAX_FUENTES_COSTOSAS.
+    
+    Cada fuente tiene su propio plazo, acotado por el presupuesto global.
+    Las que no terminan a tiempo se marcan como 'timeout'; sus hilos no se
+    esperan, así que el ciclo dura lo que la fuente más lenta (o el plazo).
     """
-    Extrae datos de todas las fuentes disponibles.
+    inicio = time.perf_counter()
+    baratas = [f for f in fuentes if f.costo == 'bajo']
+    costosas = [f for f in fuentes if f.costo == 'alto']
+    
+    ejecutores = {
+        'bajo': ThreadPoolExecutor(max_workers=max(1, len(baratas)), thread_name_prefix='fuente-http'),
+        'alto': ThreadPoolExecutor(max_workers=MAX_FUENTES_COSTOSAS, thread_name_prefix='fuente-browser'),
+    }
+    
+    pendientes = {}
+    limites = {}
+    for fuente in baratas + costosas:
+        print(f"\n📊 Extrayendo datos de {fuente.nombre} ({fuente.tipo}, en paralelo)...")
+        pendientes[fuente.id] = ejecutores[fuente.costo].submit(_ejecutar_fuente, fuente)
+        limites[fuente.id] = inicio + min(plazos.get(fuente.id, fuente.plazo), presupuesto)
+    
+    resultados = {}
+    
+    try:
+        while pendientes:
+            ahora = time.perf_counter()
+            
+            # Marcar como vencidas las fuentes que pasaron su plazo
+            for id_fuente in [i for i in pendientes if limites[i] <= ahora]:
+                pendientes.pop(id_fuente).cancel()
+                latencia = round(ahora - inicio, 3)
+                resultados[id_fuente] = ({'exito': False, 'error': 'Plazo agotado'}, 'timeout', latencia)
+                logger.warning(f"{id_fuente}: plazo agotado tras {latencia}s")
+            
+            if not pendientes:
+                break
+            
+            proximo_limite = min(limites[i] for i in pendientes)
+            listos, _ = wait(list(pendientes.values()), timeout=max(0, proximo_limite - ahora),
+                             return_when=FIRST_COMPLETED)
+            
+            for id_fuente in [i for i, f in pendientes.items() if f in listos]:
+                datos, latencia = pendientes.pop(id_fuente).result()
+                resultados[id_fuente] = (datos, 'ok' if datos.get('exito') else 'error', latencia)
+    finally:
+        for ejecutor in ejecutores.values():
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+    
+    logger.info(f"Ciclo concurrente completado en {time.perf_counter() - inicio:.2f}s")
+    return resultados
+
+
+def extraer_instantanea(concurrente: bool = True,
+                        plazos: Optional[Dict[str, float]] = None,
+                        presupuesto: float = PRESUPUESTO_CICLO) -> Instantanea:
+    """
+    Extrae datos de todas las fuentes registradas.
+    
+    Args:
+        concurrente: Si True, consulta todas las fuentes en paralelo
+        plazos: Plazo por id de fuente en segundos (por defecto, Fuente.plazo)
+        presupuesto: Tiempo máximo total del ciclo en modo concurrente
     
     Returns:
-        Dict con los datos combinados de todas las fuentes
+        Instantanea con una Cotizacion por fuente (con su estado
+        'ok', 'error' o 'timeout' y su latencia)
     """
     logger.info("=" * 50)
     logger.info("Iniciando extracción de todas las fuentes...")
     logger.info("=" * 50)
     
-    # Obtener datos de cada fuente
-    print("\n📊 Extrayendo datos de BCRP (API)...")
-    datos_bcrp = obtener_tipo_cambio_bcrp()
-    
-    print("\n📊 Extrayendo datos de Kambista (Selenium)...")
-    datos_kambista = obtener_tipo_cambio_kambista()
+    fuentes = obtener_fuentes()
     
-    print("\n📊 Extrayendo datos de Rextie (Selenium)...")
-    datos_rextie = obtener_tipo_cambio_rextie()
+    if concurrente:
+        resultados = _extraer_concurrente(fuentes, plazos or {}, presupuesto)
+    else:
+        resultados = _extraer_secuencial(fuentes)
     
-    # Combinar en un solo diccionario
-    datos_combinados = {
-        'timestamp': obtener_timestamp(),
-        
-        # BCRP
-        'tc_bcrp_compra': datos_bcrp.get('tc_bcrp_compra'),
-        'tc_bcrp_venta': datos_bcrp.get('tc_bcrp_venta'),
-        
-        # Kambista
-        'tc_kambista_compra': datos_kambista.get('tc_kambista_compra'),
-        'tc_kambista_venta': datos_kambista.get('tc_kambista_venta'),
-        
-        # Rextie
-        'tc_rextie_compra': datos_rextie.get('tc_rextie_compra'),
-        'tc_rextie_venta': datos_rextie.get('tc_rextie_venta'),
-        
-        # Metadatos de extracción
-        'bcrp_exito': datos_bcrp.get('exito', False),
-        'kambista_exito': datos_kambista.get('exito', False),
-        'rextie_exito': datos_rextie.get('exito', False),
-    }
+    return Instantanea(
+        Cotizacion.desde_resultado(fuente, *resultados[fuente.id])
+        for fuente in fuentes
+    )
+
+
+def extraer_todas_las_fuentes(concurrente: bool = True,
+                              plazos: Optional[Dict[str, float]] = None,
+                              presupuesto: float = PRESUPUESTO_CICLO) -> Dict:
+    """
+    Como extraer_instantanea, en el formato de diccionario ancho.
     
-    return datos_combinados
+    Returns:
+        Dict con los datos combinados de todas las fuentes, más
+        'estado_<fuente>' ('ok', 'error' o 'timeout') y 'latencia_<fuente>'
+    """
+    return extraer_instantanea(concurrente, plazos, presupuesto).a_datos()
 
 
 def calcular_metricas(datos: Dict) -> Dict:
     """
     Calcula métricas adicionales a partir de los datos extraídos.
     
+    Es la versión para diccionarios anchos; ejecutar_extraccion trabaja
+    con modelo.Instantanea.
+    
     Args:
         datos: Diccionario con los datos de tipo de cambio
     
     Returns:
         Dict con las métricas calculadas añadidas
     """
-    # Calcular spreads
-    datos['spread_bcrp'] = calcular_spread(
-        datos.get('tc_bcrp_compra'),
-        datos.get('tc_bcrp_venta')
-    )
+    fuentes = obtener_fuentes()
     
-    datos['spread_kambista'] = calcular_spread(
-        datos.get('tc_kambista_compra'),
-        datos.get('tc_kambista_venta')
-    )
-    
-    datos['spread_rextie'] = calcular_spread(
-        datos.get('tc_rextie_compra'),
-        datos.get('tc_rextie_venta')
-    )
+    # Calcular spreads
+    for fuente in fuentes:
+        datos[fuente.campo_spread] = calcular_spread(
+            datos.get(fuente.campo_compra),
+            datos.get(fuente.campo_venta)
+        )
     
     # Determinar mejor opción para COMPRAR USD (menor tasa de venta)
-    tasas_venta = {
-        'BCRP': datos.get('tc_bcrp_venta'),
-        'Kambista': datos.get('tc_kambista_venta'),
-        'Rextie': datos.get('tc_rextie_venta')
-    }
+    tasas_venta = {f.nombre: datos.get(f.campo_venta) for f in fuentes}
     datos['mejor_compra'] = determinar_mejor_opcion(tasas_venta, 'compra')
     
     # Determinar mejor opción para VENDER USD (mayor tasa de compra)
-    tasas_compra = {
-        'BCRP': datos.get('tc_bcrp_compra'),
-        'Kambista': datos.get('tc_kambista_compra'),
-        'Rextie': datos.get('tc_rextie_compra')
-    }
+    tasas_compra = {f.nombre: datos.get(f.campo_compra) for f in fuentes}
     datos['mejor_venta'] = determinar_mejor_opcion(tasas_compra, 'venta')
     
     return datos
@@ -135,25 +213,21 @@ def calcular_metricas(datos: Dict) -> Dict:
 def preparar_registro_csv(datos: Dict) -> Dict:
     """
     Prepara los datos para guardar en el CSV (solo columnas necesarias).
+    
+    Las columnas salen del registro de fuentes (ver fuentes.columnas_csv).
     """
-    columnas = [
-        'timestamp',
-        'tc_bcrp_compra', 'tc_bcrp_venta',
-        'tc_kambista_compra', 'tc_kambista_venta',
-        'tc_rextie_compra', 'tc_rextie_venta',
-        'spread_bcrp', 'spread_kambista', 'spread_rextie',
-        'mejor_compra', 'mejor_venta', 'cambio_detectado'
-    ]
+    columnas = columnas_csv()
     
     return {col: datos.get(col) for col in columnas}
 
 
-def ejecutar_extraccion(forzar_guardado: bool = False) -> Dict:
+def ejecutar_extraccion(forzar_guardado: bool = False, concurrente: bool = True) -> Dict:
     """
     Ejecuta el proceso completo de extracción e integración.
     
     Args:
         forzar_guardado: Si True, guarda aunque no haya cambios
+        concurrente: Si True, consulta las fuentes en paralelo
     
     Returns:
         Dict con los datos extraídos y el estado de la operación
@@ -164,27 +238,37 @@ def ejecutar_extraccion(forzar_guardado: bool = False) -> Dict:
     print("=" * 60)
     
     # 1. Extraer datos de todas las fuentes
-    datos = extraer_todas_las_fuentes()
+    instantanea = extraer_instantanea(concurrente=concurrente)
     
-    # 2. Calcular métricas
-    datos = calcular_metricas(datos)
+    # 2. Verificar si hubo cambios respecto al último registro
+    almacen = obtener_almacenamiento()
+    try:
+        ultimo_registro = almacen.ultimo_registro()
+        anterior = Instantanea.desde_registro(ultimo_registro) if ultimo_registro else None
+        cambio = instantanea.hubo_cambio(anterior)
+        instantanea.cambio_detectado = cambio
     
-    # 3. Verificar si hubo cambios respecto al último registro
-    ultimo_registro = cargar_ultimo_registro(RUTA_CSV_HISTORICO)
-    cambio = hubo_cambio(datos, ultimo_registro)
-    datos['cambio_detectado'] = cambio
+        # 3. Calcular métricas (spreads y mejor opción)
+        datos = instantanea.a_datos()
     
-    # 4. Guardar si hubo cambio o si se fuerza
-    if cambio or forzar_guardado:
-        registro = preparar_registro_csv(datos)
-        exito = guardar_csv(registro, RUTA_CSV_HISTORICO)
+        # 4. Guardar si hubo cambio o si se fuerza
+        if cambio or forzar_guardado:
+            registro = preparar_registro_csv(datos)
+            exito = almacen.guardar(registro)
         
-        if exito:
-            print("\n💾 Datos guardados exitosamente en CSV")
+            if exito:
+                print(f"\n💾 Datos guardados exitosamente ({type(almacen).__name__})")
+                try:
+                    actualizar_agregados([registro])
+                except sqlite3.Error as e:
+                    # Los agregados se pueden reconstruir después (agregados.py reconstruir)
+                    logger.error(f"Error actualizando agregados: {e}")
+            else:
+                print("\n❌ Error al guardar datos")
         else:
-            print("\n❌ Error al guardar datos")
-    else:
-        print("\nℹ️ Sin cambios detectados, no se guardó nuevo registro")
+            print("\nℹ️ Sin cambios detectados, no se guardó nuevo registro")
+    finally:
+        almacen.cerrar()
     
     # 5. Mostrar resumen
     print("\n" + "=" * 60)
@@ -197,11 +281,16 @@ def ejecutar_extraccion(forzar_guardado: bool = False) -> Dict:
     print(f"   ┌{'─'*56}┐")
     print(f"   │ {'Fuente':<12} │ {'Compra':>10} │ {'Venta':>10} │ {'Spread':>10} │")
     print(f"   ├{'─'*56}┤")
-    print(f"   │ {'BCRP':<12} │ {str(datos['tc_bcrp_compra']):>10} │ {str(datos['tc_bcrp_venta']):>10} │ {str(datos['spread_bcrp']):>10} │")
-    print(f"   │ {'Kambista':<12} │ {str(datos['tc_kambista_compra']):>10} │ {str(datos['tc_kambista_venta']):>10} │ {str(datos['spread_kambista']):>10} │")
-    print(f"   │ {'Rextie':<12} │ {str(datos['tc_rextie_compra']):>10} │ {str(datos['tc_rextie_venta']):>10} │ {str(datos['spread_rextie']):>10} │")
+    for cotizacion in instantanea.cotizaciones:
+        nombre, spread = obtener_fuente(cotizacion.fuente).nombre, datos[f'spread_{cotizacion.fuente}']
+        print(f"   │ {nombre:<12} │ {str(cotizacion.compra):>10} │ {str(cotizacion.venta):>10} │ {str(spread):>10} │")
     print(f"   └{'─'*56}┘")
     
+    print("\n   ⏱️ ESTADO POR FUENTE:")
+    for cotizacion in instantanea.cotizaciones:
+        nombre = obtener_fuente(cotizacion.fuente).nombre
+        print(f"      • {nombre:<10} {cotizacion.estado:<8} {cotizacion.latencia:>7.2f}s")
+    
     print(f"\n   🏆 MEJOR OPCIÓN:")
     print(f"      • Para COMPRAR dólares: {datos['mejor_compra']}")
     print(f"      • Para VENDER dólares:  {datos['mejor_venta']}")
@@ -0,0 +1,176 @@
+"""
+metricas.py - Métricas vectorizadas sobre historiales completos
+
+integrador.calcular_metricas trabaja un registro a la vez, con round() y
+min/max de Python por campo. Para recalcular un año de ticks este módulo
+hace lo mismo sobre matrices de NumPy (filas = registros, columnas =
+fuentes):
+
+    - spreads por fuente (venta - compra, redondeado a 4 decimales)
+    - índice de la mejor fuente para comprar USD (menor venta)
+    - índice de la mejor fuente para vender USD (mayor compra)
+    - ahorro y ganancia por cada $1,000 entre la mejor y la peor fuente
+
+Una fuente que falló es NaN en su columna: no participa de la mejor opción
+y su spread queda en NaN. Los resultados son idénticos a los de
+utils.calcular_spread, utils.determinar_mejor_opcion y utils.calcular_ahorro
+(ver `python benchmarks.py metricas`).
+
+Uso:
+    >>> compras, ventas = matrices_de_registros(registros, obtener_fuentes())
+    >>> metricas = calcular_metricas_lote(compras, ventas)
+    >>> metricas.nombres_mejor_compra([f.nombre for f in obtener_fuentes()])[:1]
+    ['Rextie']
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+import os
+import sys
+import warnings
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import Fuente
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+DECIMALES = 4
+MONTO_REFERENCIA = 1000  # USD para el ahorro por cada $1,000
+SIN_FUENTE = -1          # índice de mejor opción cuando ninguna fuente tiene tasa
+
+
+def redondear(valores: np.ndarray, decimales: int = DECIMALES) -> np.ndarray:
+    """
+    Como round() de Python, elemento a elemento.
+
+    np.round escala, redondea y vuelve a dividir, y puede diferir de round()
+    (que redondea el valor decimal exacto) en los casos que quedan justo en
+    la mitad. Esos pocos casos se recalculan con round().
+    """
+    escala = 10.0 ** decimales
+    escalados = valores * escala
+    resultado = np.round(escalados) / escala
+    dudosos = np.flatnonzero(np.abs(np.abs(escalados - np.floor(escalados)) - 0.5) < 1e-6)
+    if dudosos.size:
+        planos, originales = resultado.reshape(-1), valores.reshape(-1)
+        for i in dudosos:
+            planos[i] = round(float(originales[i]), decimales)
+    return resultado
+
+
+def _indice_extremo(matriz: np.ndarray, minimo: bool) -> np.ndarray:
+    """argmin/argmax por fila ignorando NaN; SIN_FUENTE si toda la fila es NaN."""
+    faltantes = np.isnan(matriz)
+    relleno = np.where(faltantes, np.inf if minimo else -np.inf, matriz)
+    # Como min()/max() sobre un dict: ante un empate gana la primera fuente
+    indices = relleno.argmin(axis=1) if minimo else relleno.argmax(axis=1)
+    return np.where(faltantes.all(axis=1), SIN_FUENTE, indices)
+
+
+def _rango(matriz: np.ndarray, monto: float) -> np.ndarray:
+    """(máximo - mínimo) * monto por fila; NaN si hay menos de dos fuentes."""
+    validas = (~np.isnan(matriz)).sum(axis=1)
+    with warnings.catch_warnings():
+        # nanmax/nanmin advierten en filas sin ninguna tasa
+        warnings.simplefilter('ignore', RuntimeWarning)
+        resultado = (np.nanmax(matriz, axis=1) - np.nanmin(matriz, axis=1)) * monto
+    return np.where(validas >= 2, resultado, np.nan)
+
+
+@dataclass
+class MetricasLote:
+    """
+    Métricas de un lote de registros.
+
+    Attributes:
+        spreads: (registros, fuentes) venta - compra redondeado; NaN si falta una tasa
+        mejor_compra: Índice de la fuente con menor venta (SIN_FUENTE si ninguna)
+        mejor_venta: Índice de la fuente con mayor compra (SIN_FUENTE si ninguna)
+        ahorro_compra: Soles ahorrados al comprar MONTO_REFERENCIA USD en la
+            mejor fuente frente a la peor (NaN con menos de dos fuentes)
+        ganancia_venta: Soles ganados al vender MONTO_REFERENCIA USD en la
+            mejor fuente frente a la peor (NaN con menos de dos fuentes)
+    """
+    spreads: np.ndarray
+    mejor_compra: np.ndarray
+    mejor_venta: np.ndarray
+    ahorro_compra: np.ndarray
+    ganancia_venta: np.ndarray
+
+    @staticmethod
+    def _nombres(indices: np.ndarray, nombres: Sequence[str]) -> List[Optional[str]]:
+        return [nombres[i] if i != SIN_FUENTE else None for i in indices.tolist()]
+
+    def nombres_mejor_compra(self, nombres: Sequence[str]) -> List[Optional[str]]:
+        """mejor_compra como nombres de fuente (el valor de la columna del CSV)."""
+        return self._nombres(self.mejor_compra, nombres)
+
+    def nombres_mejor_venta(self, nombres: Sequence[str]) -> List[Optional[str]]:
+        """mejor_venta como nombres de fuente (el valor de la columna del CSV)."""
+        return self._nombres(self.mejor_venta, nombres)
+
+
+def calcular_metricas_lote(compras: np.ndarray, ventas: np.ndarray,
+                           monto: float = MONTO_REFERENCIA) -> MetricasLote:
+    """
+    Calcula las métricas de todos los registros de una vez.
+
+    Args:
+        compras: Matriz (registros, fuentes) de tasas de compra, NaN si falta
+        ventas: Matriz (registros, fuentes) de tasas de venta, NaN si falta
+        monto: USD para el ahorro y la ganancia
+
+    Returns:
+        MetricasLote
+    """
+    compras = np.asarray(compras, dtype=np.float64)
+    ventas = np.asarray(ventas, dtype=np.float64)
+    if compras.shape != ventas.shape or compras.ndim != 2:
+        raise ValueError(f"Se esperaban dos matrices de igual forma: {compras.shape} y {ventas.shape}")
+
+    spreads = redondear(ventas - compras)
+    negativos = int(np.sum(spreads < 0))
+    if negativos:
+        logger.warning(f"{negativos} spreads negativos en el lote")
+
+    return MetricasLote(
+        spreads=spreads,
+        mejor_compra=_indice_extremo(ventas, minimo=True),
+        mejor_venta=_indice_extremo(compras, minimo=False),
+        ahorro_compra=_rango(ventas, monto),
+        ganancia_venta=_rango(compras, monto),
+    )
+
+
+def _a_float(valor) -> float:
+    if valor is None or valor == '':
+        return np.nan
+    return float(valor)
+
+
+def matrices_de_registros(registros: Sequence[Dict],
+                          fuentes: Sequence[Fuente]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matrices (compras, ventas) a partir de registros del histórico.
+
+    Acepta los dicts del integrador o las filas de texto de un CSV; las
+    tasas vacías quedan en NaN.
+    """
+    compras = np.array([[_a_float(r.get(f.campo_compra)) for f in fuentes] for r in registros],
+                       dtype=np.float64).reshape(len(registros), len(fuentes))
+    ventas = np.array([[_a_float(r.get(f.campo_venta)) for f in fuentes] for r in registros],
+                      dtype=np.float64).reshape(len(registros), len(fuentes))
+    return compras, ventas
@@ -0,0 +1,232 @@
+"""
+modelo.py - Modelo tipado de cotizaciones e instantáneas
+
+Hasta ahora cada capa pasaba diccionarios anchos con claves como
+'tc_kambista_compra', que el integrador volvía a armar y a buscar en cada
+paso. Aquí los datos de un ciclo tienen forma larga y angosta:
+
+    - Cotizacion: una fuente en un momento (compra, venta, éxito, estado,
+      latencia, hora de obtención), con __slots__
+    - Instantanea: el timestamp del ciclo y una tupla de Cotizacion, una
+      por fuente
+
+Agregar una fuente agrega una Cotizacion a la tupla, no campos nuevos.
+Las columnas anchas solo aparecen en los adaptadores hacia y desde el
+registro del histórico (el esquema de fuentes.columnas_csv).
+
+Uso:
+    >>> instantanea = Instantanea.desde_registro(almacen.ultimo_registro())
+    >>> instantanea.cotizacion('kambista').venta
+    3.486
+    >>> instantanea.a_registro()['mejor_compra']
+    'BCRP'
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import Fuente, obtener_fuente
+from utils import calcular_spread, determinar_mejor_opcion, obtener_timestamp
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('ok', 'error', 'timeout')
+
+
+def _numero(valor) -> Optional[float]:
+    if valor is None or valor == '':
+        return None
+    return float(valor)
+
+
+def _nombre_fuente(id_fuente: str) -> str:
+    try:
+        return obtener_fuente(id_fuente).nombre
+    except KeyError:  # fuente que ya no está registrada
+        return id_fuente
+
+
+# ============================================================
+# COTIZACIÓN
+# ============================================================
+class Cotizacion:
+    """
+    Cotización de una fuente.
+
+    Attributes:
+        fuente: Id de la fuente ('kambista')
+        compra: Tasa de compra, o None si no se obtuvo
+        venta: Tasa de venta, o None si no se obtuvo
+        exito: Si el extractor devolvió datos válidos
+        estado: 'ok', 'error' o 'timeout'
+        latencia: Segundos que tardó la extracción
+        obtenido_en: Hora de obtención (epoch, time.time())
+    """
+
+    __slots__ = ('fuente', 'compra', 'venta', 'exito', 'estado', 'latencia', 'obtenido_en')
+
+    def __init__(self, fuente: str, compra: Optional[float], venta: Optional[float],
+                 exito: bool = True, estado: Optional[str] = None, latencia: float = 0.0,
+                 obtenido_en: Optional[float] = None):
+        self.fuente = fuente
+        self.compra = compra
+        self.venta = venta
+        self.exito = exito
+        self.estado = estado or ('ok' if exito else 'error')
+        self.latencia = latencia
+        self.obtenido_en = time.time() if obtenido_en is None else obtenido_en
+
+    @classmethod
+    def desde_resultado(cls, fuente: Fuente, datos: Dict, estado: Optional[str] = None,
+                        latencia: float = 0.0) -> "Cotizacion":
+        """
+        Cotización a partir de lo que devuelve el extractor de una fuente
+        ('tc_<id>_compra', 'tc_<id>_venta', 'exito').
+        """
+        return cls(fuente.id, datos.get(fuente.campo_compra), datos.get(fuente.campo_venta),
+                   bool(datos.get('exito', False)), estado, latencia)
+
+    @classmethod
+    def fallida(cls, fuente: str, estado: str = 'error', latencia: float = 0.0) -> "Cotizacion":
+        return cls(fuente, None, None, False, estado, latencia)
+
+    @property
+    def spread(self) -> Optional[float]:
+        return calcular_spread(self.compra, self.venta)
+
+    @property
+    def tasas(self) -> Tuple[Optional[float], Optional[float]]:
+        return self.compra, self.venta
+
+    def __eq__(self, otra) -> bool:
+        if not isinstance(otra, Cotizacion):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(otra, campo) for campo in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"Cotizacion({self.fuente!r}, compra={self.compra}, venta={self.venta}, "
+                f"exito={self.exito}, estado={self.estado!r}, latencia={self.latencia})")
+
+
+# ============================================================
+# INSTANTÁNEA
+# ============================================================
+class Instantanea:
+    """
+    Cotizaciones de todas las fuentes en un ciclo.
+
+    Attributes:
+        timestamp: 'YYYY-MM-DD HH:MM:SS'
+        cotizaciones: Tupla de Cotizacion, en el orden del registro de fuentes
+        cambio_detectado: Si cambió alguna tasa respecto al registro anterior
+            (None mientras no se compare)
+    """
+
+    __slots__ = ('timestamp', 'cotizaciones', 'cambio_detectado')
+
+    def __init__(self, cotizaciones: Iterable[Cotizacion], timestamp: Optional[str] = None,
+                 cambio_detectado: Optional[bool] = None):
+        self.timestamp = timestamp or obtener_timestamp()
+        self.cotizaciones = tuple(cotizaciones)
+        self.cambio_detectado = cambio_detectado
+
+    def cotizacion(self, id_fuente: str) -> Optional[Cotizacion]:
+        """Cotización de una fuente, o None si no está en la instantánea."""
+        for cotizacion in self.cotizaciones:
+            if cotizacion.fuente == id_fuente:
+                return cotizacion
+        return None
+
+    def mejor_compra(self) -> Optional[str]:
+        """Nombre de la fuente con menor venta (mejor para COMPRAR USD)."""
+        return determinar_mejor_opcion(
+            {_nombre_fuente(c.fuente): c.venta for c in self.cotizaciones}, 'compra')
+
+    def mejor_venta(self) -> Optional[str]:
+        """Nombre de la fuente con mayor compra (mejor para VENDER USD)."""
+        return determinar_mejor_opcion(
+            {_nombre_fuente(c.fuente): c.compra for c in self.cotizaciones}, 'venta')
+
+    def hubo_cambio(self, anterior: Optional["Instantanea"]) -> bool:
+        """
+        Compara las tasas con una instantánea anterior (como utils.hubo_cambio).
+
+        Una fuente que no está en `anterior` cuenta como tasas None.
+        """
+        if anterior is None:
+            return True  # Primer registro siempre es "cambio"
+
+        for cotizacion in self.cotizaciones:
+            previa = anterior.cotizacion(cotizacion.fuente)
+            tasas_previas = previa.tasas if previa is not None else (None, None)
+            for lado, nueva, vieja in zip(('compra', 'venta'), cotizacion.tasas, tasas_previas):
+                if nueva != vieja:
+                    logger.info(f"Cambio detectado en tc_{cotizacion.fuente}_{lado}: {vieja} -> {nueva}")
+                    return True
+        return False
+
+    # --------------------------------------------------------
+    # Adaptadores al esquema ancho del histórico
+    # --------------------------------------------------------
+    def a_registro(self) -> Dict:
+        """Registro del histórico (las columnas de fuentes.columnas_csv)."""
+        registro = {'timestamp': self.timestamp}
+        for c in self.cotizaciones:
+            registro[f'tc_{c.fuente}_compra'] = c.compra
+            registro[f'tc_{c.fuente}_venta'] = c.venta
+        for c in self.cotizaciones:
+            registro[f'spread_{c.fuente}'] = c.spread
+        registro['mejor_compra'] = self.mejor_compra()
+        registro['mejor_venta'] = self.mejor_venta()
+        registro['cambio_detectado'] = self.cambio_detectado
+        return registro
+
+    def a_datos(self) -> Dict:
+        """
+        El diccionario ancho que devolvía el integrador: el registro más
+        '<fuente>_exito', 'estado_<fuente>' y 'latencia_<fuente>'.
+        """
+        datos = self.a_registro()
+        for c in self.cotizaciones:
+            datos[f'{c.fuente}_exito'] = c.exito
+            datos[f'estado_{c.fuente}'] = c.estado
+            datos[f'latencia_{c.fuente}'] = c.latencia
+        return datos
+
+    @classmethod
+    def desde_registro(cls, registro: Dict, ids_fuentes: Optional[List[str]] = None) -> "Instantanea":
+        """
+        Instantánea a partir de un registro del histórico (dict o fila de CSV).
+
+        Args:
+            registro: Registro con 'timestamp' y las columnas tc_<fuente>_compra/venta
+            ids_fuentes: Fuentes a leer (por defecto, las que tienen columnas en el registro)
+        """
+        if ids_fuentes is None:
+            ids_fuentes = [c[3:-len('_compra')] for c in registro
+                           if c.startswith('tc_') and c.endswith('_compra')]
+
+        cotizaciones = []
+        for id_fuente in ids_fuentes:
+            compra = _numero(registro.get(f'tc_{id_fuente}_compra'))
+            venta = _numero(registro.get(f'tc_{id_fuente}_venta'))
+            cotizaciones.append(Cotizacion(id_fuente, compra, venta,
+                                           exito=compra is not None and venta is not None, obtenido_en=0.0))
+
+        cambio = registro.get('cambio_detectado')
+        return cls(cotizaciones, registro['timestamp'],
+                   None if cambio in (None, '') else cambio in (True, 1, '1', 'True', 'true'))
+
+    def __repr__(self) -> str:
+        return f"Instantanea({self.timestamp!r}, {len(self.cotizaciones)} cotizaciones)"
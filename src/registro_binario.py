@@ -0,0 +1,496 @@
+"""
+registro_binario.py - Bitácora binaria de ancho fijo para cotizaciones
+
+Formato de solo agregado para recolección de alta frecuencia: cada
+snapshot del integrador ocupa un registro de tamaño fijo, así el archivo
+se puede mapear en memoria (mmap) y leer como un arreglo de NumPy sin
+parsear texto ni copiar datos.
+
+Estructura del archivo:
+
+    encabezado  MAGIA 'TCPE' | versión (uint16) | n° de fuentes (uint16) |
+                largo de los ids (uint32) | ids separados por coma (utf-8),
+                rellenado hasta múltiplo de 8 bytes
+    registros   timestamp (int64, segundos desde 1970 de la hora local,
+                sin zona horaria) | compra y venta de cada fuente (int32,
+                diezmilésimas de sol; NULO si no hay tasa) | banderas (uint32)
+
+Banderas: el bit i es `<fuente>_exito` de la i-ésima fuente del encabezado;
+el bit 31 es cambio_detectado. Los spreads y la mejor opción no se guardan:
+se recalculan al convertir a registros del CSV.
+
+Los registros se agregan en orden de timestamp, por lo que un rango de
+fechas se ubica con búsqueda binaria (np.searchsorted) en O(log n).
+
+Uso:
+    python registro_binario.py importar   # CSV histórico -> bitácora
+    python registro_binario.py exportar   # bitácora -> *_desde_binario.csv
+
+    >>> with LectorBinario(RUTA_BINARIO) as lector:
+    ...     inicio, fin = lector.rango('2025-12-13', '2025-12-13')
+    ...     ventas = lector.tasas('tc_kambista_venta')[inicio:fin]
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import calendar
+import csv
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import obtener_fuente, obtener_fuentes
+from almacenamiento import Almacenamiento, RUTA_CSV_HISTORICO, TAMANO_LOTE, _fila_de_fuente, _leer_en_lotes
+from utils import determinar_mejor_opcion
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_BINARIO = os.environ.get(
+    'TIPOCAMBIO_BINARIO',
+    os.path.join(os.path.dirname(__file__), "..", "data", "processed", "tipo_cambio.tick")
+)
+MAGIA = b'TCPE'
+VERSION = 1
+CABECERA = struct.Struct('<4sHHI')
+ESCALA = 10_000                       # diezmilésimas de sol
+NULO = np.iinfo(np.int32).min         # tasa ausente
+BIT_CAMBIO = 1 << 31                  # bandera de cambio_detectado
+FORMATO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+# Destino de exportar: aparte del histórico vivo, que nunca se reemplaza por defecto
+RUTA_CSV_EXPORTADO = os.path.splitext(RUTA_CSV_HISTORICO)[0] + "_desde_binario.csv"
+
+
+# ============================================================
+# CONVERSIONES
+# ============================================================
+def a_epoch(timestamp: str) -> int:
+    """'YYYY-MM-DD HH:MM:SS' -> segundos (la hora se toma tal cual, sin zona)."""
+    return calendar.timegm(datetime.strptime(timestamp, FORMATO_TIMESTAMP).timetuple())
+
+
+def de_epoch(segundos: int) -> str:
+    return time.strftime(FORMATO_TIMESTAMP, time.gmtime(int(segundos)))
+
+
+def _limite(fecha: str, final: bool) -> int:
+    # Un 'hasta' de solo fecha incluye todo ese día
+    if len(fecha) <= 10:
+        fecha += " 23:59:59" if final else " 00:00:00"
+    return a_epoch(fecha)
+
+
+def _a_entero(valor) -> int:
+    if valor is None or valor == '':
+        return NULO
+    return int(round(float(valor) * ESCALA))
+
+
+def _es_verdadero(valor) -> bool:
+    return valor in (True, 1, '1', 'True', 'true')
+
+
+def tipo_registro(ids_fuentes: List[str]) -> np.dtype:
+    """dtype estructurado (empaquetado, little-endian) de un registro."""
+    campos = [('timestamp', '<i8')]
+    for id_fuente in ids_fuentes:
+        campos += [(f'tc_{id_fuente}_compra', '<i4'), (f'tc_{id_fuente}_venta', '<i4')]
+    campos.append(('banderas', '<u4'))
+    return np.dtype(campos)
+
+
+def _cabecera(ids_fuentes: List[str]) -> bytes:
+    ids = ",".join(ids_fuentes).encode('utf-8')
+    datos = CABECERA.pack(MAGIA, VERSION, len(ids_fuentes), len(ids)) + ids
+    return datos + b'\0' * (-len(datos) % 8)
+
+
+def _leer_cabecera(archivo) -> Tuple[List[str], int]:
+    """Devuelve (ids de fuentes, tamaño del encabezado en bytes)."""
+    archivo.seek(0)
+    datos = archivo.read(CABECERA.size)
+    if len(datos) < CABECERA.size:
+        raise ValueError("Archivo binario incompleto (sin encabezado)")
+    magia, version, n_fuentes, largo = CABECERA.unpack(datos)
+    if magia != MAGIA:
+        raise ValueError("No es una bitácora de TipoCambio.pe")
+    if version != VERSION:
+        raise ValueError(f"Versión de bitácora no soportada: {version}")
+    ids = archivo.read(largo).decode('utf-8').split(',') if largo else []
+    if len(ids) != n_fuentes:
+        raise ValueError("Encabezado de bitácora corrupto")
+    tamano = CABECERA.size + largo
+    return ids, tamano + (-tamano % 8)
+
+
+def _nombre_fuente(id_fuente: str) -> str:
+    try:
+        return obtener_fuente(id_fuente).nombre
+    except KeyError:  # fuente que ya no está registrada
+        return id_fuente
+
+
+def columnas_de(ids_fuentes: List[str]) -> List[str]:
+    """Columnas del CSV para las fuentes de una bitácora (ver fuentes.columnas_csv)."""
+    columnas = ['timestamp']
+    for id_fuente in ids_fuentes:
+        columnas += [f'tc_{id_fuente}_compra', f'tc_{id_fuente}_venta']
+    return (columnas + [f'spread_{id_fuente}' for id_fuente in ids_fuentes]
+            + ['mejor_compra', 'mejor_venta', 'cambio_detectado'])
+
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+class EscritorBinario:
+    """
+    Agrega registros al final de una bitácora binaria.
+
+    Las fuentes de un archivo nuevo son las registradas en fuentes.py; si
+    el archivo ya existe se usan las de su encabezado. Un registro
+    incompleto al final (proceso cortado a mitad de escritura) se descarta
+    al abrir.
+
+    Args:
+        ruta: Ruta del archivo
+        ids_fuentes: Fuentes de un archivo nuevo (por defecto, las registradas)
+    """
+
+    def __init__(self, ruta: str = RUTA_BINARIO, ids_fuentes: Optional[List[str]] = None):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._archivo = open(ruta, 'a+b')
+
+        if os.fstat(self._archivo.fileno()).st_size == 0:
+            self._archivo.write(_cabecera(ids_fuentes or [f.id for f in obtener_fuentes()]))
+            self._archivo.flush()
+        self.ids_fuentes, inicio = _leer_cabecera(self._archivo)
+        self.tipo = tipo_registro(self.ids_fuentes)
+
+        # Descartar un registro a medio escribir y recordar el último timestamp
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        sobrante = (tamano - inicio) % self.tipo.itemsize
+        if sobrante:
+            logger.warning(f"{self.ruta}: se descarta un registro incompleto ({sobrante} bytes)")
+            self._archivo.truncate(tamano - sobrante)
+            tamano -= sobrante
+        self._ultimo = None
+        if tamano > inicio:
+            self._archivo.seek(tamano - self.tipo.itemsize)
+            self._ultimo = int(np.frombuffer(self._archivo.read(self.tipo.itemsize), self.tipo)['timestamp'][0])
+
+    def _empaquetar(self, registros: List[Dict]) -> np.ndarray:
+        filas = np.zeros(len(registros), dtype=self.tipo)
+        for i, registro in enumerate(registros):
+            fila = filas[i]
+            fila['timestamp'] = a_epoch(registro['timestamp'])
+            banderas = 0
+            for bit, id_fuente in enumerate(self.ids_fuentes):
+                compra = _a_entero(registro.get(f'tc_{id_fuente}_compra'))
+                venta = _a_entero(registro.get(f'tc_{id_fuente}_venta'))
+                fila[f'tc_{id_fuente}_compra'] = compra
+                fila[f'tc_{id_fuente}_venta'] = venta
+                # Los registros del CSV no traen '<fuente>_exito': se deduce de las tasas
+                exito = registro.get(f'{id_fuente}_exito', compra != NULO and venta != NULO)
+                if exito:
+                    banderas |= 1 << bit
+            if _es_verdadero(registro.get('cambio_detectado')):
+                banderas |= BIT_CAMBIO
+            fila['banderas'] = banderas
+        return filas
+
+    def escribir_lote(self, registros: List[Dict]) -> int:
+        """
+        Agrega varios registros con una sola escritura.
+
+        Raises:
+            ValueError: Si un timestamp es anterior al último guardado (la
+                búsqueda por rango necesita el archivo ordenado)
+        """
+        if not registros:
+            return 0
+        filas = self._empaquetar(registros)
+        with self._lock:
+            marcas = filas['timestamp']
+            if np.any(np.diff(marcas) < 0) or (self._ultimo is not None and marcas[0] < self._ultimo):
+                raise ValueError(f"Registros fuera de orden para {self.ruta}")
+            self._archivo.write(filas.tobytes())
+            self._archivo.flush()
+            self._ultimo = int(marcas[-1])
+        return len(registros)
+
+    def escribir(self, registro: Dict) -> None:
+        self.escribir_lote([registro])
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if not self._archivo.closed:
+                os.fsync(self._archivo.fileno())
+                self._archivo.close()
+
+    def __enter__(self) -> "EscritorBinario":
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        self.cerrar()
+
+
+# ============================================================
+# LECTURA
+# ============================================================
+class LectorBinario:
+    """
+    Lector de una bitácora binaria mapeada en memoria.
+
+    `registros` es un arreglo estructurado de NumPy sobre el mmap (sin
+    copia, de solo lectura) y `columna()` devuelve vistas de sus campos.
+    Las vistas dejan de ser válidas después de cerrar() o refrescar().
+
+    Args:
+        ruta: Ruta del archivo
+
+    Raises:
+        ValueError: Si el archivo no es una bitácora válida
+    """
+
+    def __init__(self, ruta: str = RUTA_BINARIO):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'rb')
+        self.ids_fuentes, self._inicio = _leer_cabecera(self._archivo)
+        self.tipo = tipo_registro(self.ids_fuentes)
+        self._mapa = None
+        self.refrescar()
+
+    def refrescar(self) -> int:
+        """Vuelve a mapear el archivo para ver los registros agregados. Devuelve el total."""
+        self._soltar()
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        total = (tamano - self._inicio) // self.tipo.itemsize
+        if total:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self.registros = np.frombuffer(self._mapa, dtype=self.tipo, count=total, offset=self._inicio)
+        else:
+            self.registros = np.zeros(0, dtype=self.tipo)
+        return total
+
+    def __len__(self) -> int:
+        return len(self.registros)
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Vista de un campo: 'timestamp', 'tc_<fuente>_compra/venta' o 'banderas'."""
+        return self.registros[nombre]
+
+    def tasas(self, nombre: str) -> np.ndarray:
+        """Tasas de una columna en soles (float64, NaN si no hay tasa). Copia los datos."""
+        enteros = self.registros[nombre]
+        return np.where(enteros == NULO, np.nan, enteros / ESCALA)
+
+    def exito(self, id_fuente: str) -> np.ndarray:
+        """`<fuente>_exito` como arreglo de bool."""
+        return (self.registros['banderas'] & (1 << self.ids_fuentes.index(id_fuente))) != 0
+
+    def rango(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Índices [inicio, fin) de los registros con timestamp en [desde, hasta].
+
+        Búsqueda binaria sobre la columna de timestamps: O(log n).
+
+        Args:
+            desde: Timestamp o fecha inicial
+            hasta: Timestamp o fecha final (inclusive)
+        """
+        marcas = self.registros['timestamp']
+        inicio = 0 if desde is None else int(np.searchsorted(marcas, _limite(desde, False), 'left'))
+        fin = len(marcas) if hasta is None else int(np.searchsorted(marcas, _limite(hasta, True), 'right'))
+        return inicio, max(inicio, fin)
+
+    def a_dict(self, indice: int) -> Dict:
+        """Registro con el esquema del CSV (spreads y mejor opción recalculados)."""
+        fila = self.registros[indice]
+        registro = {'timestamp': de_epoch(fila['timestamp'])}
+        for id_fuente in self.ids_fuentes:
+            for campo in (f'tc_{id_fuente}_compra', f'tc_{id_fuente}_venta'):
+                registro[campo] = None if fila[campo] == NULO else round(int(fila[campo]) / ESCALA, 4)
+        for id_fuente in self.ids_fuentes:
+            # Como utils.calcular_spread, sin advertir de nuevo por cada lectura
+            compra, venta = registro[f'tc_{id_fuente}_compra'], registro[f'tc_{id_fuente}_venta']
+            registro[f'spread_{id_fuente}'] = None if compra is None or venta is None else round(venta - compra, 4)
+        registro['mejor_compra'] = determinar_mejor_opcion(
+            {_nombre_fuente(i): registro[f'tc_{i}_venta'] for i in self.ids_fuentes}, 'compra')
+        registro['mejor_venta'] = determinar_mejor_opcion(
+            {_nombre_fuente(i): registro[f'tc_{i}_compra'] for i in self.ids_fuentes}, 'venta')
+        registro['cambio_detectado'] = bool(fila['banderas'] & BIT_CAMBIO)
+        return registro
+
+    def iterar(self, inicio: int = 0, fin: Optional[int] = None) -> Iterable[Dict]:
+        for indice in range(inicio, len(self) if fin is None else fin):
+            yield self.a_dict(indice)
+
+    def _soltar(self) -> None:
+        self.registros = np.zeros(0, dtype=self.tipo)
+        if self._mapa is not None:
+            try:
+                self._mapa.close()
+            except BufferError:
+                # Alguien conserva una vista: el mapa se libera con ella
+                pass
+            self._mapa = None
+
+    def cerrar(self) -> None:
+        self._soltar()
+        self._archivo.close()
+
+    def __enter__(self) -> "LectorBinario":
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        self.cerrar()
+
+
+# ============================================================
+# BACKEND DE ALMACENAMIENTO
+# ============================================================
+class AlmacenamientoBinario(Almacenamiento):
+    """
+    Histórico en la bitácora binaria (TIPOCAMBIO_BACKEND=binario).
+
+    Args:
+        ruta: Ruta del archivo
+    """
+
+    def __init__(self, ruta: str = RUTA_BINARIO):
+        self.ruta = ruta
+        self._escritor = EscritorBinario(ruta)
+        self._lector = LectorBinario(ruta)
+
+    def guardar_lote(self, registros: List[Dict]) -> int:
+        try:
+            total = self._escritor.escribir_lote(registros)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error guardando en la bitácora binaria: {e}")
+            return 0
+        logger.info(f"{total} registros guardados en {self.ruta}")
+        return total
+
+    def ultimo_registro(self) -> Optional[Dict]:
+        if not self._lector.refrescar():
+            return None
+        return self._lector.a_dict(-1)
+
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  fuente: Optional[str] = None) -> List[Dict]:
+        self._lector.refrescar()
+        registros = list(self._lector.iterar(*self._lector.rango(desde, hasta)))
+        if fuente is None:
+            return registros
+        return [_fila_de_fuente(r, obtener_fuente(fuente)) for r in registros]
+
+    def iterar_lotes(self, tamano: int = TAMANO_LOTE) -> Iterable[List[Dict]]:
+        total = self._lector.refrescar()
+        for inicio in range(0, total, tamano):
+            yield list(self._lector.iterar(inicio, min(inicio + tamano, total)))
+
+    def cerrar(self) -> None:
+        self._lector.cerrar()
+        self._escritor.cerrar()
+
+
+# ============================================================
+# CONVERSIÓN CSV <-> BINARIO
+# ============================================================
+def csv_a_binario(ruta_csv: str = RUTA_CSV_HISTORICO, ruta: str = RUTA_BINARIO,
+                  tamano_lote: int = TAMANO_LOTE) -> int:
+    """
+    Convierte el CSV histórico a una bitácora binaria nueva.
+
+    El destino se reemplaza. Las filas se ordenan por timestamp (el CSV
+    puede tener filas agregadas fuera de orden).
+
+    Returns:
+        int: Registros convertidos
+    """
+    registros = [r for lote in _leer_en_lotes(ruta_csv, tamano_lote) for r in lote]
+    registros.sort(key=lambda r: r['timestamp'])
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    total = 0
+    with EscritorBinario(ruta) as escritor:
+        for i in range(0, len(registros), tamano_lote):
+            total += escritor.escribir_lote(registros[i:i + tamano_lote])
+    return total
+
+
+def binario_a_csv(ruta: str = RUTA_BINARIO, ruta_csv: str = RUTA_CSV_EXPORTADO) -> int:
+    """
+    Escribe la bitácora como CSV con el esquema del histórico.
+
+    El CSV de destino se reemplaza; por defecto es un archivo aparte
+    (RUTA_CSV_EXPORTADO), no el histórico que usa el recolector.
+
+    Returns:
+        int: Registros escritos
+    """
+    with LectorBinario(ruta) as lector:
+        columnas = columnas_de(lector.ids_fuentes)
+        temporal = f"{ruta_csv}.tmp"
+        with open(temporal, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=columnas)
+            escritor.writeheader()
+            for registro in lector.iterar():
+                escritor.writerow({
+                    c: f"{v:.4f}" if isinstance(v, float) else v
+                    for c, v in registro.items()
+                })
+        os.replace(temporal, ruta_csv)
+        return len(lector)
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bitácora binaria de cotizaciones")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    importar = subcomandos.add_parser('importar', help="CSV histórico -> bitácora (reemplaza la bitácora)")
+    importar.add_argument('--csv', default=RUTA_CSV_HISTORICO, help="CSV de origen")
+    exportar = subcomandos.add_parser('exportar', help="Bitácora -> CSV (reemplaza el CSV de destino)")
+    exportar.add_argument('--csv', default=RUTA_CSV_EXPORTADO,
+                          help="CSV de destino (por defecto, tipo_cambio_historico_desde_binario.csv)")
+    parser.add_argument('--binario', default=RUTA_BINARIO, help="Archivo de la bitácora")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print(f"   🧾 BITÁCORA BINARIA: {args.comando}")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    if args.comando == 'importar':
+        print(f"\n  Registros convertidos: {csv_a_binario(args.csv, args.binario)}")
+    else:
+        print(f"\n  Registros exportados:  {binario_a_csv(args.binario, args.csv)}")
+
+    print(f"  Bitácora: {os.path.abspath(args.binario)}")
+    print(f"  Tiempo:   {time.perf_counter() - inicio:.2f}s")
+    print("=" * 50 + "\n")
@@ -0,0 +1,251 @@
+"""
+reprocesar.py - Recalcula las columnas derivadas del histórico CSV
+
+Cuando se corrige calcular_spread o se agrega una métrica, las filas ya
+guardadas conservan los valores viejos. Este módulo recorre el histórico
+en bloques de tamaño fijo y recalcula, en forma vectorizada (ver
+metricas.py):
+
+    - spread_<fuente>
+    - mejor_compra / mejor_venta
+    - cambio_detectado (respecto a la fila anterior, como hubo_cambio)
+
+Las tasas se copian tal cual. Con `corregir_invertidas` se intercambian
+compra y venta de una fuente cuando la venta es menor que la compra (las
+filas del BCRP con spread negativo vienen de esa confusión de columnas).
+
+La memoria queda acotada por el tamaño del bloque: solo se mantiene un
+bloque por proceso más la última fila del bloque anterior. El resultado se
+escribe en un archivo temporal que reemplaza al destino al terminar, así
+nunca queda un CSV a medias. Para reemplazar el histórico en uso conviene
+detener antes el recolector (main.py / la app), que lo tiene abierto.
+
+Uso:
+    python reprocesar.py                          # escribe ..._reprocesado.csv
+    python reprocesar.py --corregir-invertidas --procesos 4
+    python reprocesar.py --reemplazar             # reemplaza el histórico
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fuentes import Fuente, obtener_fuente
+from almacenamiento import RUTA_CSV_HISTORICO, _leer_en_lotes
+from metricas import _a_float, calcular_metricas_lote, matrices_de_registros
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+TAMANO_BLOQUE = 50_000  # filas por bloque
+
+
+def _fuentes_del_encabezado(columnas: List[str]) -> List[Fuente]:
+    """Fuentes con columnas de tasas en el CSV, en el orden del archivo."""
+    fuentes = []
+    for columna in columnas:
+        if columna.startswith('tc_') and columna.endswith('_compra'):
+            id_fuente = columna[3:-len('_compra')]
+            try:
+                fuentes.append(obtener_fuente(id_fuente))
+            except KeyError:  # fuente que ya no está registrada
+                fuentes.append(Fuente(id=id_fuente, nombre=id_fuente, tipo='api',
+                                      extractor='', ttl=0, costo='bajo'))
+    return fuentes
+
+
+def _distintas(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Comparación elemento a elemento donde NaN == NaN (tasa ausente en ambas)."""
+    return ~((a == b) | (np.isnan(a) & np.isnan(b)))
+
+
+def _tasas(registros: List[Dict], fuentes: List[Fuente],
+           corregir_invertidas: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Matrices (compras, ventas, invertidas), con compra y venta ya intercambiadas si se pidió."""
+    compras, ventas = matrices_de_registros(registros, fuentes)
+    invertidas = (ventas < compras) if corregir_invertidas else np.zeros(compras.shape, dtype=bool)
+    return np.where(invertidas, ventas, compras), np.where(invertidas, compras, ventas), invertidas
+
+
+def _texto(valor: float) -> str:
+    return '' if np.isnan(valor) else f"{valor:.4f}"
+
+
+def reprocesar_bloque(registros: List[Dict], fuentes: List[Fuente],
+                      anterior: Optional[np.ndarray], corregir_invertidas: bool) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Recalcula las columnas derivadas de un bloque.
+
+    Args:
+        registros: Filas del CSV (textos)
+        fuentes: Fuentes del encabezado
+        anterior: Tasas (compras + ventas) de la última fila del bloque
+            anterior, o None si es el primer bloque
+        corregir_invertidas: Intercambiar compra y venta si venta < compra
+
+    Returns:
+        Tuple (filas recalculadas, contadores de cambios)
+    """
+    compras, ventas, invertidas = _tasas(registros, fuentes, corregir_invertidas)
+    metricas = calcular_metricas_lote(compras, ventas)
+
+    # cambio_detectado: alguna tasa distinta de la fila anterior
+    tasas = np.hstack([compras, ventas])
+    previas = np.empty_like(tasas)
+    previas[1:] = tasas[:-1]
+    previas[0] = anterior if anterior is not None else np.nan
+    cambios = _distintas(tasas, previas).any(axis=1)
+    if anterior is None and len(cambios):
+        cambios[0] = True  # el primer registro siempre es "cambio"
+
+    nombres = [f.nombre for f in fuentes]
+    mejores_compra = metricas.nombres_mejor_compra(nombres)
+    mejores_venta = metricas.nombres_mejor_venta(nombres)
+    spreads_previos = np.array([[_a_float(r.get(f.campo_spread)) for f in fuentes] for r in registros],
+                               dtype=np.float64).reshape(metricas.spreads.shape)
+    contadores = {'filas': len(registros), 'invertidas': int(invertidas.sum()),
+                  'spreads': int(_distintas(spreads_previos, metricas.spreads).sum()),
+                  'mejor_opcion': 0, 'cambio_detectado': 0}
+
+    filas = []
+    for i, registro in enumerate(registros):
+        fila = dict(registro)
+        for j, fuente in enumerate(fuentes):
+            if invertidas[i, j]:
+                fila[fuente.campo_compra], fila[fuente.campo_venta] = registro[fuente.campo_venta], registro[fuente.campo_compra]
+            fila[fuente.campo_spread] = _texto(metricas.spreads[i, j])
+        fila['mejor_compra'] = mejores_compra[i] or ''
+        fila['mejor_venta'] = mejores_venta[i] or ''
+        fila['cambio_detectado'] = str(bool(cambios[i]))
+        contadores['mejor_opcion'] += (fila['mejor_compra'] != registro.get('mejor_compra')
+                                       or fila['mejor_venta'] != registro.get('mejor_venta'))
+        contadores['cambio_detectado'] += fila['cambio_detectado'] != registro.get('cambio_detectado')
+        filas.append(fila)
+
+    return filas, contadores
+
+
+def _leer_encabezado(ruta: str) -> List[str]:
+    with open(ruta, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+
+def reprocesar_historico(ruta: str = RUTA_CSV_HISTORICO, destino: Optional[str] = None,
+                         tamano_bloque: int = TAMANO_BLOQUE, procesos: int = 1,
+                         corregir_invertidas: bool = False) -> Dict[str, int]:
+    """
+    Recalcula las columnas derivadas de todo el histórico y escribe un CSV nuevo.
+
+    Args:
+        ruta: CSV histórico de origen
+        destino: CSV de destino (por defecto, '<origen>_reprocesado.csv';
+            puede ser el mismo origen para reemplazarlo)
+        tamano_bloque: Filas por bloque
+        procesos: Procesos que recalculan bloques en paralelo (1 = en este proceso)
+        corregir_invertidas: Intercambiar compra y venta si venta < compra
+
+    Returns:
+        Dict con los contadores de filas y de valores que cambiaron
+    """
+    destino = destino or os.path.splitext(ruta)[0] + "_reprocesado.csv"
+    columnas = _leer_encabezado(ruta)
+    fuentes = _fuentes_del_encabezado(columnas)
+    totales = {'filas': 0, 'invertidas': 0, 'spreads': 0, 'mejor_opcion': 0, 'cambio_detectado': 0}
+
+    def sumar(contadores):
+        for clave, valor in contadores.items():
+            totales[clave] += valor
+
+    def ultima_fila(lote) -> np.ndarray:
+        # Las tasas de la última fila, ya corregidas, para el cambio_detectado del bloque siguiente
+        compras, ventas, _ = _tasas(lote[-1:], fuentes, corregir_invertidas)
+        return np.hstack([compras, ventas])[0]
+
+    temporal = f"{destino}.tmp"
+    try:
+        with open(temporal, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=columnas)
+            escritor.writeheader()
+
+            if procesos <= 1:
+                anterior = None
+                for lote in _leer_en_lotes(ruta, tamano_bloque):
+                    filas, contadores = reprocesar_bloque(lote, fuentes, anterior, corregir_invertidas)
+                    escritor.writerows(filas)
+                    sumar(contadores)
+                    anterior = ultima_fila(lote)
+            else:
+                # A lo sumo 2 bloques en vuelo por proceso: la memoria no crece con el archivo
+                with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                    en_vuelo = deque()
+                    anterior = None
+                    for lote in _leer_en_lotes(ruta, tamano_bloque):
+                        en_vuelo.append(ejecutor.submit(reprocesar_bloque, lote, fuentes, anterior, corregir_invertidas))
+                        anterior = ultima_fila(lote)
+                        if len(en_vuelo) >= 2 * procesos:
+                            filas, contadores = en_vuelo.popleft().result()
+                            escritor.writerows(filas)
+                            sumar(contadores)
+                    while en_vuelo:
+                        filas, contadores = en_vuelo.popleft().result()
+                        escritor.writerows(filas)
+                        sumar(contadores)
+
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    logger.info(f"{totales['filas']} filas reprocesadas en {destino}")
+    return totales
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula spreads, mejor opción y cambio_detectado del histórico")
+    parser.add_argument('--csv', default=RUTA_CSV_HISTORICO, help="CSV histórico de origen")
+    parser.add_argument('--destino', default=None, help="CSV de destino (por defecto, <origen>_reprocesado.csv)")
+    parser.add_argument('--reemplazar', action='store_true', help="Reemplazar el CSV de origen")
+    parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help="Filas por bloque")
+    parser.add_argument('--procesos', type=int, default=1, help="Procesos en paralelo")
+    parser.add_argument('--corregir-invertidas', action='store_true',
+                        help="Intercambiar compra y venta cuando la venta es menor")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print("   🔁 REPROCESAR HISTÓRICO")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    destino = args.csv if args.reemplazar else args.destino
+    totales = reprocesar_historico(args.csv, destino, args.bloque, args.procesos, args.corregir_invertidas)
+
+    print(f"\n  Filas:                   {totales['filas']}")
+    print(f"  Tasas invertidas:        {totales['invertidas']}")
+    print(f"  Spreads corregidos:      {totales['spreads']}")
+    print(f"  Mejor opción corregida:  {totales['mejor_opcion']}")
+    print(f"  cambio_detectado:        {totales['cambio_detectado']}")
+    print(f"  Tiempo:                  {time.perf_counter() - inicio:.2f}s")
+    print("=" * 50 + "\n")
@@ -10,38 +10,75 @@ Series utilizadas:
     - PD04638PD: Tipo de cambio compra
     - PD04639PD: Tipo de cambio venta
 
+Otras series (euro, indicadores del dólar, ...) se piden juntas con
+obtener_series_bcrp, que las agrupa en la menor cantidad de peticiones.
+
+Las consultas pasan por el cliente compartido de cliente_bcrp.py (sesión
+keep-alive, reintentos con backoff y caché en disco con ETag).
+
 Autor: Javier Uraco (@JavierAnthonyUS)
 Fecha: Diciembre 2025
 Última modificación: Diciembre 2025 - Testeado y optimizado
 """
 
+import os
+import sys
+import csv
 import requests
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set, Tuple
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Agregar el directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cliente_bcrp import BASE_URL, FORMATO, TIMEOUT, ZONA_LIMA, obtener_cliente
+from utils import cargar_ultimos_registros
+from escritor_csv import _bloquear, _desbloquear
+
 # ============================================================
 # CONFIGURACIÓN DE LA API DEL BCRP
 # ============================================================
-BASE_URL = "https://estadisticas.bcrp.gob.pe/estadisticas/series/api"
 SERIES_COMPRA = "PD04638PD"  # Serie oficial de tipo de cambio compra
 SERIES_VENTA = "PD04639PD"   # Serie oficial de tipo de cambio venta
-FORMATO = "json"
-TIMEOUT = 30  # segundos
+DIAS_CONSULTA = 7            # Rango por defecto cuando no hay histórico local
 
+# Columna de cada serie conocida; las demás usan 'bcrp_<codigo>'
+COLUMNAS_SERIES = {
+    SERIES_COMPRA: 'tc_bcrp_compra',
+    SERIES_VENTA: 'tc_bcrp_venta',
+}
+# Longitud máxima de URL por petición al agrupar series (margen holgado
+# bajo el límite habitual de servidores y proxies)
+LONGITUD_MAXIMA_URL = 2000
 
-def construir_url(fecha_inicio: str, fecha_fin: str) -> str:
+# Histórico diario local (lo llena backfill_bcrp.py y cada consulta incremental)
+RUTA_BCRP_HISTORICO = os.path.join(os.path.dirname(__file__), "..", "data", "processed", "bcrp_historico.csv")
+COLUMNAS_BCRP = ['fecha', 'fecha_bcrp', 'tc_bcrp_compra', 'tc_bcrp_venta']
+
+# Calendario de publicación: el BCRP publica el tipo de cambio de cada día
+# hábil en la tarde (hora de Lima, ZONA_LIMA)
+HORA_PUBLICACION = time(13, 0)
+FERIADOS_FIJOS = {
+    (1, 1), (5, 1), (6, 7), (6, 29), (7, 23), (7, 28), (7, 29),
+    (8, 6), (8, 30), (10, 8), (11, 1), (12, 8), (12, 9), (12, 25),
+}
+
+
+def construir_url(fecha_inicio: str, fecha_fin: str,
+                  series: Optional[List[str]] = None) -> str:
     """
     Construye la URL para consultar la API del BCRP.
     
     Args:
         fecha_inicio: Fecha inicial en formato 'YYYY-MM-DD'
         fecha_fin: Fecha final en formato 'YYYY-MM-DD'
+        series: Códigos de series (por defecto, compra y venta)
     
     Returns:
         str: URL completa para la consulta
@@ -50,9 +87,46 @@ def construir_url(fecha_inicio: str, fecha_fin: str) -> str:
         >>> construir_url("2025-12-01", "2025-12-13")
         'https://estadisticas.bcrp.gob.pe/estadisticas/series/api/PD04638PD-PD04639PD/json/2025-12-01/2025-12-13'
     """
-    series = f"{SERIES_COMPRA}-{SERIES_VENTA}"
-    url = f"{BASE_URL}/{series}/{FORMATO}/{fecha_inicio}/{fecha_fin}"
-    return url
+    series = series or [SERIES_COMPRA, SERIES_VENTA]
+    return obtener_cliente().construir_url(series, fecha_inicio, fecha_fin)
+
+
+def columna_serie(codigo: str) -> str:
+    """
+    Nombre de columna para una serie.
+    
+    Ejemplo:
+        >>> columna_serie('PD04638PD'), columna_serie('PD04648PD')
+        ('tc_bcrp_compra', 'bcrp_pd04648pd')
+    """
+    return COLUMNAS_SERIES.get(codigo, f'bcrp_{codigo.lower()}')
+
+
+def agrupar_series(series: List[str], fecha_inicio: str, fecha_fin: str,
+                   max_longitud: int = LONGITUD_MAXIMA_URL, cliente=None) -> List[List[str]]:
+    """
+    Reparte las series en la menor cantidad de peticiones que permite la
+    longitud de URL (se llena cada grupo en orden antes de abrir otro).
+    
+    Args:
+        series: Códigos de series
+        fecha_inicio: Fecha inicial 'YYYY-MM-DD'
+        fecha_fin: Fecha final 'YYYY-MM-DD'
+        max_longitud: Largo máximo de cada URL
+        cliente: ClienteBCRP que hará las peticiones (su base_url cuenta
+            en el largo; por defecto, el compartido)
+    
+    Returns:
+        List[List[str]]: Grupos de códigos, uno por petición
+    """
+    cliente = cliente or obtener_cliente()
+    grupos = []
+    for codigo in dict.fromkeys(series):  # sin duplicados, en orden
+        if grupos and len(cliente.construir_url(grupos[-1] + [codigo], fecha_inicio, fecha_fin)) <= max_longitud:
+            grupos[-1].append(codigo)
+        else:
+            grupos.append([codigo])
+    return grupos
 
 
 def formatear_tipo_cambio(valor: float) -> float:
@@ -70,6 +144,251 @@ def formatear_tipo_cambio(valor: float) -> float:
     return round(float(valor), 4)
 
 
+# Abreviaturas de mes que usa el BCRP en los nombres de periodo ('18.Dic.25')
+MESES_BCRP = {
+    'Ene': 1, 'Feb': 2, 'Mar': 3, 'Abr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Ago': 8, 'Set': 9, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dic': 12,
+}
+
+
+def parsear_fecha_bcrp(nombre: str) -> Optional[date]:
+    """
+    Convierte el nombre de un periodo diario del BCRP a fecha.
+
+    Args:
+        nombre: Nombre del periodo, p. ej. '18.Dic.25'
+
+    Returns:
+        date: Fecha del periodo, o None si el formato no es reconocido
+
+    Ejemplo:
+        >>> parsear_fecha_bcrp('18.Dic.25')
+        datetime.date(2025, 12, 18)
+    """
+    try:
+        dia, mes, anio = nombre.split('.')
+        return date(2000 + int(anio), MESES_BCRP[mes.capitalize()], int(dia))
+    except (ValueError, KeyError, AttributeError):
+        return None
+
+
+def parsear_valor_bcrp(valor) -> Optional[float]:
+    """
+    Convierte un valor de la API a float; 'n.d.' (no disponible) da None.
+
+    Ejemplo:
+        >>> parsear_valor_bcrp('3.363'), parsear_valor_bcrp('n.d.')
+        (3.363, None)
+    """
+    if valor in (None, '', 'n.d.'):
+        return None
+    try:
+        return formatear_tipo_cambio(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def parsear_periodos(data: Dict, columnas: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Convierte todos los periodos de una respuesta en filas.
+
+    La API devuelve en cada periodo un valor por serie, en el mismo orden
+    en que se pidieron las series; `columnas` nombra esas posiciones.
+    Los días sin dato ('n.d.') se conservan con valores en None.
+
+    Args:
+        data: Respuesta JSON de la API ('periods')
+        columnas: Columna de cada serie pedida (por defecto, compra y venta)
+
+    Returns:
+        List[Dict]: Filas con 'fecha' (YYYY-MM-DD), 'fecha_bcrp' y una
+        clave por columna
+    """
+    columnas = columnas or ['tc_bcrp_compra', 'tc_bcrp_venta']
+    filas = []
+    for periodo in data.get('periods', []):
+        fecha = parsear_fecha_bcrp(periodo.get('name', ''))
+        if fecha is None:
+            logger.warning(f"Periodo BCRP con fecha no reconocida: {periodo.get('name')}")
+            continue
+        valores = list(periodo.get('values', []))
+        valores += [None] * (len(columnas) - len(valores))
+        fila = {'fecha': fecha.isoformat(), 'fecha_bcrp': periodo['name']}
+        for columna, valor in zip(columnas, valores):
+            fila[columna] = parsear_valor_bcrp(valor)
+        filas.append(fila)
+    return filas
+
+
+def obtener_series_bcrp(series: List[str], fecha_inicio: str, fecha_fin: str,
+                        cliente=None, frescura: Optional[float] = None) -> List[Dict]:
+    """
+    Descarga varias series en el mínimo de peticiones y las separa en
+    columnas.
+    
+    Args:
+        series: Códigos de series, p. ej. ['PD04638PD', 'PD04639PD', ...]
+        fecha_inicio: Fecha inicial 'YYYY-MM-DD'
+        fecha_fin: Fecha final 'YYYY-MM-DD'
+        cliente: ClienteBCRP a usar (por defecto, el compartido)
+        frescura: Segundos que sirve una respuesta del caché (por defecto,
+            la del cliente; 0 revalida con el BCRP)
+    
+    Returns:
+        List[Dict]: Una fila por fecha (ordenadas), con 'fecha',
+        'fecha_bcrp' y una columna por serie (ver columna_serie)
+    
+    Raises:
+        ValueError: Si la respuesta no trae una serie por código pedido
+    
+    Ejemplo:
+        >>> filas = obtener_series_bcrp(['PD04638PD', 'PD04639PD'], '2025-12-01', '2025-12-13')
+        >>> filas[-1]
+        {'fecha': '2025-12-12', 'fecha_bcrp': '12.Dic.25', 'tc_bcrp_compra': 3.363, 'tc_bcrp_venta': 3.368}
+    """
+    cliente = cliente or obtener_cliente()
+    columnas = [columna_serie(codigo) for codigo in dict.fromkeys(series)]
+    por_fecha: Dict[str, Dict] = {}
+    for grupo in agrupar_series(series, fecha_inicio, fecha_fin, cliente=cliente):
+        data = cliente.obtener_series(grupo, fecha_inicio, fecha_fin, frescura=frescura)
+        devueltas = data.get('config', {}).get('series')
+        if devueltas is not None and len(devueltas) != len(grupo):
+            raise ValueError(f"El BCRP devolvió {len(devueltas)} series para {len(grupo)} pedidas: {grupo}")
+        for fila in parsear_periodos(data, [columna_serie(codigo) for codigo in grupo]):
+            por_fecha.setdefault(fila['fecha'], dict.fromkeys(['fecha', 'fecha_bcrp'] + columnas)).update(fila)
+    return [por_fecha[fecha] for fecha in sorted(por_fecha)]
+
+
+# ============================================================
+# CALENDARIO DE PUBLICACIÓN
+# ============================================================
+def _domingo_de_pascua(anio: int) -> date:
+    # Algoritmo de Meeus/Jones/Butcher (calendario gregoriano)
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    mes = (h + l - 7 * m + 90) // 25
+    dia = (h + l - 7 * m + 33 * mes + 19) % 32
+    return date(anio, mes, dia)
+
+
+def es_dia_habil(fecha: date) -> bool:
+    """
+    Indica si el BCRP publica tipo de cambio ese día (lunes a viernes que
+    no sean feriados nacionales, incluidos Jueves y Viernes Santo).
+
+    Ejemplo:
+        >>> es_dia_habil(date(2025, 12, 8)), es_dia_habil(date(2025, 12, 10))
+        (False, True)
+    """
+    if fecha.weekday() >= 5 or (fecha.month, fecha.day) in FERIADOS_FIJOS:
+        return False
+    pascua = _domingo_de_pascua(fecha.year)
+    return fecha not in (pascua - timedelta(days=3), pascua - timedelta(days=2))
+
+
+def ultima_fecha_publicada(ahora: Optional[datetime] = None) -> date:
+    """
+    Último día hábil cuyo tipo de cambio ya debería estar publicado.
+
+    Args:
+        ahora: Momento de referencia (por defecto, ahora en Lima)
+
+    Returns:
+        date: Hoy si es hábil y ya pasó HORA_PUBLICACION; si no, el día
+        hábil anterior
+    """
+    ahora = ahora or datetime.now(ZONA_LIMA)
+    fecha = ahora.date()
+    if ahora.time() < HORA_PUBLICACION:
+        fecha -= timedelta(days=1)
+    while not es_dia_habil(fecha):
+        fecha -= timedelta(days=1)
+    return fecha
+
+
+# ============================================================
+# HISTÓRICO LOCAL
+# ============================================================
+def guardar_observaciones(filas: List[Dict], ruta: str = RUTA_BCRP_HISTORICO) -> int:
+    """
+    Agrega filas al final del histórico local.
+
+    La app web y main.py pueden consultar a la vez: las fechas guardadas
+    se releen con el bloqueo del archivo tomado (el mismo de
+    escritor_csv.py), así dos ciclos no agregan los mismos días.
+
+    Args:
+        filas: Filas de parsear_periodos, posteriores a la última con tasas
+        ruta: CSV histórico del BCRP
+
+    Returns:
+        int: Filas agregadas (ver filas_por_guardar)
+    """
+    if not filas:
+        return 0
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'a+', newline='', encoding='utf-8') as f:
+        _bloquear(f)
+        try:
+            _, guardadas, sin_datos = _ultimas_filas(ruta)
+            filas = filas_por_guardar(filas, guardadas, sin_datos)
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS_BCRP)
+            if os.fstat(f.fileno()).st_size == 0:
+                escritor.writeheader()
+            escritor.writerows(filas)
+            f.flush()
+        finally:
+            _desbloquear(f)
+    return len(filas)
+
+
+def filas_por_guardar(filas: List[Dict], guardadas: Set[str], sin_datos: Set[str]) -> List[Dict]:
+    """
+    Filas de fechas que no están en el histórico, y de días guardados como
+    'n.d.' que ya tienen tasas (quedan como una fila posterior).
+
+    Args:
+        filas: Filas de parsear_periodos
+        guardadas: Fechas 'YYYY-MM-DD' ya guardadas
+        sin_datos: Fechas guardadas solo como 'n.d.'
+    """
+    return [f for f in filas if f['fecha'] not in guardadas
+            or (f['fecha'] in sin_datos and _tiene_tasas(f))]
+
+
+def _resultado_desde_fila(resultado: Dict, fila: Dict) -> Dict:
+    resultado['tc_bcrp_compra'] = parsear_valor_bcrp(fila.get('tc_bcrp_compra'))
+    resultado['tc_bcrp_venta'] = parsear_valor_bcrp(fila.get('tc_bcrp_venta'))
+    resultado['fecha_bcrp'] = fila.get('fecha_bcrp')
+    resultado['exito'] = True
+    return resultado
+
+
+def _tiene_tasas(fila: Dict) -> bool:
+    return bool(fila.get('tc_bcrp_compra') and fila.get('tc_bcrp_venta'))
+
+
+def _ultimas_filas(ruta: str, max_filas: int = 30) -> Tuple[Optional[Dict], Set[str], Set[str]]:
+    """
+    (última fila con tasas, fechas guardadas, fechas guardadas solo como
+    'n.d.') entre las últimas filas del histórico.
+
+    Se compara por fecha y no por posición: un día 'n.d.' que luego se
+    publicó queda como una fila posterior en el archivo.
+    """
+    filas = cargar_ultimos_registros(ruta, max_filas)
+    validas = [f for f in filas if _tiene_tasas(f)]
+    guardadas = {f['fecha'] for f in filas}
+    ultimo_valido = max(validas, key=lambda f: f['fecha']) if validas else None
+    return ultimo_valido, guardadas, guardadas - {f['fecha'] for f in validas}
+
+
 def obtener_tipo_cambio_bcrp() -> Dict[str, Optional[float]]:
     """
     Obtiene el tipo de cambio actual del BCRP.
@@ -77,6 +396,12 @@ def obtener_tipo_cambio_bcrp() -> Dict[str, Optional[float]]:
     Consulta la API del Banco Central de Reserva del Perú para obtener
     las tasas de compra y venta del tipo de cambio oficial.
     
+    La consulta es incremental: solo se piden las fechas posteriores a la
+    última con tasas en el histórico local (un día guardado como 'n.d.' se
+    vuelve a pedir por si se publicó después), y si según el calendario de
+    publicación el BCRP aún no tiene un dato nuevo, no se consulta la red
+    y se devuelve el último valor guardado.
+    
     Returns:
         Dict con las claves:
             - 'tc_bcrp_compra': Tipo de cambio de compra (float o None)
@@ -110,9 +435,28 @@ def obtener_tipo_cambio_bcrp() -> Dict[str, Optional[float]]:
     }
     
     try:
-        # Definir rango de fechas (últimos 7 días para asegurar datos)
-        fecha_fin = datetime.now()
-        fecha_inicio = fecha_fin - timedelta(days=7)
+        ultimo_valido = _ultimas_filas(RUTA_BCRP_HISTORICO)[0]
+        
+        # Si el BCRP no pudo haber publicado nada nuevo, no consultar la red.
+        # Se mira el último día con tasas: un día guardado como 'n.d.' se
+        # vuelve a pedir por si el BCRP lo publicó después
+        esperada = ultima_fecha_publicada()
+        if ultimo_valido and ultimo_valido['fecha'] >= esperada.isoformat():
+            logger.info(f"BCRP sin publicación nueva desde {ultimo_valido['fecha']} (esperada: {esperada}); "
+                        f"se usa el histórico local")
+            return _resultado_desde_fila(resultado, ultimo_valido)
+        
+        # Definir rango de fechas: desde el día siguiente al último con tasas
+        # (o los últimos DIAS_CONSULTA días si no hay ninguno reciente)
+        fecha_fin = datetime.now(ZONA_LIMA).date()
+        if ultimo_valido:
+            fecha_inicio = date.fromisoformat(ultimo_valido['fecha']) + timedelta(days=1)
+        else:
+            fecha_inicio = fecha_fin - timedelta(days=DIAS_CONSULTA)
+        
+        if fecha_inicio > fecha_fin:
+            # El último día con tasas es hoy: no hay rango que pedir
+            return _resultado_desde_fila(resultado, ultimo_valido)
         
         fecha_inicio_str = fecha_inicio.strftime("%Y-%m-%d")
         fecha_fin_str = fecha_fin.strftime("%Y-%m-%d")
@@ -121,40 +465,25 @@ def obtener_tipo_cambio_bcrp() -> Dict[str, Optional[float]]:
         url = construir_url(fecha_inicio_str, fecha_fin_str)
         logger.info(f"Consultando BCRP API: {url}")
         
-        # Realizar petición
-        response = requests.get(url, timeout=TIMEOUT)
-        response.raise_for_status()
+        # Realizar petición revalidando el caché: si una copia guardada
+        # tuviera la fecha esperada ya estaría en el histórico, así que la
+        # del mismo rango es de antes de la publicación (p. ej. de la mañana).
+        # Con ETag / Last-Modified la revalidación sin cambios es un 304
+        filas = obtener_series_bcrp([SERIES_COMPRA, SERIES_VENTA], fecha_inicio_str, fecha_fin_str,
+                                    frescura=0)
+        
+        # Guardar los periodos nuevos y los días 'n.d.' que ya tienen tasas
+        guardar_observaciones(filas, RUTA_BCRP_HISTORICO)
         
-        # Parsear respuesta JSON
-        data = response.json()
+        # Tomar el último periodo con tasas (los 'n.d.' no sirven como cotización)
+        con_tasas = [f for f in filas if f['tc_bcrp_compra'] is not None and f['tc_bcrp_venta'] is not None]
         
-        # Extraer el último periodo disponible
-        if 'periods' in data and len(data['periods']) > 0:
-            ultimo_periodo = data['periods'][-1]
-            
-            # Obtener valores
-            valores = ultimo_periodo.get('values', [])
-            
-            if len(valores) >= 2:
-                # El primer valor es compra, el segundo es venta
-                tc_compra = valores[0]
-                tc_venta = valores[1]
-                
-                # Convertir y formatear a 4 decimales
-                if tc_compra and tc_compra != 'n.d.':
-                    resultado['tc_bcrp_compra'] = formatear_tipo_cambio(tc_compra)
-                
-                if tc_venta and tc_venta != 'n.d.':
-                    resultado['tc_bcrp_venta'] = formatear_tipo_cambio(tc_venta)
-                
-                # Obtener fecha del periodo
-                resultado['fecha_bcrp'] = ultimo_periodo.get('name', '')
-                resultado['exito'] = True
-                
-                logger.info(f"BCRP - Compra: {resultado['tc_bcrp_compra']}, Venta: {resultado['tc_bcrp_venta']}")
-            else:
-                resultado['error'] = "Datos insuficientes en la respuesta"
-                logger.warning(resultado['error'])
+        if con_tasas:
+            _resultado_desde_fila(resultado, con_tasas[-1])
+            logger.info(f"BCRP - Compra: {resultado['tc_bcrp_compra']}, Venta: {resultado['tc_bcrp_venta']}")
+        elif ultimo_valido:
+            logger.info("BCRP sin periodos nuevos con datos; se usa el histórico local")
+            _resultado_desde_fila(resultado, ultimo_valido)
         else:
             resultado['error'] = "No se encontraron periodos en la respuesta"
             logger.warning(resultado['error'])
@@ -4,6 +4,10 @@ scraper_rextie.py - Extractor de tipo de cambio de Rextie
 Este módulo extrae el tipo de cambio de la casa de cambio digital Rextie
 mediante web scraping con Selenium (página dinámica).
 
+Primero intenta el modo HTTP: consulta directamente el endpoint JSON que
+usa el frontend de Rextie, con la sesión compartida de cliente_http. Solo
+si ese modo falla se abre un navegador con Selenium.
+
 URL: https://rextie.com
 
 Autor: Javier Uraco (@JavierAnthonyUS)
@@ -11,16 +15,16 @@ Fecha: Diciembre 2025
 """
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
-import re
-import time
-from typing import Dict, Optional
+import os
+from contextlib import nullcontext
+from typing import Any, Dict, Optional, Tuple
+
+from cliente_http import obtener_json
+from driver_pool import obtener_pool
+from espera_pagina import esperar_tasas
+from extraccion_dom import EspecificacionExtraccion, extraer_textos, interpretar_textos
+from utils import validar_tipo_cambio
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -29,15 +33,118 @@ logger = logging.getLogger(__name__)
 # Configuración
 URL_REXTIE = "https://rextie.com"
 TIMEOUT = 15  # segundos
+PRESUPUESTO_CARGA = 10  # segundos máximos esperando las tasas
+# Dónde están las tasas en la página (ver extraccion_dom.py).
+# Rextie no tiene ids estables: se buscan las etiquetas dentro del contenedor
+ESPECIFICACION_DOM = EspecificacionExtraccion(
+    fuente='rextie',
+    # Solo el bloque de tasas: 'main' arrastra el listado de operaciones
+    contenedores=('.hero .rates', '.rates'),
+)
+
+# Endpoint JSON del frontend (se puede apuntar a un servidor simulado)
+URL_API_REXTIE = os.environ.get('REXTIE_API_URL', 'https://app.rextie.com/api/v1/fxrates/rate/')
+PARAMS_API_REXTIE = {}
+
+# 'auto' = HTTP primero y Selenium como respaldo; 'http' o 'selenium' fuerzan uno
+MODO_EXTRACCION = os.environ.get('TIPOCAMBIO_MODO', 'auto')
+
+
+def _resultado_vacio() -> Dict[str, Any]:
+    return {
+        'tc_rextie_compra': None,
+        'tc_rextie_venta': None,
+        'exito': False,
+        'error': None
+    }
+
+
+def _extraer_tasas_api(payload: Dict) -> Tuple[Any, Any]:
+    """
+    Extrae (compra, venta) del JSON del endpoint de Rextie.
+    
+    Formato esperado: {'fx_rate_buy': '3.3710', 'fx_rate_sell': '3.3980', ...}
+    """
+    return payload.get('fx_rate_buy'), payload.get('fx_rate_sell')
 
 
-def obtener_tipo_cambio_rextie() -> Dict[str, Optional[float]]:
+def obtener_tipo_cambio_rextie_http(url: Optional[str] = None, sesion=None) -> Dict[str, Optional[float]]:
+    """
+    Obtiene el tipo de cambio de Rextie desde su endpoint JSON (sin navegador).
+    
+    Args:
+        url: URL del endpoint (por defecto URL_API_REXTIE)
+        sesion: Sesión de requests (por defecto, la compartida)
+    
+    Returns:
+        Dict con las mismas claves que obtener_tipo_cambio_rextie()
+    """
+    resultado = _resultado_vacio()
+    url = url or URL_API_REXTIE
+    
+    try:
+        logger.info(f"Consultando Rextie (HTTP): {url}")
+        payload = obtener_json(url, params=PARAMS_API_REXTIE, sesion=sesion)
+        compra, venta = _extraer_tasas_api(payload)
+        compra = round(float(compra), 4) if compra is not None else None
+        venta = round(float(venta), 4) if venta is not None else None
+        
+        if validar_tipo_cambio(compra, 'tc_rextie_compra') and validar_tipo_cambio(venta, 'tc_rextie_venta'):
+            resultado['tc_rextie_compra'] = compra
+            resultado['tc_rextie_venta'] = venta
+            resultado['exito'] = True
+            logger.info(f"Rextie (HTTP) - Compra: {compra}, Venta: {venta}")
+        else:
+            resultado['error'] = f"Tasas inválidas en la respuesta: {compra}, {venta}"
+            logger.warning(resultado['error'])
+    
+    except Exception as e:
+        resultado['error'] = f"Error HTTP: {str(e)}"
+        logger.warning(resultado['error'])
+    
+    return resultado
+
+
+def obtener_tipo_cambio_rextie(driver: Optional[webdriver.Chrome] = None,
+                               modo: Optional[str] = None) -> Dict[str, Optional[float]]:
+    """
+    Obtiene el tipo de cambio actual de Rextie.
+    
+    Intenta primero el modo HTTP y, si falla, recurre a Selenium.
+    
+    Args:
+        driver: Driver ya iniciado para el modo Selenium (opcional)
+        modo: 'auto', 'http' o 'selenium' (por defecto MODO_EXTRACCION)
+    
+    Returns:
+        Dict con las claves:
+            - 'tc_rextie_compra': Tipo de cambio de compra (float o None)
+            - 'tc_rextie_venta': Tipo de cambio de venta (float o None)
+            - 'exito': True si la extracción fue exitosa
+            - 'error': Mensaje de error si hubo fallo
+    """
+    modo = modo or MODO_EXTRACCION
+    
+    if modo in ('auto', 'http'):
+        resultado = obtener_tipo_cambio_rextie_http()
+        if resultado['exito'] or modo == 'http':
+            return resultado
+        logger.info("Modo HTTP falló, usando Selenium como respaldo")
+    
+    return obtener_tipo_cambio_rextie_selenium(driver)
+
+
+def obtener_tipo_cambio_rextie_selenium(driver: Optional[webdriver.Chrome] = None) -> Dict[str, Optional[float]]:
     """
     Obtiene el tipo de cambio actual de Rextie mediante Selenium.
     
     Usa un navegador headless para cargar la página y esperar
     a que se renderice el contenido dinámico con las tasas.
     
+    Args:
+        driver: Driver ya iniciado (opcional). Si no se indica, se pide
+            uno prestado al pool compartido (ver driver_pool.py).
+    
     Returns:
         Dict con las claves:
             - 'tc_rextie_compra': Tipo de cambio de compra (float o None)
@@ -45,81 +152,39 @@ def obtener_tipo_cambio_rextie() -> Dict[str, Optional[float]]:
             - 'exito': True si la extracción fue exitosa
             - 'error': Mensaje de error si hubo fallo
     """
-    resultado = {
-        'tc_rextie_compra': None,
-        'tc_rextie_venta': None,
-        'exito': False,
-        'error': None
-    }
+    resultado = _resultado_vacio()
     
-    driver = None
+    # Usar el driver recibido o pedir uno prestado al pool compartido
+    contexto = nullcontext(driver) if driver is not None else obtener_pool().arrendar()
     
     try:
-        logger.info(f"Iniciando Selenium para Rextie: {URL_REXTIE}")
-        
-        # Configurar Chrome en modo headless
-        options = Options()
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        options.add_argument('--log-level=3')  # Reducir logs
-        
-        # Iniciar el driver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        logger.info(f"Cargando Rextie con Selenium: {URL_REXTIE}")
         
-        # Cargar la página
-        driver.get(URL_REXTIE)
+        with contexto as driver:
+            # Cargar la página
+            driver.get(URL_REXTIE)
         
-        # Esperar a que cargue el contenido dinámico
-        time.sleep(3)
+            # Esperar a que se rendericen las tasas (sin sleep fijo)
+            esperar_tasas(driver, 'rextie', ESPECIFICACION_DOM.selectores_espera(), PRESUPUESTO_CARGA)
         
-        # Obtener el HTML de la página renderizada
-        html = driver.page_source
+            # Traer solo el texto de las tasas, no todo el HTML
+            textos = extraer_textos(driver, ESPECIFICACION_DOM)
         
-        # Buscar todos los números que parezcan tipo de cambio (entre 3.0 y 4.5)
-        patron = r'[\d]+\.[\d]{2,4}'
-        matches = re.findall(patron, html)
+        compra, venta = interpretar_textos(textos, ESPECIFICACION_DOM)
         
-        # Filtrar valores válidos de tipo de cambio
-        valores_tc = []
-        for m in matches:
-            try:
-                valor = float(m)
-                # Rango típico de tipo de cambio PEN/USD
-                if 3.30 <= valor <= 3.50:
-                    valor_redondeado = round(valor, 4)
-                    if valor_redondeado not in valores_tc:
-                        valores_tc.append(valor_redondeado)
-            except:
-                pass
-        
-        logger.info(f"Valores de TC encontrados: {valores_tc}")
-        
-        if len(valores_tc) >= 2:
-            # El primer valor suele ser compra, el segundo venta
-            # En Rextie: compra < venta (ellos compran más barato, venden más caro)
-            valores_tc_sorted = sorted(valores_tc)
-            resultado['tc_rextie_compra'] = valores_tc_sorted[0]  # Menor = compra
-            resultado['tc_rextie_venta'] = valores_tc_sorted[-1]   # Mayor = venta
+        if compra is not None and venta is not None:
+            resultado['tc_rextie_compra'] = compra
+            resultado['tc_rextie_venta'] = venta
             resultado['exito'] = True
-            logger.info(f"Rextie - Compra: {resultado['tc_rextie_compra']}, Venta: {resultado['tc_rextie_venta']}")
+            logger.info(f"Rextie - Compra: {compra}, Venta: {venta}")
         else:
-            resultado['error'] = f"Valores insuficientes encontrados: {valores_tc}"
+            resultado['error'] = f"Tasas no encontradas en la página: compra={compra}, venta={venta}"
             logger.warning(resultado['error'])
     
     except Exception as e:
         resultado['error'] = f"Error: {str(e)}"
         logger.error(resultado['error'])
     
-    finally:
-        if driver:
-            driver.quit()
-            logger.info("Navegador cerrado")
-    
     return resultado
 
 
@@ -128,11 +193,12 @@ def obtener_tipo_cambio_rextie() -> Dict[str, Optional[float]]:
 # ============================================================
 if __name__ == "__main__":
     print("\n" + "=" * 50)
-    print("   TEST: Scraper Rextie (Selenium)")
+    print("   TEST: Scraper Rextie (HTTP + Selenium)")
     print("=" * 50)
     
     print(f"\n🌐 URL: {URL_REXTIE}")
-    print("🔄 Iniciando navegador headless...")
+    print(f"🔌 API: {URL_API_REXTIE}")
+    print(f"🔄 Modo: {MODO_EXTRACCION}")
     
     datos = obtener_tipo_cambio_rextie()
     
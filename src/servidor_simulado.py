@@ -0,0 +1,154 @@
+"""
+servidor_simulado.py - Servidor HTTP local con respuestas grabadas
+
+Levanta un servidor en localhost que responde con los payloads guardados
+en data/fixtures/, imitando los endpoints JSON de las casas de cambio y la
+API de series del BCRP. Sirve para probar los modos HTTP de los scrapers
+y el cliente del BCRP sin salir a internet.
+
+Cada respuesta lleva ETag y Last-Modified (derivados del fixture) y las
+peticiones condicionales que coinciden reciben 304 Not Modified.
+
+Uso:
+    python servidor_simulado.py            # levanta el servidor y prueba los scrapers
+
+    >>> servidor, url_base = iniciar_servidor()
+    >>> obtener_tipo_cambio_kambista_http(url_base + RUTA_KAMBISTA)
+    >>> servidor.shutdown()
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+RUTA_FIXTURES = os.path.join(os.path.dirname(__file__), "..", "data", "fixtures")
+
+RUTA_KAMBISTA = "/v1/exchange/calculates"
+RUTA_REXTIE = "/api/v1/fxrates/rate/"
+RUTA_BCRP = "/estadisticas/series/api/"
+
+# Ruta del endpoint -> archivo grabado en data/fixtures/.
+# Las rutas que terminan en '/' atienden también todo lo que cuelga de
+# ellas (el BCRP lleva series y fechas en el path).
+RUTAS = {
+    RUTA_KAMBISTA: "kambista_api.json",
+    RUTA_REXTIE: "rextie_api.json",
+    RUTA_BCRP: "bcrp_api.json",
+}
+
+
+def _buscar_fixture(rutas: Dict[str, str], ruta: str) -> Optional[str]:
+    if ruta in rutas:
+        return rutas[ruta]
+    prefijos = [p for p in rutas if p.endswith('/') and ruta.startswith(p)]
+    return rutas[max(prefijos, key=len)] if prefijos else None
+
+
+def _crear_manejador(rutas: Dict[str, str]):
+    class ManejadorSimulado(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como los servidores reales
+
+        def do_GET(self):
+            ruta = urlsplit(self.path).path
+            archivo = _buscar_fixture(rutas, ruta)
+
+            if archivo is None:
+                self._responder(404, b'{"error": "not found"}')
+                return
+
+            ruta_archivo = os.path.join(RUTA_FIXTURES, archivo)
+            with open(ruta_archivo, 'rb') as f:
+                cuerpo = f.read()
+
+            etag = '"' + hashlib.md5(cuerpo).hexdigest() + '"'
+            modificado = formatdate(os.path.getmtime(ruta_archivo), usegmt=True)
+            validadores = {"ETag": etag, "Last-Modified": modificado}
+
+            if self.headers.get("If-None-Match") == etag or (
+                    "If-None-Match" not in self.headers
+                    and self.headers.get("If-Modified-Since") == modificado):
+                self._responder(304, b'', validadores)
+                return
+
+            self._responder(200, cuerpo, validadores)
+
+        def _responder(self, estado: int, cuerpo: bytes, headers: Optional[Dict[str, str]] = None):
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            for nombre, valor in (headers or {}).items():
+                self.send_header(nombre, valor)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            if estado != 304:
+                self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            logger.debug(formato % args)
+
+    return ManejadorSimulado
+
+
+def iniciar_servidor(rutas: Optional[Dict[str, str]] = None,
+                     puerto: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Inicia el servidor simulado en un hilo de fondo.
+
+    Args:
+        rutas: Mapeo ruta -> archivo de fixture (por defecto RUTAS)
+        puerto: Puerto local (0 = elegir uno libre)
+
+    Returns:
+        Tuple (servidor, url_base): llamar a `servidor.shutdown()` al terminar
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _crear_manejador(rutas or RUTAS))
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    logger.info(f"Servidor simulado escuchando en {url_base}")
+    return servidor, url_base
+
+
+# ============================================================
+# EJECUCIÓN PRINCIPAL (para testing)
+# ============================================================
+if __name__ == "__main__":
+    from scraper_kambista import obtener_tipo_cambio_kambista_http
+    from scraper_rextie import obtener_tipo_cambio_rextie_http
+
+    print("\n" + "=" * 50)
+    print("   TEST: Modos HTTP contra servidor simulado")
+    print("=" * 50)
+
+    servidor, url_base = iniciar_servidor()
+
+    try:
+        kambista = obtener_tipo_cambio_kambista_http(url_base + RUTA_KAMBISTA)
+        rextie = obtener_tipo_cambio_rextie_http(url_base + RUTA_REXTIE)
+
+        print(f"\n  Kambista: {kambista}")
+        print(f"  Rextie:   {rextie}")
+
+        if kambista['exito'] and rextie['exito']:
+            print("\n✅ MODOS HTTP FUNCIONANDO CORRECTAMENTE")
+        else:
+            print("\n❌ ERROR en algún modo HTTP")
+    finally:
+        servidor.shutdown()
+
+    print("=" * 50 + "\n")
@@ -0,0 +1,105 @@
+"""
+submuestreo.py - Reducción de series largas para los gráficos (LTTB)
+
+Un gráfico de 800 px no puede mostrar más de ~800 puntos distintos por
+serie, pero un año de registros por minuto son más de 500 000. Enviarlos
+todos a Plotly infla el mensaje del websocket y el render del navegador.
+
+lttb() implementa Largest-Triangle-Three-Buckets (Steinarsson, 2013):
+divide la serie en `umbral - 2` tramos y de cada uno conserva el punto que
+forma el triángulo de mayor área con el punto elegido en el tramo anterior
+y el promedio del tramo siguiente. Conserva los extremos y la forma de la
+curva mucho mejor que tomar uno de cada N.
+
+Los cortes de una fuente (y = NaN) se respetan: cada tramo de datos
+consecutivos se reduce por separado, con una parte del umbral
+proporcional a su largo, y entre tramos se conserva un punto NaN para que
+el gráfico corte la línea en lugar de unir los extremos del corte.
+
+Uso:
+    >>> indices = lttb(x, y, 800)
+    >>> x_reducido, y_reducido = x[indices], y[indices]
+
+Autor: Javier Uraco (@JavierAnthonyUS)
+Fecha: Diciembre 2025
+"""
+
+import logging
+
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+PUNTOS_GRAFICO = 800  # ~ancho en píxeles de un gráfico de la página de análisis
+
+
+def _lttb_tramo(x: np.ndarray, y: np.ndarray, umbral: int) -> np.ndarray:
+    """LTTB sobre un tramo sin NaN. Devuelve índices crecientes en el tramo."""
+    n = len(x)
+    if umbral < 3 or n <= umbral:
+        return np.arange(n)
+
+    # Límites de los tramos internos: el primer y el último punto se conservan siempre
+    bordes = (np.arange(umbral - 1) * (n - 2) / (umbral - 2)).astype(np.int64) + 1
+    bordes[-1] = n - 1
+
+    elegidos = np.empty(umbral, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(umbral - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Promedio del tramo siguiente (el último punto para el último tramo)
+        sig_inicio, sig_fin = fin, bordes[i + 2] if i + 2 < len(bordes) else n
+        x_medio, y_medio = x[sig_inicio:sig_fin].mean(), y[sig_inicio:sig_fin].mean()
+
+        # Área (x2) del triángulo (a, candidato, promedio siguiente)
+        areas = np.abs((x[a] - x_medio) * (y[inicio:fin] - y[a])
+                       - (x[a] - x[inicio:fin]) * (y_medio - y[a]))
+        a = inicio + int(areas.argmax())
+        elegidos[i + 1] = a
+
+    return elegidos
+
+
+def lttb(x: np.ndarray, y: np.ndarray, umbral: int = PUNTOS_GRAFICO) -> np.ndarray:
+    """
+    Índices de los puntos que conserva Largest-Triangle-Three-Buckets.
+
+    Los puntos con y = NaN (tasa ausente) no se eligen, salvo el primero de
+    cada corte entre dos tramos con datos: así y[indices] tiene un NaN
+    donde el gráfico debe cortar la línea.
+
+    Args:
+        x: Abscisas crecientes (p. ej. timestamps en segundos)
+        y: Ordenadas, NaN donde falta el dato
+        umbral: Puntos a conservar (a lo sumo; con muchos cortes cada tramo
+            conserva al menos sus extremos y puede pasarse)
+
+    Returns:
+        np.ndarray: Índices crecientes en x / y
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    validos = ~np.isnan(y)
+
+    # Tramos [inicio, fin) de puntos válidos consecutivos
+    cambios = np.flatnonzero(np.diff(validos.astype(np.int8))) + 1
+    limites = np.concatenate(([0], cambios, [len(y)]))
+    tramos = [(a, b) for a, b in zip(limites[:-1], limites[1:]) if validos[a]]
+    if not tramos:
+        return np.zeros(0, dtype=np.int64)
+
+    n = sum(b - a for a, b in tramos)
+    disponibles = umbral - (len(tramos) - 1)  # un punto por corte
+    partes = []
+    for k, (a, b) in enumerate(tramos):
+        if k:
+            partes.append(np.array([tramos[k - 1][1]]))  # primer NaN del corte
+        cupo = max(3, disponibles * (b - a) // n) if umbral >= 3 else umbral
+        partes.append(a + _lttb_tramo(x[a:b], y[a:b], cupo))
+    return np.concatenate(partes).astype(np.int64)
@@ -30,6 +30,16 @@ HEADERS = {
     "Connection": "keep-alive",
 }
 
+# Bytes leídos por paso al buscar las últimas líneas de un CSV
+TAMANO_BLOQUE_COLA = 4096
+
+# Columnas de tasas de las fuentes originales (ver fuentes.campos_tasas)
+CAMPOS_TASAS = [
+    'tc_bcrp_compra', 'tc_bcrp_venta',
+    'tc_kambista_compra', 'tc_kambista_venta',
+    'tc_rextie_compra', 'tc_rextie_venta'
+]
+
 
 def obtener_timestamp() -> str:
     """
@@ -138,6 +148,32 @@ def determinar_mejor_opcion(tasas: Dict[str, float], tipo: str = "compra") -> Op
         return max(tasas_validas, key=tasas_validas.get)
 
 
+def calcular_ahorro(tasas: Dict[str, float], monto: float = 1000) -> Optional[float]:
+    """
+    Diferencia en soles por `monto` USD entre la mejor y la peor fuente.
+    
+    Con tasas de venta es lo que se ahorra al comprar en la mejor casa;
+    con tasas de compra, lo que se gana de más al vender.
+    
+    Args:
+        tasas: Diccionario con {nombre_fuente: tasa}
+        monto: Monto en USD
+    
+    Returns:
+        float: (mayor tasa - menor tasa) * monto, o None con menos de dos fuentes
+    
+    Ejemplo:
+        >>> round(calcular_ahorro({"Kambista": 3.755, "Rextie": 3.75}), 2)
+        5.0
+    """
+    tasas_validas = [v for v in tasas.values() if v is not None]
+    
+    if len(tasas_validas) < 2:
+        return None
+    
+    return (max(tasas_validas) - min(tasas_validas)) * monto
+
+
 def guardar_csv(datos: Dict, ruta: str, modo: str = 'a') -> bool:
     """
     Guarda un registro en el archivo CSV.
@@ -181,10 +217,72 @@ def guardar_csv(datos: Dict, ruta: str, modo: str = 'a') -> bool:
         return False
 
 
+def _leer_cola_csv(ruta: str, cantidad: int) -> List[Dict]:
+    """
+    Lee las últimas `cantidad` filas de un CSV leyendo el archivo desde el
+    final, en bloques, sin recorrer el historial completo.
+    
+    Solo se parsean el encabezado y las líneas finales. Supone que los
+    campos no contienen saltos de línea (así escribe guardar_csv).
+    Todos los escritores terminan cada fila con un salto de línea: una
+    última línea sin él (un proceso que murió a mitad de escritura) se
+    descarta aunque tenga todas las columnas. Las filas más cortas que el
+    encabezado se completan con '' y las más largas se descartan, con aviso.
+    """
+    with open(ruta, 'rb') as f:
+        encabezado = f.readline()
+        inicio_datos = f.tell()
+        
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        termina_en_salto = False
+        if posicion > inicio_datos:
+            f.seek(posicion - 1)
+            termina_en_salto = f.read(1) == b'\n'
+        
+        # Retroceder hasta tener cantidad + 1 líneas (por si la última está cortada)
+        bloque = b''
+        while posicion > inicio_datos and bloque.count(b'\n') <= cantidad + 1:
+            paso = min(TAMANO_BLOQUE_COLA, posicion - inicio_datos)
+            posicion -= paso
+            f.seek(posicion)
+            bloque = f.read(paso) + bloque
+    
+    lineas = bloque.split(b'\n')
+    if posicion > inicio_datos:
+        lineas = lineas[1:]  # la primera puede haber quedado partida por el bloque
+    
+    columnas = next(csv.reader([encabezado.decode('utf-8-sig').rstrip('\r\n')]), [])
+    filas = []
+    for linea in lineas:
+        texto = linea.decode('utf-8', errors='replace').rstrip('\r')
+        if texto.strip():
+            filas.append(next(csv.reader([texto])))
+    
+    if filas and not termina_en_salto:
+        logger.warning(f"Última línea incompleta en {ruta}; se ignora")
+        filas.pop()
+    
+    registros = []
+    for valores in filas[-cantidad:]:
+        if len(valores) > len(columnas):
+            logger.warning(f"Fila con {len(valores)} columnas en {ruta} (encabezado: {len(columnas)}); se ignora: {valores}")
+            continue
+        if len(valores) < len(columnas):
+            logger.warning(f"Fila con {len(valores)} columnas en {ruta} (encabezado: {len(columnas)}); "
+                           f"se completa con vacíos: {valores}")
+            valores = valores + [''] * (len(columnas) - len(valores))
+        registros.append(dict(zip(columnas, valores)))
+    return registros
+
+
 def cargar_ultimo_registro(ruta: str) -> Optional[Dict]:
     """
     Carga el último registro del archivo CSV.
     
+    Lee desde el final del archivo, así el tiempo no crece con el tamaño
+    del historial.
+    
     Args:
         ruta: Ruta del archivo CSV
     
@@ -196,30 +294,46 @@ def cargar_ultimo_registro(ruta: str) -> Optional[Dict]:
         >>> print(ultimo['timestamp'])
         '2024-12-13 09:00:00'
     """
+    registros = cargar_ultimos_registros(ruta, 1)
+    return registros[-1] if registros else None
+
+
+def cargar_ultimos_registros(ruta: str, cantidad: int) -> List[Dict]:
+    """
+    Carga los últimos `cantidad` registros del archivo CSV.
+    
+    Args:
+        ruta: Ruta del archivo CSV
+        cantidad: Número de registros a devolver
+    
+    Returns:
+        List[Dict]: Registros en el orden del archivo (vacía si no existe)
+    """
     if not os.path.exists(ruta):
-        return None
+        return []
     
     try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            registros = list(reader)
-            
-            if registros:
-                return registros[-1]
-            return None
+        return _leer_cola_csv(ruta, cantidad)
     
     except Exception as e:
-        logger.error(f"Error cargando último registro: {e}")
-        return None
+        logger.error(f"Error cargando últimos registros: {e}")
+        return []
 
 
-def hubo_cambio(datos_nuevos: Dict, datos_anteriores: Dict) -> bool:
+def hubo_cambio(datos_nuevos: Dict, datos_anteriores: Dict,
+                campos: Optional[List[str]] = None) -> bool:
     """
     Compara datos nuevos con los anteriores para detectar cambios.
     
+    Versión sobre diccionarios, conservada por compatibilidad (y como
+    referencia en benchmarks.py): el integrador usa Instantanea.hubo_cambio
+    (ver modelo.py).
+    
     Args:
         datos_nuevos: Diccionario con datos actuales
         datos_anteriores: Diccionario con datos del último registro
+        campos: Columnas de tasas a comparar (por defecto CAMPOS_TASAS;
+            fuentes.campos_tasas() da las de todas las fuentes registradas)
     
     Returns:
         bool: True si hubo algún cambio en las tasas
@@ -233,13 +347,7 @@ def hubo_cambio(datos_nuevos: Dict, datos_anteriores: Dict) -> bool:
     if datos_anteriores is None:
         return True  # Primer registro siempre es "cambio"
     
-    campos_a_comparar = [
-        'tc_bcrp_compra', 'tc_bcrp_venta',
-        'tc_kambista_compra', 'tc_kambista_venta',
-        'tc_rextie_compra', 'tc_rextie_venta'
-    ]
-    
-    for campo in campos_a_comparar:
+    for campo in campos or CAMPOS_TASAS:
         valor_nuevo = datos_nuevos.get(campo)
         valor_anterior = datos_anteriores.get(campo)
         